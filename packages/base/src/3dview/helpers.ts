@@ -178,48 +178,44 @@ export function buildShape(options: {
 } | null {
   const { objName, data, isSolid, isWireframe, clippingPlanes, objColor } =
     options;
-  const { faceList, edgeList, jcObject } = data;
+  const {
+    faceVertices,
+    faceTriangles,
+    faceOffsets,
+    edgeVertices,
+    edgeOffsets,
+    jcObject
+  } = data;
 
-  const vertices: Array<number> = [];
-  const triangles: Array<number> = [];
   const placement = data?.jcObject?.parameters?.Placement;
   const objPosition = placement.Position;
 
   const objQuaternion = getQuaternion(jcObject);
   const inverseQuaternion = objQuaternion.clone().invert();
 
-  let vInd = 0;
-  if (faceList.length === 0 && edgeList.length === 0) {
+  if (faceOffsets.length <= 1 && edgeOffsets.length <= 1) {
     return null;
   }
-  for (const face of faceList) {
-    const vertexCoorLength = face.vertexCoord.length;
-    for (let ii = 0; ii < vertexCoorLength; ii += 3) {
-      const vertex = new THREE.Vector3(
-        face.vertexCoord[ii],
-        face.vertexCoord[ii + 1],
-        face.vertexCoord[ii + 2]
-      );
-      // Undo placement from the vertices, we want the placement done on the THREE.Object3D (Mesh), not the geometry
-      vertex.sub(
-        new THREE.Vector3(objPosition[0], objPosition[1], objPosition[2])
-      );
-      vertex.applyQuaternion(inverseQuaternion);
-
-      vertices.push(vertex.x, vertex.y, vertex.z);
-    }
 
-    const triIndexesLength = face.triIndexes.length;
-    for (let i = 0; i < triIndexesLength; i += 3) {
-      triangles.push(
-        face.triIndexes[i + 0] + vInd,
-        face.triIndexes[i + 1] + vInd,
-        face.triIndexes[i + 2] + vInd
-      );
+  // Undo placement from the vertices, we want the placement done on the THREE.Object3D (Mesh), not the geometry
+  const position = new THREE.Vector3(
+    objPosition[0],
+    objPosition[1],
+    objPosition[2]
+  );
+  const vertex = new THREE.Vector3();
+  const placeVertices = (source: Float32Array): Float32Array => {
+    const target = new Float32Array(source.length);
+    for (let i = 0; i < source.length; i += 3) {
+      vertex
+        .fromArray(source, i)
+        .sub(position)
+        .applyQuaternion(inverseQuaternion)
+        .toArray(target, i);
     }
-
-    vInd += vertexCoorLength / 3;
-  }
+    return target;
+  };
+  const vertices = placeVertices(faceVertices);
 
   const color = objColor || DEFAULT_MESH_COLOR;
   const visible = jcObject.visible;
@@ -239,11 +235,9 @@ export function buildShape(options: {
 
   const geometry = new THREE.BufferGeometry();
 
-  geometry.setIndex(triangles);
-  geometry.setAttribute(
-    'position',
-    new THREE.Float32BufferAttribute(vertices, 3)
-  );
+  // The bounds tree reorders the triangles, the mesh may be cached
+  geometry.setIndex(new THREE.BufferAttribute(faceTriangles.slice(), 1));
+  geometry.setAttribute('position', new THREE.BufferAttribute(vertices, 3));
   geometry.computeVertexNormals();
   geometry.computeBoundingBox();
   if (vertices.length > 0) {
@@ -298,9 +292,9 @@ export function buildShape(options: {
     type: 'shape'
   };
 
-  let edgeIdx = 0;
   const edgesMeshes: LineSegments2[] = [];
-  for (const edge of edgeList) {
+  const edgeCount = edgeOffsets.length - 1;
+  for (let edgeIdx = 0; edgeIdx < edgeCount; edgeIdx++) {
     const edgeMaterial = new LineMaterial({
       linewidth: DEFAULT_LINEWIDTH,
       color: new THREE.Color(DEFAULT_EDGE_COLOR).getHex(),
@@ -311,21 +305,12 @@ export function buildShape(options: {
       polygonOffsetUnits: -5
     });
 
-    const transformedVertices: number[] = [];
-    for (let i = 0; i < edge.vertexCoord.length; i += 3) {
-      const vertex = new THREE.Vector3(
-        edge.vertexCoord[i],
-        edge.vertexCoord[i + 1],
-        edge.vertexCoord[i + 2]
-      );
-      // Undo placement from the vertices, we want the placement done on the THREE.Object3D (Mesh), not the geometry
-      vertex.sub(
-        new THREE.Vector3(objPosition[0], objPosition[1], objPosition[2])
-      );
-      vertex.applyQuaternion(inverseQuaternion);
-
-      transformedVertices.push(vertex.x, vertex.y, vertex.z);
-    }
+    const transformedVertices = placeVertices(
+      edgeVertices.subarray(
+        edgeOffsets[edgeIdx] * 3,
+        edgeOffsets[edgeIdx + 1] * 3
+      )
+    );
 
     const edgeGeometry = new LineGeometry();
     edgeGeometry.setPositions(transformedVertices);
@@ -339,7 +324,6 @@ export function buildShape(options: {
 
     edgesMeshes.push(edgesMesh);
     meshGroup.add(edgesMesh);
-    edgeIdx++;
   }
 
   const bbox = new THREE.Box3().setFromObject(meshGroup);
@@ -1,3 +1,4 @@
+import { MapChange } from '@jupyter/ydoc';
 import { IWorkerMessage } from '@jupytercad/occ-worker';
 import {
   IAnnotation,
@@ -27,6 +28,9 @@ import { IDisposable } from '@lumino/disposable';
 import { ISignal, Signal } from '@lumino/signaling';
 import { v4 as uuid } from 'uuid';
 
+import { fetchCachedMeshes, storeCachedMesh } from '../meshcache';
+import { resolveBlobReferences } from '../tools';
+
 export class MainViewModel implements IDisposable {
   constructor(options: MainViewModel.IOptions) {
     this._jcadModel = options.jcadModel;
@@ -88,6 +92,10 @@ export class MainViewModel implements IDisposable {
       this._onSharedObjectsChanged,
       this
     );
+    this._jcadModel.sharedOptionsChanged.disconnect(
+      this._onSharedOptionsChanged,
+      this
+    );
     this._isDisposed = true;
   }
 
@@ -96,6 +104,10 @@ export class MainViewModel implements IDisposable {
       this._onSharedObjectsChanged,
       this
     );
+    this._jcadModel.sharedOptionsChanged.connect(
+      this._onSharedOptionsChanged,
+      this
+    );
   }
 
   initWorker(): void {
@@ -114,7 +126,13 @@ export class MainViewModel implements IDisposable {
   messageHandler(msg: IMainMessage): void {
     switch (msg.action) {
       case MainAction.DISPLAY_SHAPE: {
-        const { result, postResult } = msg.payload;
+        const { result, postResult, meshKeys } = msg.payload;
+        // Share the meshes computed by the worker with the other clients
+        Object.entries(meshKeys ?? {}).forEach(([name, key]) => {
+          if (result[name]) {
+            storeCachedMesh(key, result[name]);
+          }
+        });
         const rawPostResult: IDict<IPostOperatorInput> = {};
         const threejsPostResult: IDict<IPostOperatorInput> = {};
 
@@ -158,14 +176,7 @@ export class MainViewModel implements IDisposable {
         if (!this._jcadModel) {
           return;
         }
-        const content = this._jcadModel.getContent();
-        this._workerBusy.emit(true);
-        this._postMessage({
-          action: WorkerAction.LOAD_FILE,
-          payload: {
-            content
-          }
-        });
+        this._loadContent();
       }
     }
   }
@@ -260,7 +271,7 @@ export class MainViewModel implements IDisposable {
       action: WorkerAction.DRY_RUN,
       payload: {
         id,
-        content
+        content: await resolveBlobReferences(content, this._jcadModel.filePath)
       }
     });
 
@@ -305,17 +316,42 @@ export class MainViewModel implements IDisposable {
   ): Promise<void> {
     if (change.objectChange) {
       await this._worker.ready;
-      const content = this._jcadModel.getContent();
-      this._workerBusy.emit(true);
-      this._postMessage({
-        action: WorkerAction.LOAD_FILE,
-        payload: {
-          content
-        }
-      });
+      await this._loadContent();
+    }
+  }
+
+  private async _onSharedOptionsChanged(
+    _: IJupyterCadModel,
+    change: MapChange
+  ): Promise<void> {
+    // The objects are meshed again with the new settings
+    if (change.has('tessellation')) {
+      await this._worker.ready;
+      await this._loadContent();
     }
   }
 
+  /**
+   * Send the document content to the worker, after resolving the blob
+   * references it may contain, with the tessellation settings of the objects
+   * and the meshes found in the mesh cache.
+   */
+  private async _loadContent(): Promise<void> {
+    this._workerBusy.emit(true);
+    const rawContent = this._jcadModel.getContent();
+    const [content, cached] = await Promise.all([
+      resolveBlobReferences(rawContent, this._jcadModel.filePath),
+      fetchCachedMeshes(rawContent)
+    ]);
+    this._postMessage({
+      action: WorkerAction.LOAD_FILE,
+      payload: {
+        content,
+        ...cached
+      }
+    });
+  }
+
   private _dryRunResponses: IDict<PromiseDelegate<IDryRunResponsePayload>> = {};
   private _jcadModel: IJupyterCadModel;
   private _viewSetting: ObservableMap<JSONValue>;
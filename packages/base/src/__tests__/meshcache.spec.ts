@@ -0,0 +1,92 @@
+import { IJCadContent } from '@jupytercad/schema';
+
+import { canonicalJSON, objectHashes } from '../meshcache';
+
+/**
+ * The document of `jupytercad_core/tests/test_evaluation.py`, whose hashes
+ * must be the same in the kernel and in the frontend.
+ */
+const DOCUMENT = {
+  schemaVersion: '3.0.0',
+  objects: [
+    {
+      name: 'Box 1',
+      shape: 'Part::Box',
+      parameters: {
+        Length: 1,
+        Width: 2.5,
+        Height: 1e21,
+        Color: '#808080',
+        Placement: { Position: [0, 0.1, 1e-7], Axis: [0, 0, 1], Angle: 0 }
+      }
+    },
+    {
+      name: 'Any 1',
+      shape: 'Part::Any',
+      parameters: { Content: 'solid é\nendsolid\n', Type: 'STL' }
+    },
+    {
+      name: 'Cut 1',
+      shape: 'Part::Cut',
+      parameters: { Base: 'Box 1', Tool: 'Missing', Refine: false }
+    },
+    // A dependency cycle, and an object depending on it
+    {
+      name: 'Fuse 1',
+      shape: 'Part::MultiFuse',
+      parameters: { Shapes: ['Fuse 2', 'Box 1'] }
+    },
+    {
+      name: 'Fuse 2',
+      shape: 'Part::MultiFuse',
+      parameters: { Shapes: ['Fuse 1'] }
+    },
+    {
+      name: 'Fillet 1',
+      shape: 'Part::Fillet',
+      parameters: { Base: 'Fuse 1', Radius: 0.1 + 0.2 }
+    }
+  ],
+  options: {},
+  metadata: {},
+  outputs: {}
+} as unknown as IJCadContent;
+
+describe('canonicalJSON', () => {
+  it.each([
+    [0, '0'],
+    [-0, '0'],
+    [100, '100'],
+    [1e20, '100000000000000000000'],
+    [1e21, '1e+21'],
+    [1.5e-6, '0.0000015'],
+    [1e-7, '1e-7'],
+    [-1e-7, '-1e-7'],
+    [0.1 + 0.2, '0.30000000000000004'],
+    [2 ** 53, '9007199254740992'],
+    [5e-324, '5e-324'],
+    [NaN, 'null']
+  ])('formats %p like the kernel', (value, expected) => {
+    expect(canonicalJSON(value)).toBe(expected);
+  });
+
+  it('sorts the keys of objects', () => {
+    const value = { b: [1.0, null, true], a: 'é', c: { y: 1e21, x: 1e-7 } };
+    expect(canonicalJSON(value)).toBe(
+      '{"a":"é","b":[1,null,true],"c":{"x":1e-7,"y":1e+21}}'
+    );
+  });
+});
+
+describe('objectHashes', () => {
+  it('computes the hashes of the kernel', async () => {
+    expect(await objectHashes(DOCUMENT)).toEqual({
+      'Box 1':
+        '7c609f3ae30bc656cb7e0fb19a331a9db71cbc833762acf224aa14e64ed65071',
+      'Any 1':
+        '83b8c24106ac57f0ed71e5c3380d3bcee088f0c4bb2ebcb67ebcb1a079e08d23',
+      'Cut 1':
+        '79bd9c40b13cb6e161ab62851905b2fed8e765f29296590a1d35932327387af4'
+    });
+  });
+});
@@ -9,9 +9,13 @@ import {
   Parts
 } from '@jupytercad/schema';
 import { JupyterFrontEnd } from '@jupyterlab/application';
-import { showErrorMessage, WidgetTracker } from '@jupyterlab/apputils';
+import {
+  Notification,
+  showErrorMessage,
+  WidgetTracker
+} from '@jupyterlab/apputils';
 import { ICompletionProviderManager } from '@jupyterlab/completer';
-import { PathExt } from '@jupyterlab/coreutils';
+import { PathExt, URLExt } from '@jupyterlab/coreutils';
 import { ITranslator } from '@jupyterlab/translation';
 import { filterIcon, redoIcon, undoIcon } from '@jupyterlab/ui-components';
 import { CommandRegistry } from '@lumino/commands';
@@ -216,14 +220,53 @@ const EXPORT_FORM = {
         return;
       }
       const { Name } = props;
-      requestAPI<{ done: boolean }>(endpoint, {
-        method: 'POST',
-        body: JSON.stringify({ path: model.filePath, newName: Name })
-      });
+      exportToJcad(endpoint, model.filePath, Name)
+        .then(() => Notification.success(`${Name} exported`))
+        .catch(e =>
+          showErrorMessage(`Cannot export to ${Name}`, e?.message ?? `${e}`)
+        );
     };
   }
 };
 
+/**
+ * The delay between two requests for the status of an export, in ms.
+ */
+const EXPORT_POLL_INTERVAL = 1000;
+
+interface IExportStatus {
+  done: boolean;
+  job?: string;
+  error?: string | null;
+}
+
+/**
+ * Export a file to a .jcad document. Large files are exported in the
+ * background by the server, their export job is polled until it is done.
+ *
+ * @param endpoint The export endpoint
+ * @param path The path of the file to export
+ * @param newName The name of the .jcad document
+ */
+async function exportToJcad(
+  endpoint: string,
+  path: string,
+  newName: string
+): Promise<void> {
+  let status = await requestAPI<IExportStatus>(endpoint, {
+    method: 'POST',
+    body: JSON.stringify({ path, newName })
+  });
+  const job = status.job;
+  while (!status.done && job) {
+    await new Promise(resolve => setTimeout(resolve, EXPORT_POLL_INTERVAL));
+    status = await requestAPI<IExportStatus>(URLExt.join(endpoint, job));
+  }
+  if (status.error) {
+    throw new Error(status.error);
+  }
+}
+
 function loadKeybindings(commands: CommandRegistry, keybindings: any[]) {
   keybindings.forEach(binding => {
     commands.addKeyBinding({
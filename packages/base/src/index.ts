@@ -1,6 +1,7 @@
 export * from './commands';
 export * from './formdialog';
 export * from './3dview';
+export * from './meshcache';
 export * from './tools';
 export * from './types';
 export * from './widget';
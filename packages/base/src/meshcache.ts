@@ -0,0 +1,588 @@
+import {
+  IDict,
+  IJCadContent,
+  IJCadObject,
+  IMeshData,
+  IMeshSettings,
+  ITessellation
+} from '@jupytercad/schema';
+import { URLExt } from '@jupyterlab/coreutils';
+import { ServerConnection } from '@jupyterlab/services';
+
+import { BLOB_REF_PREFIX } from './tools';
+
+/**
+ * The version of the format of the cached meshes, part of their key.
+ * Must match `jupytercad_core.meshcache.MESH_FORMAT_VERSION`.
+ */
+export const MESH_FORMAT_VERSION = 2;
+
+/**
+ * The magic number of the binary meshes, "JCMS" in little-endian order.
+ */
+const MESH_MAGIC = 0x534d434a;
+
+/**
+ * The arrays of the binary meshes, in their order in the format.
+ */
+const MESH_ARRAYS = [
+  'faceVertices',
+  'faceTriangles',
+  'faceOffsets',
+  'edgeVertices',
+  'edgeOffsets'
+] as const;
+
+// The magic number, the version, the length of each array and of the metadata
+const MESH_HEADER_LENGTH = MESH_ARRAYS.length + 3;
+
+/**
+ * The default tessellation settings of the documents.
+ * Must match `jupytercad_core.mesh.DEFAULT_TESSELLATION`.
+ */
+export const DEFAULT_TESSELLATION: Required<ITessellation> = {
+  mode: 'fixed',
+  linearDeflection: 0.1,
+  relativeDeflection: 0.001,
+  angularDeflection: 0.5,
+  progressive: false
+};
+
+/**
+ * The factors applied to the deflections of the coarse level of detail.
+ */
+const COARSE_LINEAR_FACTOR = 10;
+const COARSE_ANGULAR_FACTOR = 2;
+
+/**
+ * The levels of detail of the meshes, a coarse mesh being displayed first
+ * when the tessellation is progressive.
+ */
+export type LevelOfDetail = 'coarse' | 'fine';
+
+/**
+ * The parameters of the operators holding the names of their operands.
+ * Must match `jupytercad_core.graph.OPERATOR_DEPENDENCIES`.
+ */
+const OPERATOR_DEPENDENCIES: IDict<string[]> = {
+  'Part::Cut': ['Base', 'Tool'],
+  'Part::Extrusion': ['Base'],
+  'Part::Fillet': ['Base'],
+  'Part::Chamfer': ['Base'],
+  'Part::MultiCommon': ['Shapes'],
+  'Part::MultiFuse': ['Shapes']
+};
+
+/**
+ * The parameters which do not change the geometry of a shape.
+ */
+const NON_GEOMETRIC_PARAMETERS = ['Color'];
+
+// The number of meshes kept in memory, on top of the browser HTTP cache
+const MEMORY_CACHE_SIZE = 256;
+
+const MESH_CACHE = new Map<string, IMeshData>();
+
+/**
+ * Returns the tessellation settings of an object, set on the object or in
+ * the document options.
+ *
+ * @param content The document content
+ * @param obj The object
+ */
+export function resolveTessellation(
+  content: IJCadContent,
+  obj: IJCadObject
+): Required<ITessellation> {
+  return {
+    ...DEFAULT_TESSELLATION,
+    ...content.options?.tessellation,
+    ...obj.tessellation
+  };
+}
+
+/**
+ * Returns the settings of the mesh of an object at a level of detail. This is
+ * `jupytercad_core.mesh.mesh_settings`.
+ *
+ * @param tessellation The tessellation settings of the object
+ * @param level The level of detail
+ */
+export function meshSettings(
+  tessellation: Required<ITessellation>,
+  level: LevelOfDetail = 'fine'
+): IMeshSettings {
+  const coarse = level === 'coarse';
+  const linearFactor = coarse ? COARSE_LINEAR_FACTOR : 1;
+  const angularDeflection =
+    tessellation.angularDeflection * (coarse ? COARSE_ANGULAR_FACTOR : 1);
+  if (tessellation.mode === 'auto') {
+    return {
+      relativeDeflection: tessellation.relativeDeflection * linearFactor,
+      angularDeflection
+    };
+  }
+  return {
+    linearDeflection: tessellation.linearDeflection * linearFactor,
+    angularDeflection
+  };
+}
+
+/**
+ * Serialize a JSON value in a canonical form: objects with sorted keys and
+ * no whitespace. This is `jupytercad_core.evaluation.canonical_json`.
+ */
+export function canonicalJSON(value: any): string {
+  if (value === null || value === undefined) {
+    return 'null';
+  }
+  if (Array.isArray(value)) {
+    return `[${value.map(canonicalJSON).join(',')}]`;
+  }
+  if (typeof value === 'object') {
+    const items = Object.keys(value)
+      .filter(key => value[key] !== undefined)
+      .sort()
+      .map(key => `${JSON.stringify(key)}:${canonicalJSON(value[key])}`);
+    return `{${items.join(',')}}`;
+  }
+  return JSON.stringify(value);
+}
+
+const SHA256_K = new Uint32Array([
+  0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1,
+  0x923f82a4, 0xab1c5ed5, 0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3,
+  0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174, 0xe49b69c1, 0xefbe4786,
+  0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+  0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147,
+  0x06ca6351, 0x14292967, 0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13,
+  0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85, 0xa2bfe8a1, 0xa81a664b,
+  0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+  0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a,
+  0x5b9cca4f, 0x682e6ff3, 0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208,
+  0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+/**
+ * SHA-256 of bytes, for the insecure contexts where `crypto.subtle` is not
+ * available.
+ */
+function sha256Bytes(data: Uint8Array): Uint8Array {
+  const length = data.length;
+  // The message, a 1 bit, zero padding and the message length in bits
+  const blocks = new Uint8Array(Math.ceil((length + 9) / 64) * 64);
+  blocks.set(data);
+  blocks[length] = 0x80;
+  const view = new DataView(blocks.buffer);
+  view.setUint32(blocks.length - 8, Math.floor(length / 0x20000000));
+  view.setUint32(blocks.length - 4, (length * 8) >>> 0);
+
+  const hash = new Uint32Array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c,
+    0x1f83d9ab, 0x5be0cd19
+  ]);
+  const w = new Uint32Array(64);
+  const rotr = (x: number, n: number) => (x >>> n) | (x << (32 - n));
+  for (let offset = 0; offset < blocks.length; offset += 64) {
+    for (let i = 0; i < 16; i++) {
+      w[i] = view.getUint32(offset + i * 4);
+    }
+    for (let i = 16; i < 64; i++) {
+      const s0 = rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >>> 3);
+      const s1 = rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >>> 10);
+      w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+    }
+    let [a, b, c, d, e, f, g, h] = hash;
+    for (let i = 0; i < 64; i++) {
+      const s1 = rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25);
+      const t1 = (h + s1 + ((e & f) ^ (~e & g)) + SHA256_K[i] + w[i]) | 0;
+      const s0 = rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22);
+      const t2 = (s0 + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+      h = g;
+      g = f;
+      f = e;
+      e = (d + t1) | 0;
+      d = c;
+      c = b;
+      b = a;
+      a = (t1 + t2) | 0;
+    }
+    hash[0] += a;
+    hash[1] += b;
+    hash[2] += c;
+    hash[3] += d;
+    hash[4] += e;
+    hash[5] += f;
+    hash[6] += g;
+    hash[7] += h;
+  }
+
+  const digest = new Uint8Array(32);
+  const digestView = new DataView(digest.buffer);
+  hash.forEach((value, i) => digestView.setUint32(i * 4, value));
+  return digest;
+}
+
+/**
+ * Returns the hexadecimal SHA-256 of the UTF-8 encoding of a string.
+ */
+export async function sha256(text: string): Promise<string> {
+  const data = new TextEncoder().encode(text);
+  const digest = globalThis.crypto?.subtle
+    ? new Uint8Array(await globalThis.crypto.subtle.digest('SHA-256', data))
+    : sha256Bytes(data);
+  return Array.from(digest, byte => byte.toString(16).padStart(2, '0')).join(
+    ''
+  );
+}
+
+/**
+ * Returns the hash of the operator subtree of each object, by name. This is
+ * `jupytercad_core.evaluation.object_hashes`.
+ *
+ * The objects in a dependency cycle, and the objects depending on them,
+ * cannot be built and have no hash.
+ *
+ * @param content The document content, with unresolved blob references
+ */
+export async function objectHashes(
+  content: IJCadContent
+): Promise<IDict<string>> {
+  const objects = new Map<string, IJCadObject>(
+    content.objects.map(obj => [obj.name, obj])
+  );
+  const hashes: IDict<string> = {};
+  const visiting = new Set<string>();
+  const cyclic = new Set<string>();
+
+  // Returns null for the missing operands, and undefined for the objects
+  // which cannot be hashed
+  const visit = async (name: string): Promise<string | null | undefined> => {
+    if (name in hashes) {
+      return hashes[name];
+    }
+    const obj = objects.get(name);
+    if (!obj) {
+      return null;
+    }
+    if (visiting.has(name) || cyclic.has(name)) {
+      return undefined;
+    }
+    visiting.add(name);
+    const fail = () => {
+      visiting.delete(name);
+      cyclic.add(name);
+      return undefined;
+    };
+
+    const parameters: IDict = {};
+    Object.entries(obj.parameters ?? {}).forEach(([key, value]) => {
+      if (!NON_GEOMETRIC_PARAMETERS.includes(key)) {
+        parameters[key] = value;
+      }
+    });
+    for (const key of OPERATOR_DEPENDENCIES[obj.shape ?? ''] ?? []) {
+      const value = parameters[key];
+      if (Array.isArray(value)) {
+        const operands: (string | null)[] = [];
+        for (const operand of value) {
+          const hash = await visit(operand);
+          if (hash === undefined) {
+            return fail();
+          }
+          operands.push(hash);
+        }
+        parameters[key] = operands;
+      } else if (value !== undefined && value !== null) {
+        const hash = await visit(value);
+        if (hash === undefined) {
+          return fail();
+        }
+        parameters[key] = hash;
+      }
+    }
+    const content = parameters['Content'];
+    if (typeof content === 'string' && !content.startsWith(BLOB_REF_PREFIX)) {
+      parameters['Content'] = BLOB_REF_PREFIX + (await sha256(content));
+    }
+
+    visiting.delete(name);
+    hashes[name] = await sha256(canonicalJSON([obj.shape ?? null, parameters]));
+    return hashes[name];
+  };
+
+  for (const name of objects.keys()) {
+    await visit(name);
+  }
+  return hashes;
+}
+
+/**
+ * Returns the mesh cache key of an object. This is
+ * `jupytercad_core.meshcache.mesh_cache_key`.
+ *
+ * @param objectHash The hash of the operator subtree of the object
+ * @param settings The tessellation settings of the mesh
+ */
+export function meshCacheKey(
+  objectHash: string,
+  settings: IMeshSettings
+): Promise<string> {
+  return sha256(canonicalJSON([MESH_FORMAT_VERSION, objectHash, settings]));
+}
+
+function meshUrl(key: string): string {
+  const settings = ServerConnection.makeSettings();
+  return URLExt.join(settings.baseUrl, 'jupytercad', 'mesh', key);
+}
+
+function rememberMesh(key: string, mesh: IMeshData): void {
+  MESH_CACHE.delete(key);
+  MESH_CACHE.set(key, mesh);
+  if (MESH_CACHE.size > MEMORY_CACHE_SIZE) {
+    MESH_CACHE.delete(MESH_CACHE.keys().next().value as string);
+  }
+}
+
+/**
+ * Serialize a mesh in the binary format of the mesh cache. This is
+ * `jupytercad_core.meshcache.encode_mesh`.
+ *
+ * The format is a header of 32-bit unsigned integers, holding the magic
+ * number, the format version, the length of each array of the mesh and the
+ * length of its metadata, followed by the arrays and the metadata, as JSON.
+ * Numbers are little-endian, like the typed arrays of all browsers.
+ */
+export function encodeMesh(mesh: IMeshData): ArrayBuffer {
+  const meta = mesh.meta
+    ? new TextEncoder().encode(JSON.stringify(mesh.meta))
+    : new Uint8Array(0);
+  const arrays = MESH_ARRAYS.map(name => mesh[name]);
+  const header = new Uint32Array(MESH_HEADER_LENGTH);
+  header[0] = MESH_MAGIC;
+  header[1] = MESH_FORMAT_VERSION;
+  arrays.forEach((array, i) => {
+    header[i + 2] = array.length;
+  });
+  header[MESH_HEADER_LENGTH - 1] = meta.byteLength;
+
+  const chunks = [header, ...arrays, meta];
+  const buffer = new ArrayBuffer(
+    chunks.reduce((length, chunk) => length + chunk.byteLength, 0)
+  );
+  const content = new Uint8Array(buffer);
+  let offset = 0;
+  chunks.forEach(chunk => {
+    content.set(
+      new Uint8Array(chunk.buffer, chunk.byteOffset, chunk.byteLength),
+      offset
+    );
+    offset += chunk.byteLength;
+  });
+  return buffer;
+}
+
+/**
+ * Deserialize a mesh of the mesh cache, see `encodeMesh`. The arrays of the
+ * mesh are views of the buffer.
+ *
+ * @returns The mesh, or undefined if its format is not supported
+ */
+export function decodeMesh(buffer: ArrayBuffer): IMeshData | undefined {
+  if (buffer.byteLength < MESH_HEADER_LENGTH * 4) {
+    return;
+  }
+  const header = new Uint32Array(buffer, 0, MESH_HEADER_LENGTH);
+  if (header[0] !== MESH_MAGIC || header[1] !== MESH_FORMAT_VERSION) {
+    return;
+  }
+  const lengths = Array.from(header.subarray(2, MESH_HEADER_LENGTH - 1));
+  const metaLength = header[MESH_HEADER_LENGTH - 1];
+  const byteLength =
+    lengths.reduce((total, length) => total + length * 4, header.byteLength) +
+    metaLength;
+  if (byteLength !== buffer.byteLength) {
+    return;
+  }
+
+  let offset = header.byteLength;
+  const view = <T extends Float32Array | Uint32Array>(
+    type: new (buffer: ArrayBuffer, offset: number, length: number) => T,
+    length: number
+  ): T => {
+    const array = new type(buffer, offset, length);
+    offset += array.byteLength;
+    return array;
+  };
+  const mesh: IMeshData = {
+    faceVertices: view(Float32Array, lengths[0]),
+    faceTriangles: view(Uint32Array, lengths[1]),
+    faceOffsets: view(Uint32Array, lengths[2]),
+    edgeVertices: view(Float32Array, lengths[3]),
+    edgeOffsets: view(Uint32Array, lengths[4])
+  };
+  if (metaLength > 0) {
+    mesh.meta = JSON.parse(
+      new TextDecoder().decode(new Uint8Array(buffer, offset, metaLength))
+    );
+  }
+  return mesh;
+}
+
+/**
+ * Fetch a mesh from the server mesh cache.
+ *
+ * @param key The mesh cache key
+ * @returns The mesh, or undefined if it is not cached
+ */
+export async function fetchCachedMesh(
+  key: string
+): Promise<IMeshData | undefined> {
+  const cached = MESH_CACHE.get(key);
+  if (cached) {
+    rememberMesh(key, cached);
+    return cached;
+  }
+  const settings = ServerConnection.makeSettings();
+  const response = await ServerConnection.makeRequest(
+    meshUrl(key),
+    {},
+    settings
+  );
+  if (!response.ok) {
+    return;
+  }
+  const mesh = decodeMesh(await response.arrayBuffer());
+  if (!mesh) {
+    return;
+  }
+  rememberMesh(key, mesh);
+  return mesh;
+}
+
+/**
+ * Store a mesh in the server mesh cache. Failures are only logged, the
+ * mesh being computed again when needed.
+ *
+ * @param key The mesh cache key
+ * @param mesh The mesh
+ */
+export async function storeCachedMesh(
+  key: string,
+  mesh: IMeshData
+): Promise<void> {
+  const data: IMeshData = {
+    faceVertices: mesh.faceVertices,
+    faceTriangles: mesh.faceTriangles,
+    faceOffsets: mesh.faceOffsets,
+    edgeVertices: mesh.edgeVertices,
+    edgeOffsets: mesh.edgeOffsets,
+    meta: mesh.meta
+  };
+  rememberMesh(key, data);
+  const settings = ServerConnection.makeSettings();
+  try {
+    const response = await ServerConnection.makeRequest(
+      meshUrl(key),
+      {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/octet-stream' },
+        body: encodeMesh(data)
+      },
+      settings
+    );
+    if (!response.ok) {
+      console.warn(`Cannot cache the mesh ${key}: ${response.statusText}`);
+    }
+  } catch (e) {
+    console.warn(`Cannot cache the mesh ${key}`, e);
+  }
+}
+
+/**
+ * The meshes of the objects of a document found in the mesh cache, and the
+ * settings and cache keys of the meshes to compute.
+ */
+export interface ICachedMeshes {
+  meshes: IDict<IMeshData>;
+  meshKeys: IDict<string>;
+  meshSettings: IDict<IMeshSettings>;
+  /**
+   * The coarse meshes of the objects with a progressive tessellation
+   * whose fine mesh is not cached
+   */
+  coarseMeshes: IDict<IMeshData>;
+  coarseKeys: IDict<string>;
+  coarseSettings: IDict<IMeshSettings>;
+}
+
+/**
+ * Fetch the cached meshes of the objects of a document. Failures are only
+ * logged, the meshes being computed instead.
+ *
+ * @param content The document content, with unresolved blob references
+ */
+export async function fetchCachedMeshes(
+  content: IJCadContent
+): Promise<ICachedMeshes> {
+  const cached: ICachedMeshes = {
+    meshes: {},
+    meshKeys: {},
+    meshSettings: {},
+    coarseMeshes: {},
+    coarseKeys: {},
+    coarseSettings: {}
+  };
+  let hashes: IDict<string> = {};
+  try {
+    hashes = await objectHashes(content);
+  } catch (e) {
+    console.warn('Cannot compute the hashes of the objects', e);
+  }
+
+  const fetchMesh = async (
+    name: string,
+    settings: IMeshSettings
+  ): Promise<[string, IMeshData | undefined]> => {
+    const key = await meshCacheKey(hashes[name], settings);
+    try {
+      return [key, await fetchCachedMesh(key)];
+    } catch (e) {
+      console.warn(`Cannot fetch the cached mesh of ${name}`, e);
+      return [key, undefined];
+    }
+  };
+
+  await Promise.all(
+    content.objects.map(async obj => {
+      const { name } = obj;
+      const tessellation = resolveTessellation(content, obj);
+      const settings = meshSettings(tessellation);
+      cached.meshSettings[name] = settings;
+      // Post-processing results are not meshes of shapes
+      if (!(name in hashes) || obj.shape?.startsWith('Post::')) {
+        return;
+      }
+
+      const [key, mesh] = await fetchMesh(name, settings);
+      if (mesh) {
+        cached.meshes[name] = mesh;
+        return;
+      }
+      cached.meshKeys[name] = key;
+      if (!tessellation.progressive) {
+        return;
+      }
+
+      const coarseSettings = meshSettings(tessellation, 'coarse');
+      cached.coarseSettings[name] = coarseSettings;
+      const [coarseKey, coarseMesh] = await fetchMesh(name, coarseSettings);
+      if (coarseMesh) {
+        cached.coarseMeshes[name] = coarseMesh;
+      } else {
+        cached.coarseKeys[name] = coarseKey;
+      }
+    })
+  );
+  return cached;
+}
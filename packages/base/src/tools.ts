@@ -1,3 +1,4 @@
+import { IJCadContent, IJCadObject } from '@jupytercad/schema';
 import { URLExt } from '@jupyterlab/coreutils';
 import { ServerConnection } from '@jupyterlab/services';
 import { LabIcon } from '@jupyterlab/ui-components';
@@ -325,3 +326,86 @@ export async function requestAPI<T>(
 
   return data;
 }
+
+/**
+ * Prefix of the `Part::Any` contents which are references to a blob stored
+ * next to the document on the server.
+ */
+export const BLOB_REF_PREFIX = 'blob:sha256:';
+
+const BLOB_CACHE = new Map<string, Promise<string>>();
+
+/**
+ * Fetch the content referenced by a blob reference.
+ * Blobs are content-addressed, so they are only fetched once.
+ *
+ * @param reference The blob reference
+ * @param filePath The path of the document holding the reference
+ */
+export function fetchBlob(
+  reference: string,
+  filePath: string
+): Promise<string> {
+  let content = BLOB_CACHE.get(reference);
+  if (!content) {
+    if (!filePath) {
+      // The blobs live next to the document on the server
+      return Promise.reject(
+        new Error('A document without a path has no blob store')
+      );
+    }
+    const query = URLExt.objectToQueryString({
+      path: filePath,
+      ref: reference
+    });
+    const settings = ServerConnection.makeSettings();
+    const url = URLExt.join(settings.baseUrl, 'jupytercad', 'blob') + query;
+    content = ServerConnection.makeRequest(url, {}, settings).then(
+      async response => {
+        if (!response.ok) {
+          throw new ServerConnection.ResponseError(response);
+        }
+        return response.text();
+      }
+    );
+    // Do not cache failures, so that the fetch can be retried
+    content.catch(() => BLOB_CACHE.delete(reference));
+    BLOB_CACHE.set(reference, content);
+  }
+  return content;
+}
+
+/**
+ * Returns the document content where blob references are replaced by the
+ * content they point to. The input content is left untouched.
+ *
+ * @param content The document content
+ * @param filePath The path of the document
+ */
+export async function resolveBlobReferences(
+  content: IJCadContent,
+  filePath: string
+): Promise<IJCadContent> {
+  const isReference = (obj: IJCadObject) =>
+    typeof obj.parameters?.Content === 'string' &&
+    obj.parameters.Content.startsWith(BLOB_REF_PREFIX);
+
+  if (!content.objects.some(isReference)) {
+    return content;
+  }
+
+  const objects = await Promise.all(
+    content.objects.map(async obj => {
+      if (!isReference(obj)) {
+        return obj;
+      }
+      const resolved = await fetchBlob(obj.parameters!.Content, filePath);
+      return {
+        ...obj,
+        parameters: { ...obj.parameters, Content: resolved }
+      };
+    })
+  );
+
+  return { ...content, objects };
+}
@@ -2,6 +2,8 @@ import {
   IDict,
   IJCadContent,
   IJCadObject,
+  IMeshData,
+  IParsedShape,
   IPostOperatorInput,
   JCadWorkerSupportedFormat,
   WorkerAction
@@ -9,10 +11,16 @@ import {
 
 import { getShapesFactory, ObjectFile } from './occapi';
 import { OccParser } from './occparser';
-import { IOperatorArg, IOperatorFuncOutput } from './types';
+import {
+  ILoadFile,
+  IOperatorArg,
+  IOperatorFuncOutput,
+  ITransferableOutput
+} from './types';
 
 function buildModel(
-  model: IJCadContent
+  model: IJCadContent,
+  meshes: IDict<IMeshData> = {}
 ): { shapeData: IOperatorFuncOutput; jcObject: IJCadObject }[] {
   const outputModel: {
     shapeData: IOperatorFuncOutput;
@@ -25,6 +33,10 @@ function buildModel(
     if (!shape || !parameters) {
       return;
     }
+    if (meshes[object.name]) {
+      // The mesh is cached, the shape is only built if other objects need it
+      return;
+    }
     const shapeFactory = getShapesFactory();
     let shapeData: IOperatorFuncOutput | undefined = undefined;
 
@@ -73,14 +85,30 @@ function buildModel(
 }
 
 function loadFile(
-  payload: { content: IJCadContent },
-  raiseOnFailure = false
-): IDict | null {
-  const { content } = payload;
-  const outputModel = buildModel(content);
+  payload: ILoadFile['payload'],
+  raiseOnFailure = false,
+  keepFiner: string[] = []
+): IDict {
+  const { content, meshes = {}, meshKeys = {}, meshSettings = {} } = payload;
+  const outputModel = buildModel(content, meshes);
 
   const parser = new OccParser(outputModel);
-  const result = parser.execute(raiseOnFailure);
+  const computed = parser.execute(raiseOnFailure, meshSettings, keepFiner);
+
+  // Merge the cached meshes, in the order of the document objects
+  const result: IDict<IParsedShape> = {};
+  const computedKeys: IDict<string> = {};
+  content.objects.forEach(jcObject => {
+    const { name } = jcObject;
+    if (meshes[name]) {
+      result[name] = { ...meshes[name], jcObject };
+    } else if (computed[name]) {
+      result[name] = computed[name];
+      if (meshKeys[name]) {
+        computedKeys[name] = meshKeys[name];
+      }
+    }
+  });
   const postResult: IDict<IPostOperatorInput> = {};
   outputModel.forEach(item => {
     if (item.jcObject.shape?.startsWith('Post::')) {
@@ -91,7 +119,77 @@ function loadFile(
     }
   });
 
-  return { result, postResult };
+  return { result, postResult, meshKeys: computedKeys };
+}
+
+/**
+ * Returns the buffers of meshes, which are transferred to the main thread.
+ */
+function meshBuffers(meshes: IMeshData[]): ArrayBuffer[] {
+  // Cached meshes share one buffer, which is only transferred once
+  const buffers = new Set<ArrayBuffer>();
+  meshes.forEach(mesh => {
+    [
+      mesh.faceVertices,
+      mesh.faceTriangles,
+      mesh.faceOffsets,
+      mesh.edgeVertices,
+      mesh.edgeOffsets
+    ].forEach(array => buffers.add(array.buffer as ArrayBuffer));
+  });
+  return [...buffers];
+}
+
+/**
+ * Load a document progressively: the objects having coarse tessellation
+ * settings are displayed with a coarse mesh first, and are then refined.
+ * Yields the result of each pass, so that it is displayed before the next
+ * one is computed, with the buffers of its meshes which can be transferred.
+ */
+function* loadFileProgressive(
+  payload: ILoadFile['payload']
+): Generator<ITransferableOutput> {
+  const { coarseSettings = {}, coarseMeshes = {}, coarseKeys = {} } = payload;
+  const coarseNames = Object.keys(coarseSettings);
+  if (coarseNames.length === 0) {
+    const output = loadFile(payload);
+    yield {
+      payload: output,
+      transfer: meshBuffers(Object.values(output.result))
+    };
+    return;
+  }
+
+  const coarse = loadFile(
+    {
+      ...payload,
+      meshes: { ...payload.meshes, ...coarseMeshes },
+      meshKeys: { ...payload.meshKeys, ...coarseKeys },
+      meshSettings: { ...payload.meshSettings, ...coarseSettings }
+    },
+    false,
+    coarseNames
+  );
+  // The other objects have their final mesh already, it is sent again with
+  // the refined meshes and only transferred then
+  const meshes: IDict<IMeshData> = { ...payload.meshes };
+  const coarseResult: IParsedShape[] = [];
+  Object.entries(coarse.result as IDict<IParsedShape>).forEach(
+    ([name, mesh]) => {
+      if (name in coarseSettings) {
+        coarseResult.push(mesh);
+      } else {
+        meshes[name] = mesh;
+      }
+    }
+  );
+  yield { payload: coarse, transfer: meshBuffers(coarseResult) };
+
+  const output = loadFile({ ...payload, meshes });
+  yield {
+    payload: output,
+    transfer: meshBuffers(Object.values(output.result))
+  };
 }
 
 function dryRun(payload: { content: IJCadContent }) {
@@ -101,7 +199,7 @@ function dryRun(payload: { content: IJCadContent }) {
 const WorkerHandler: {
   [key in WorkerAction]: (payload: any) => any;
 } = {} as any;
-WorkerHandler[WorkerAction.LOAD_FILE] = loadFile;
+WorkerHandler[WorkerAction.LOAD_FILE] = loadFileProgressive;
 WorkerHandler[WorkerAction.DRY_RUN] = dryRun;
 
 export default WorkerHandler;
@@ -1,4 +1,5 @@
 import { OCC } from '@jupytercad/opencascade';
+import { unzlibSync } from 'fflate';
 import { v4 as uuid } from 'uuid';
 
 import { getOcc } from './common';
@@ -20,10 +21,42 @@ export function _writeBrep(shape: OCC.TopoDS_Shape): string {
   return value;
 }
 
+/**
+ * Prefix of the compressed `Part::Any` contents, which hold the zlib-compressed
+ * content encoded in base64.
+ */
+export const COMPRESSED_CONTENT_PREFIX = 'zlib:base64:';
+
+/**
+ * Returns the data of a `Part::Any` content, decompressing it if needed.
+ * Compressed contents are returned as bytes, which can be written to the
+ * file system without decoding them.
+ *
+ * @param content The content
+ */
+export function _decodeContent(content: string): string | Uint8Array {
+  if (!content.startsWith(COMPRESSED_CONTENT_PREFIX)) {
+    return content;
+  }
+  const binary = atob(content.slice(COMPRESSED_CONTENT_PREFIX.length));
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return unzlibSync(bytes);
+}
+
 export function _loadBrepFile(content: string): OCC.TopoDS_Shape | undefined {
   const oc = getOcc();
   const fakeFileName = `${uuid()}.brep`;
-  oc.FS.createDataFile('/', fakeFileName, content, true, true, true);
+  oc.FS.createDataFile(
+    '/',
+    fakeFileName,
+    _decodeContent(content),
+    true,
+    true,
+    true
+  );
   const shape = new oc.TopoDS_Shape();
   const builder = new oc.BRep_Builder();
   const progress = new oc.Message_ProgressRange_1();
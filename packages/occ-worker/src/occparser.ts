@@ -1,5 +1,10 @@
 import { OCC } from '@jupytercad/opencascade';
-import { IEdge, IFace, IJCadObject, IParsedShape } from '@jupytercad/schema';
+import {
+  IJCadObject,
+  IMeshData,
+  IMeshSettings,
+  IParsedShape
+} from '@jupytercad/schema';
 
 import { IDict, IOperatorFuncOutput } from './types';
 
@@ -8,6 +13,38 @@ interface IShapeList {
   jcObject: IJCadObject;
 }
 
+/**
+ * The tessellation settings used when none are given.
+ */
+export const DEFAULT_MESH_SETTINGS: IMeshSettings = {
+  linearDeflection: 0.1,
+  angularDeflection: 0.5
+};
+
+/**
+ * The deflections of the triangulation held by each shape. Shapes are
+ * memoized by the operator cache and keep their triangulation, which Open
+ * Cascade does not replace by a coarser one.
+ */
+const TRIANGULATIONS = new WeakMap<OCC.TopoDS_Shape, [number, number]>();
+
+/**
+ * Merge polylines in one buffer of vertices, with the offset of each polyline.
+ */
+function mergePolylines(
+  polylines: Float32Array[]
+): Pick<IMeshData, 'edgeVertices' | 'edgeOffsets'> {
+  const edgeOffsets = new Uint32Array(polylines.length + 1);
+  polylines.forEach((polyline, i) => {
+    edgeOffsets[i + 1] = edgeOffsets[i] + polyline.length / 3;
+  });
+  const edgeVertices = new Float32Array(edgeOffsets[polylines.length] * 3);
+  polylines.forEach((polyline, i) => {
+    edgeVertices.set(polyline, edgeOffsets[i] * 3);
+  });
+  return { edgeVertices, edgeOffsets };
+}
+
 export class OccParser {
   private _shapeList: IShapeList[];
   private _occ: OCC.OpenCascadeInstance = (self as any).occ;
@@ -16,8 +53,19 @@ export class OccParser {
     this._shapeList = shapeList;
   }
 
-  execute(raiseOnFailure = false): IDict<IParsedShape> {
-    const maxDeviation = 0.1;
+  /**
+   * Mesh the shapes.
+   *
+   * @param raiseOnFailure Whether to throw if a shape could not be built
+   * @param meshSettings The tessellation settings of the objects
+   * @param keepFiner The objects displayed with a coarse level of detail,
+   * whose shape keeps its triangulation if it is finer than requested
+   */
+  execute(
+    raiseOnFailure = false,
+    meshSettings: IDict<IMeshSettings> = {},
+    keepFiner: string[] = []
+  ): IDict<IParsedShape> {
     const threejsData: IDict<IParsedShape> = {};
     this._shapeList.forEach(data => {
       const { shapeData, jcObject } = data;
@@ -29,28 +77,42 @@ export class OccParser {
           return;
         }
       }
+      let [linearDeflection, angularDeflection] = this._deflections(
+        occShape,
+        meshSettings[jcObject.name] ?? DEFAULT_MESH_SETTINGS
+      );
+      const previous = TRIANGULATIONS.get(occShape);
+      if (
+        previous &&
+        (previous[0] < linearDeflection || previous[1] < angularDeflection)
+      ) {
+        if (keepFiner.includes(jcObject.name)) {
+          [linearDeflection, angularDeflection] = previous;
+        } else {
+          this._occ.BRepTools.Clean(occShape, true);
+        }
+      }
+      TRIANGULATIONS.set(occShape, [linearDeflection, angularDeflection]);
       new this._occ.BRepMesh_IncrementalMesh_2(
         occShape,
-        maxDeviation,
+        linearDeflection,
         false,
-        maxDeviation * 5,
+        angularDeflection,
         true
       );
-      const faceList = this._build_face_mesh(occShape);
-      let edgeList: IEdge[] = [];
+      let polylines: Float32Array[] = [];
       if (this._shouldComputeEdge(jcObject)) {
-        edgeList = this._build_edge_mesh(occShape);
+        polylines = this._build_edge_mesh(occShape);
       }
-      let wireList: IEdge[] = [];
       if (this._shouldComputeWire(jcObject)) {
         //Only compute the wire mesh for 2d geometries
-        wireList = this._build_wire_mesh(occShape, maxDeviation);
+        polylines.push(...this._build_wire_mesh(occShape, linearDeflection));
       }
 
       threejsData[jcObject.name] = {
         jcObject,
-        faceList,
-        edgeList: [...edgeList, ...wireList],
+        ...this._build_face_mesh(occShape),
+        ...mergePolylines(polylines),
         meta: metadata
       };
     });
@@ -58,6 +120,31 @@ export class OccParser {
     return threejsData;
   }
 
+  /**
+   * Returns the linear and angular deflections of the mesh of a shape, the
+   * linear deflection being derived from the bounding box of the shape if it
+   * is relative.
+   */
+  private _deflections(
+    shape: OCC.TopoDS_Shape,
+    settings: IMeshSettings
+  ): [number, number] {
+    const { relativeDeflection, angularDeflection } = settings;
+    let linearDeflection =
+      settings.linearDeflection ?? DEFAULT_MESH_SETTINGS.linearDeflection!;
+    if (relativeDeflection !== undefined) {
+      const box = new this._occ.Bnd_Box_1();
+      this._occ.BRepBndLib.Add(shape, box, false);
+      if (!box.IsVoid()) {
+        const diagonal = Math.sqrt(box.SquareExtent());
+        if (diagonal > 0) {
+          linearDeflection = diagonal * relativeDeflection;
+        }
+      }
+    }
+    return [linearDeflection, angularDeflection];
+  }
+
   private _shouldComputeEdge(obj: IJCadObject): boolean {
     if (obj.shape === 'Part::Any' && obj.parameters?.Type === 'STL') {
       return false;
@@ -74,8 +161,8 @@ export class OccParser {
   private _build_wire_mesh(
     shape: OCC.TopoDS_Shape,
     maxDeviation: number
-  ): Array<IEdge> {
-    const edgeList: Array<IEdge> = [];
+  ): Float32Array[] {
+    const polylines: Float32Array[] = [];
     const oc = this._occ;
     const expl = new oc.TopExp_Explorer_2(
       shape,
@@ -101,8 +188,9 @@ export class OccParser {
         1.0e-9,
         1.0e-7
       );
-      const vertexCoord = new Array(tangDef.NbPoints() * 3);
-      for (let j = 0; j < tangDef.NbPoints(); j++) {
+      const nbPoints = tangDef.NbPoints();
+      const vertexCoord = new Float32Array(nbPoints * 3);
+      for (let j = 0; j < nbPoints; j++) {
         const vertex = tangDef
           .Value(j + 1)
           .Transformed(aLocation.Transformation());
@@ -110,22 +198,30 @@ export class OccParser {
         vertexCoord[j * 3 + 1] = vertex.Y();
         vertexCoord[j * 3 + 2] = vertex.Z();
       }
-      edgeList.push({ vertexCoord, numberOfCoords: tangDef.NbPoints() * 3 });
+      polylines.push(vertexCoord);
       expl.Next();
     }
-    return edgeList;
+    return polylines;
   }
 
-  private _build_face_mesh(shape: OCC.TopoDS_Shape): Array<IFace> {
-    const faceList: Array<IFace> = [];
-    const triangulations: Array<OCC.Handle_Poly_Triangulation> = [];
+  private _build_face_mesh(
+    shape: OCC.TopoDS_Shape
+  ): Pick<IMeshData, 'faceVertices' | 'faceTriangles' | 'faceOffsets'> {
     const oc = this._occ;
+    const faces: {
+      face: OCC.TopoDS_Face;
+      location: OCC.TopLoc_Location;
+      triangulation: OCC.Handle_Poly_Triangulation;
+    }[] = [];
+    let nbNodes = 0;
+    let nbTriangles = 0;
     const expl = new oc.TopExp_Explorer_2(
       shape,
       oc.TopAbs_ShapeEnum.TopAbs_FACE as any,
       oc.TopAbs_ShapeEnum.TopAbs_SHAPE as any
     );
 
+    // Count the nodes and triangles first, to fill the buffers in place
     expl.Init(
       shape,
       oc.TopAbs_ShapeEnum.TopAbs_FACE as any,
@@ -133,39 +229,39 @@ export class OccParser {
     );
     while (expl.More()) {
       const face = oc.TopoDS.Face_1(expl.Current());
-      const aLocation = new oc.TopLoc_Location_1();
-      const myT = oc.BRep_Tool.Triangulation(face, aLocation, 0);
+      const location = new oc.TopLoc_Location_1();
+      const myT = oc.BRep_Tool.Triangulation(face, location, 0);
       if (myT.IsNull()) {
         console.error('Encountered Null Face!');
         expl.Next();
         continue;
       }
-      const thisFace: IFace = {
-        vertexCoord: [],
-        triIndexes: [],
-        numberOfTriangles: 0
-      };
-      const triangulation = myT.get();
-      const nbNodes = triangulation.NbNodes();
+      faces.push({ face, location, triangulation: myT });
+      nbNodes += myT.get().NbNodes();
+      nbTriangles += myT.get().NbTriangles();
+      expl.Next();
+    }
 
-      thisFace.vertexCoord = new Array(nbNodes * 3);
-      for (let i = 0; i < nbNodes; i++) {
-        const p = triangulation
-          .Node(i + 1)
-          .Transformed(aLocation.Transformation());
-        thisFace.vertexCoord[i * 3 + 0] = p.X();
-        thisFace.vertexCoord[i * 3 + 1] = p.Y();
-        thisFace.vertexCoord[i * 3 + 2] = p.Z();
+    const faceVertices = new Float32Array(nbNodes * 3);
+    const faceTriangles = new Uint32Array(nbTriangles * 3);
+    const faceOffsets = new Uint32Array(faces.length + 1);
+    let vertexIndex = 0;
+    let triangleIndex = 0;
+    faces.forEach(({ face, location, triangulation: myT }, faceIndex) => {
+      const triangulation = myT.get();
+      const transformation = location.Transformation();
+      const faceNodes = triangulation.NbNodes();
+      for (let i = 0; i < faceNodes; i++) {
+        const p = triangulation.Node(i + 1).Transformed(transformation);
+        const j = (vertexIndex + i) * 3;
+        faceVertices[j + 0] = p.X();
+        faceVertices[j + 1] = p.Y();
+        faceVertices[j + 2] = p.Z();
       }
 
       const orient = face.Orientation_1();
-
-      const nbTriangles = triangulation.NbTriangles();
-
-      // Write triangle buffer
-      thisFace.triIndexes = new Array(nbTriangles * 3);
-      let validFaceTriCount = 0;
-      for (let nt = 1; nt <= myT.get().NbTriangles(); nt++) {
+      const faceTriangleCount = triangulation.NbTriangles();
+      for (let nt = 1; nt <= faceTriangleCount; nt++) {
         const t = triangulation.Triangle(nt);
         let n1 = t.Value(1);
         let n2 = t.Value(2);
@@ -176,22 +272,22 @@ export class OccParser {
           n2 = tmp;
         }
 
-        thisFace.triIndexes[validFaceTriCount * 3 + 0] = n1 - 1;
-        thisFace.triIndexes[validFaceTriCount * 3 + 1] = n2 - 1;
-        thisFace.triIndexes[validFaceTriCount * 3 + 2] = n3 - 1;
-        validFaceTriCount++;
+        // Triangulation nodes start at 1
+        const j = triangleIndex * 3;
+        faceTriangles[j + 0] = vertexIndex + n1 - 1;
+        faceTriangles[j + 1] = vertexIndex + n2 - 1;
+        faceTriangles[j + 2] = vertexIndex + n3 - 1;
+        triangleIndex++;
       }
-      thisFace.numberOfTriangles = validFaceTriCount;
-      faceList.push(thisFace);
-      triangulations.push(myT);
-      expl.Next();
-    }
-    return faceList;
+      vertexIndex += faceNodes;
+      faceOffsets[faceIndex + 1] = triangleIndex;
+    });
+    return { faceVertices, faceTriangles, faceOffsets };
   }
 
-  private _build_edge_mesh(shape: OCC.TopoDS_Shape): IEdge[] {
+  private _build_edge_mesh(shape: OCC.TopoDS_Shape): Float32Array[] {
     const oc = this._occ;
-    const edgeList: IEdge[] = [];
+    const polylines: Float32Array[] = [];
     const mapOfShape = new oc.TopTools_IndexedMapOfShape_1();
     oc.TopExp.MapShapes_1(
       shape,
@@ -217,28 +313,20 @@ export class OccParser {
       const aLoc = new oc.TopLoc_Location_1();
       const aPoly = oc.BRep_Tool.Polygon3D(anEdge, aLoc);
 
-      const theEdge: IEdge = {
-        vertexCoord: [],
-        numberOfCoords: 0
-      };
-      let nbNodesInFace: number;
+      let vertexCoord: Float32Array;
       if (!aPoly.IsNull()) {
         if (!aLoc.IsIdentity()) {
           myTransf = aLoc.Transformation();
         }
-        const poly = aPoly.get();
-
-        nbNodesInFace = poly.NbNodes();
-
-        theEdge.numberOfCoords = nbNodesInFace;
-        theEdge.vertexCoord = new Array(nbNodesInFace * 3);
+        const nbNodesInFace = aPoly.get().NbNodes();
+        vertexCoord = new Float32Array(nbNodesInFace * 3);
         const nodeListOfEdge = aPoly.get().Nodes();
         for (let ii = 0; ii < nbNodesInFace; ii++) {
           const V = nodeListOfEdge.Value(ii + 1);
           V.Transform(myTransf);
-          theEdge.vertexCoord[ii * 3 + 0] = V.X();
-          theEdge.vertexCoord[ii * 3 + 1] = V.Y();
-          theEdge.vertexCoord[ii * 3 + 2] = V.Z();
+          vertexCoord[ii * 3 + 0] = V.X();
+          vertexCoord[ii * 3 + 1] = V.Y();
+          vertexCoord[ii * 3 + 2] = V.Z();
         }
       } else {
         const aFace = oc.TopoDS.Face_1(edgeMap.FindFromIndex(iEdge).First_1());
@@ -254,9 +342,7 @@ export class OccParser {
         if (aPoly.IsNull()) {
           continue;
         }
-        nbNodesInFace = aPoly.get().NbNodes();
-        theEdge.numberOfCoords = nbNodesInFace;
-        theEdge.vertexCoord = new Array(nbNodesInFace * 3);
+        vertexCoord = new Float32Array(aPoly.get().NbNodes() * 3);
 
         const indices = aPoly.get().Nodes();
         const nodeListOfFace = aPolyTria.get();
@@ -264,15 +350,15 @@ export class OccParser {
         for (let jj = indices.Lower(); jj <= indices.Upper(); jj++) {
           const v = nodeListOfFace.Node(indices.Value(jj));
           v.Transform(myTransf);
-          const locIndex = jj - 1;
+          const locIndex = jj - indices.Lower();
 
-          theEdge.vertexCoord[locIndex * 3 + 0] = v.X();
-          theEdge.vertexCoord[locIndex * 3 + 1] = v.Y();
-          theEdge.vertexCoord[locIndex * 3 + 2] = v.Z();
+          vertexCoord[locIndex * 3 + 0] = v.X();
+          vertexCoord[locIndex * 3 + 1] = v.Y();
+          vertexCoord[locIndex * 3 + 2] = v.Z();
         }
       }
-      edgeList.push(theEdge);
+      polylines.push(vertexCoord);
     }
-    return edgeList;
+    return polylines;
   }
 }
@@ -11,6 +11,8 @@ import {
   IFuse,
   IIntersection,
   IJCadContent,
+  IMeshData,
+  IMeshSettings,
   IPostOperator,
   IShapeMetadata,
   ISketchObject,
@@ -37,6 +39,26 @@ export interface ILoadFile extends IWorkerMessageBase {
   action: WorkerAction.LOAD_FILE;
   payload: {
     content: IJCadContent;
+    /**
+     * The cached meshes of objects, which are not computed again
+     */
+    meshes?: IDict<IMeshData>;
+    /**
+     * The mesh cache keys of the objects whose mesh is not cached
+     */
+    meshKeys?: IDict<string>;
+    /**
+     * The tessellation settings of the objects
+     */
+    meshSettings?: IDict<IMeshSettings>;
+    /**
+     * The coarse tessellation settings of the objects displayed with a coarse
+     * mesh first, with their cached coarse meshes and the mesh cache keys of
+     * the others
+     */
+    coarseSettings?: IDict<IMeshSettings>;
+    coarseMeshes?: IDict<IMeshData>;
+    coarseKeys?: IDict<string>;
   };
 }
 
@@ -50,6 +72,15 @@ export interface IDryRun extends IWorkerMessageBase {
 
 export type IWorkerMessage = ILoadFile | IRegister | IDryRun;
 
+/**
+ * A result of the worker, with the buffers transferred to the main thread
+ * instead of being copied.
+ */
+export interface ITransferableOutput {
+  payload: IDict;
+  transfer: ArrayBuffer[];
+}
+
 export interface IOperatorFuncOutput {
   occShape?: OCC.TopoDS_Shape;
   metadata?: IShapeMetadata | undefined;
@@ -27,9 +27,13 @@ const registerWorker = async (id: string, port: MessagePort) => {
   }
 };
 
-const sendToMain = (msg: IMainMessage, id: string) => {
+const sendToMain = (
+  msg: IMainMessage,
+  id: string,
+  transfer: ArrayBuffer[] = []
+) => {
   if (id in ports) {
-    ports[id].postMessage(msg);
+    ports[id].postMessage(msg, transfer);
   }
 };
 
@@ -44,15 +48,19 @@ self.onmessage = async (event: MessageEvent): Promise<void> => {
       break;
     }
     case WorkerAction.LOAD_FILE: {
-      const result = WorkerHandler[message.action](message.payload);
-
-      sendToMain(
-        {
-          action: MainAction.DISPLAY_SHAPE,
-          payload: result
-        },
-        id
-      );
+      // Coarse meshes are displayed before the refined ones are computed
+      for (const { payload, transfer } of WorkerHandler[message.action](
+        message.payload
+      )) {
+        sendToMain(
+          {
+            action: MainAction.DISPLAY_SHAPE,
+            payload
+          },
+          id,
+          transfer
+        );
+      }
       break;
     }
     case WorkerAction.DRY_RUN: {
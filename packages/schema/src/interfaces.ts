@@ -221,21 +221,51 @@ export interface IAnnotation {
   parent: string;
 }
 
-export interface IFace {
-  vertexCoord: Array<number>;
-  triIndexes: Array<number>;
-  numberOfTriangles: number;
+/**
+ * The mesh of an object, as displayed by the 3D view. The faces share one
+ * buffer of vertices and one of triangles, and the edge polylines one buffer
+ * of vertices, so that meshes are transferred from the worker without copies.
+ * This is also the content of the binary meshes of the mesh cache.
+ */
+export interface IMeshData {
+  /**
+   * The vertex coordinates of the faces, x, y and z for each vertex
+   */
+  faceVertices: Float32Array;
+  /**
+   * The indices of the vertices of each triangle, 3 for each triangle
+   */
+  faceTriangles: Uint32Array;
+  /**
+   * The index of the first triangle of each face, followed by the number of
+   * triangles
+   */
+  faceOffsets: Uint32Array;
+  /**
+   * The vertex coordinates of the edge polylines, x, y and z for each vertex
+   */
+  edgeVertices: Float32Array;
+  /**
+   * The index of the first vertex of each edge, followed by the number of
+   * vertices
+   */
+  edgeOffsets: Uint32Array;
+  meta?: IDict;
 }
 
-export interface IEdge {
-  vertexCoord: number[];
-  numberOfCoords: number;
+/**
+ * The tessellation settings of a mesh, resolved from the `ITessellation` of
+ * the document and of its object. The linear deflection is either absolute,
+ * or relative to the bounding box diagonal of the shape.
+ */
+export interface IMeshSettings {
+  linearDeflection?: number;
+  relativeDeflection?: number;
+  angularDeflection: number;
 }
-export interface IParsedShape {
+
+export interface IParsedShape extends IMeshData {
   jcObject: IJCadObject;
-  faceList: Array<IFace>;
-  edgeList: Array<IEdge>;
-  meta?: IDict;
 }
 
 export interface IPostOperatorInput {
@@ -274,6 +304,10 @@ export interface IDisplayShape extends IMainMessageBase {
   payload: {
     result: IDict<IParsedShape>;
     postResult: IDict<IPostOperatorInput>;
+    /**
+     * The mesh cache keys of the meshes computed by the worker
+     */
+    meshKeys?: IDict<string>;
   };
 }
 
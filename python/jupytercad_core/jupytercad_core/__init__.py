@@ -22,7 +22,16 @@ def _load_jupyter_server_extension(server_app):
     server_app: jupyterlab.labapp.LabApp
         JupyterLab application instance
     """
-    from .handlers import setup_handlers
+    from .handlers import setup_handlers, shutdown_handlers
 
     setup_handlers(server_app.web_app)
+
+    # Only extension apps get a stop hook, run ours with the server cleanup
+    cleanup_extensions = server_app.cleanup_extensions
+
+    async def cleanup():
+        await cleanup_extensions()
+        shutdown_handlers(server_app.web_app)
+
+    server_app.cleanup_extensions = cleanup
     server_app.log.info("Registered jupytercad server extension")
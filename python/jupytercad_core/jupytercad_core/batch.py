@@ -0,0 +1,305 @@
+"""
+Headless evaluation and export of jcad documents.
+
+The shapes of each document are evaluated with Open Cascade, see
+:mod:`jupytercad_core.evaluation`, and its visible objects are exported to
+STEP, STL or glTF files. Documents are processed concurrently, each one in its
+own process, so that a document which does not finish in time can be stopped.
+"""
+
+import json
+import os
+import tempfile
+import time
+import traceback
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .blobstore import BlobStore
+from .evaluation import ShapeEvaluator, write_step
+from .jcadz import load_jcadz
+from .mesh import (
+    linear_deflection as shape_linear_deflection,
+    merge_meshes,
+    mesh_settings,
+    mesh_to_glb,
+    resolve_tessellation,
+    tessellate,
+)
+from .stl import mesh_to_binary
+
+# The export formats and the extension of their files
+EXPORT_FORMATS = {"step": ".step", "stl": ".stl", "gltf": ".glb"}
+
+DOCUMENT_SUFFIXES = (".jcad", ".jcadz")
+
+
+def collect_documents(paths: Iterable[Union[str, Path]]) -> List[Tuple[Path, str]]:
+    """
+    Returns the documents to process, with the path of their exports relative
+    to the output directory, without extension.
+
+    :param paths: Documents, or directories which are searched recursively for
+    documents. The exports of the documents found in a directory keep their
+    path relative to the directory.
+    """
+    documents: Dict[str, Path] = {}
+    for path in map(Path, paths):
+        if path.is_dir():
+            found = [
+                (source, source.relative_to(path).with_suffix("").as_posix())
+                for source in sorted(path.rglob("*"))
+                if source.suffix.lower() in DOCUMENT_SUFFIXES and source.is_file()
+            ]
+        elif path.is_file():
+            found = [(path, path.stem)]
+        else:
+            raise ValueError(f"No such file or directory: {path}")
+        for source, stem in found:
+            if stem in documents and documents[stem] != source:
+                raise ValueError(
+                    f"{source} and {documents[stem]} would be exported to the "
+                    "same files"
+                )
+            documents[stem] = source
+    return [(source, stem) for stem, source in documents.items()]
+
+
+def load_document(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Returns the content of a ``.jcad`` or ``.jcadz`` document.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".jcadz":
+        return load_jcadz(path)
+    with open(path, "r", encoding="utf-8") as fobj:
+        return json.load(fobj)
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=f"{path.suffix}.tmp")
+    try:
+        with os.fdopen(fd, "wb") as fobj:
+            fobj.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def export_document(
+    path: Union[str, Path],
+    output: Union[str, Path],
+    formats: Sequence[str] = ("step",),
+    linear_deflection: Optional[float] = None,
+    angular_deflection: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate a document and export its visible objects.
+    You need `pythonocc-core` installed in order to use this function.
+
+    :param path: The path of the document.
+    :param output: The path of the exported files, without extension.
+    :param formats: The export formats, see :data:`EXPORT_FORMATS`.
+    :param linear_deflection: The linear deflection of the STL and glTF meshes.
+    By default, the tessellation settings of each object in the document are used,
+    see :func:`jupytercad_core.mesh.resolve_tessellation`.
+    :param angular_deflection: The angular deflection of the STL and glTF
+    meshes, in radians. By default, the settings of each object are used.
+    :return: The number of exported ``objects``, the objects which could
+    not be built (``failed``) and the path of the file of each format
+    (``outputs``).
+    """
+    for export_format in formats:
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {export_format}")
+    path, output = Path(path), Path(output)
+    content = load_document(path)
+    objects = content["objects"]
+    evaluator = ShapeEvaluator(
+        max_size=None, resolve_content=BlobStore.for_document(path).get
+    )
+    names = [obj["name"] for obj in objects if obj.get("visible", True)]
+    shapes = evaluator.evaluate(objects, names)
+    built = {name: shape for name, shape in shapes.items() if shape is not None}
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    outputs: Dict[str, str] = {}
+    if "step" in formats:
+        target = output.with_suffix(EXPORT_FORMATS["step"])
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".step.tmp")
+        os.close(fd)
+        try:
+            write_step(built.values(), tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        outputs["step"] = str(target)
+
+    if "stl" in formats or "gltf" in formats:
+        options = content.get("options")
+        by_name = {obj["name"]: obj for obj in objects}
+        meshes = {}
+        for name, shape in built.items():
+            settings = mesh_settings(resolve_tessellation(options, by_name[name]))
+            meshes[name] = tessellate(
+                shape,
+                (
+                    shape_linear_deflection(shape, settings)
+                    if linear_deflection is None
+                    else linear_deflection
+                ),
+                (
+                    settings["angularDeflection"]
+                    if angular_deflection is None
+                    else angular_deflection
+                ),
+            )
+        if "stl" in formats:
+            target = output.with_suffix(EXPORT_FORMATS["stl"])
+            _write_file(target, mesh_to_binary(*merge_meshes(list(meshes.values()))))
+            outputs["stl"] = str(target)
+        if "gltf" in formats:
+            colors = {
+                obj["name"]: obj.get("parameters", {}).get("Color") for obj in objects
+            }
+            target = output.with_suffix(EXPORT_FORMATS["gltf"])
+            _write_file(
+                target,
+                mesh_to_glb(
+                    [
+                        dict(
+                            name=name,
+                            vertices=vertices,
+                            triangles=triangles,
+                            color=colors.get(name),
+                        )
+                        for name, (vertices, triangles) in meshes.items()
+                    ]
+                ),
+            )
+            outputs["gltf"] = str(target)
+
+    return dict(
+        objects=len(built),
+        failed=[name for name in names if name not in built],
+        outputs=outputs,
+    )
+
+
+def _export_job(connection: Connection, *args) -> None:
+    """
+    Export a document in a worker process, sending the result to the parent.
+    """
+    try:
+        result = dict(status="ok", **export_document(*args))
+        if result["failed"]:
+            result["status"] = "incomplete"
+    except Exception as e:
+        result = dict(
+            status="error",
+            error=f"{type(e).__name__}: {e}",
+            traceback=traceback.format_exc(),
+        )
+    connection.send(result)
+    connection.close()
+
+
+def run_batch(
+    paths: Iterable[Union[str, Path]],
+    output_dir: Union[str, Path],
+    formats: Sequence[str] = ("step",),
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    linear_deflection: Optional[float] = None,
+    angular_deflection: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate and export documents concurrently, each document in its own
+    worker process.
+
+    :param paths: The documents, or directories of documents, see
+    :func:`collect_documents`.
+    :param output_dir: The directory of the exported files.
+    :param formats: The export formats, see :data:`EXPORT_FORMATS`.
+    :param max_workers: The number of documents processed at the same time,
+    the number of CPUs by default.
+    :param timeout: The maximum time to process a document, in seconds. The
+    worker process is stopped after this time.
+    :param linear_deflection: The linear deflection of the meshes, see
+    :func:`export_document`. The document settings by default.
+    :param angular_deflection: The angular deflection of the meshes, in radians.
+    The document settings by default.
+    :return: A report per document, holding its ``document`` path, its
+    ``status`` (``ok``, ``incomplete`` if some objects could not be built,
+    ``error`` or ``timeout``) and ``duration``, and the result of
+    :func:`export_document` or the ``error``.
+    """
+    jobs = collect_documents(paths)
+    max_workers = max_workers or os.cpu_count() or 1
+    reports: List[Dict[str, Any]] = [dict(document=str(source)) for source, _ in jobs]
+    pending = list(reversed(range(len(jobs))))
+    # The running jobs, by the connection receiving their result
+    running: Dict[Connection, Tuple[int, Process, float]] = {}
+
+    def finish(connection: Connection, result: Dict[str, Any]) -> None:
+        index, process, start = running.pop(connection)
+        process.join(1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        connection.close()
+        reports[index].update(duration=round(time.monotonic() - start, 3), **result)
+
+    while pending or running:
+        while pending and len(running) < max_workers:
+            index = pending.pop()
+            source, stem = jobs[index]
+            receiver, sender = Pipe(duplex=False)
+            process = Process(
+                target=_export_job,
+                args=(
+                    sender,
+                    source,
+                    Path(output_dir) / stem,
+                    formats,
+                    linear_deflection,
+                    angular_deflection,
+                ),
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            running[receiver] = (index, process, time.monotonic())
+
+        wait_time = None
+        if timeout is not None:
+            deadline = min(start for _, _, start in running.values()) + timeout
+            wait_time = max(0, deadline - time.monotonic())
+        for connection in wait(list(running), wait_time):
+            try:
+                result = connection.recv()
+            except EOFError:
+                # The process exited without a result
+                _, process, _ = running[connection]
+                process.join()
+                result = dict(
+                    status="error",
+                    error=f"The worker process exited with code {process.exitcode}",
+                )
+            finish(connection, result)
+
+        if timeout is not None:
+            now = time.monotonic()
+            for connection, (_, process, start) in list(running.items()):
+                if now - start >= timeout:
+                    process.kill()
+                    finish(
+                        connection,
+                        dict(status="timeout", error=f"Timed out after {timeout}s"),
+                    )
+
+    return reports
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+BLOB_DIR_NAME = ".jcad_blobs"
+BLOB_REF_PREFIX = "blob:sha256:"
+
+# Payloads smaller than this are kept inline in the document
+DEFAULT_BLOB_THRESHOLD = 64 * 1024
+
+
+def is_blob_reference(content: object) -> bool:
+    """
+    Whether a `Part::Any` content is a reference to a blob.
+    """
+    return isinstance(content, str) and content.startswith(BLOB_REF_PREFIX)
+
+
+def blob_key(reference: str) -> str:
+    """
+    Returns the hash of the blob referenced by `reference`.
+    """
+    if not is_blob_reference(reference):
+        raise ValueError(f"{reference[:32]!r} is not a blob reference")
+    return reference[len(BLOB_REF_PREFIX) :]
+
+
+class BlobStore:
+    """
+    A content-addressed store for large `Part::Any` payloads.
+
+    Payloads are written once in `root`, keyed by their SHA-256 hash, and
+    documents only hold a `blob:sha256:<hash>` reference to them.
+
+    :param root: The directory holding the blobs.
+    :param threshold: The minimum payload size (in bytes) to move into the store.
+    """
+
+    def __init__(self, root: Union[str, Path], threshold: int = DEFAULT_BLOB_THRESHOLD):
+        self.root = Path(root)
+        self.threshold = threshold
+
+    @classmethod
+    def for_document(cls, path: Union[str, Path], **kwargs) -> "BlobStore":
+        """
+        Returns the blob store living next to the document at `path`.
+        """
+        return cls(Path(path).resolve().parent / BLOB_DIR_NAME, **kwargs)
+
+    def path(self, key: str) -> Path:
+        if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+            raise ValueError(f"Invalid blob key {key!r}")
+        return self.root / key[:2] / key
+
+    def __contains__(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def put(self, content: str) -> str:
+        """
+        Store `content` and returns a reference to it.
+        Storing an already known content does not write anything.
+        """
+        data = content.encode("utf-8")
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path(key)
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write in a temporary file first so that readers never see
+            # a partially written blob
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+            try:
+                with os.fdopen(fd, "wb") as fobj:
+                    fobj.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return BLOB_REF_PREFIX + key
+
+    def maybe_put(self, content: str) -> str:
+        """
+        Store `content` if it is larger than the store threshold.
+        Returns either a reference to the blob or `content` itself.
+        """
+        if len(content) < self.threshold:
+            return content
+        return self.put(content)
+
+    def get(self, reference: str) -> str:
+        """
+        Returns the content referenced by `reference`.
+        """
+        # Read the bytes, as text mode would translate the newlines
+        with open(self.path(blob_key(reference)), "rb") as fobj:
+            return fobj.read().decode("utf-8")
+
+    def resolve(self, content: str) -> str:
+        """
+        Returns `content` itself, or the content it references if it is a
+        blob reference.
+        """
+        if is_blob_reference(content):
+            return self.get(content)
+        return content
+
+
+def open_blob_store(document_path: Optional[Union[str, Path]], **kwargs) -> BlobStore:
+    """
+    Returns the blob store of the document at `document_path`.
+
+    Documents which are not saved on disk have no blob store: the kernel and the
+    server would not agree on its location.
+    """
+    if not document_path:
+        raise ValueError(
+            "A document without a path has no blob store, save it first or "
+            "pass a BlobStore explicitly"
+        )
+    return BlobStore.for_document(document_path, **kwargs)
@@ -0,0 +1,115 @@
+"""
+The ``jupytercad`` command line interface.
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from .batch import EXPORT_FORMATS, run_batch
+
+
+def _batch(args: argparse.Namespace) -> int:
+    try:
+        reports = run_batch(
+            args.documents,
+            args.output,
+            formats=args.formats or ["step"],
+            max_workers=args.jobs,
+            timeout=args.timeout,
+            linear_deflection=args.linear_deflection,
+            angular_deflection=args.angular_deflection,
+        )
+    except ValueError as e:
+        print(f"jupytercad batch: {e}", file=sys.stderr)
+        return 2
+
+    for report in reports:
+        message = f"{report['status']:<10} {report['document']}"
+        if "error" in report:
+            message += f": {report['error']}"
+        elif report.get("failed"):
+            message += f": cannot build {', '.join(report['failed'])}"
+        print(message, file=sys.stderr)
+
+    content = json.dumps(reports, indent=2)
+    if args.report == "-":
+        print(content)
+    else:
+        with open(args.report, "w", encoding="utf-8") as fobj:
+            fobj.write(content)
+    return 0 if all(report["status"] == "ok" for report in reports) else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="jupytercad")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    batch = commands.add_parser(
+        "batch",
+        help="evaluate and export documents",
+        description=(
+            "Evaluate the geometry of jcad documents with pythonocc-core, and "
+            "export their visible objects. Documents are processed in parallel, "
+            "each one in its own process."
+        ),
+    )
+    batch.add_argument(
+        "documents",
+        nargs="+",
+        help="the .jcad or .jcadz documents, or directories searched for documents",
+    )
+    batch.add_argument(
+        "-o",
+        "--output",
+        default=".",
+        help="the directory of the exported files (default: %(default)s)",
+    )
+    batch.add_argument(
+        "-f",
+        "--format",
+        dest="formats",
+        action="append",
+        choices=list(EXPORT_FORMATS),
+        help="an export format, can be repeated (default: step)",
+    )
+    batch.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="the number of documents processed at the same time "
+        "(default: the number of CPUs)",
+    )
+    batch.add_argument(
+        "--timeout",
+        type=float,
+        help="the maximum time to process a document, in seconds",
+    )
+    batch.add_argument(
+        "--report",
+        default="-",
+        help="the path of the JSON report, - for the standard output "
+        "(default: %(default)s)",
+    )
+    batch.add_argument(
+        "--linear-deflection",
+        type=float,
+        help="the linear deflection of the meshes, overriding the tessellation "
+        "settings of the documents",
+    )
+    batch.add_argument(
+        "--angular-deflection",
+        type=float,
+        help="the angular deflection of the meshes, in radians, overriding the "
+        "tessellation settings of the documents",
+    )
+    batch.set_defaults(run=_batch)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+Compressed ``Part::Any`` contents.
+
+Text payloads like BREP data can be stored compressed in a document, as
+``zlib:base64:<data>``, ``<data>`` being the zlib-compressed UTF-8 content
+encoded in base64. The OCC worker decompresses them when loading the shape.
+"""
+
+import base64
+import zlib
+
+COMPRESSED_CONTENT_PREFIX = "zlib:base64:"
+
+
+def is_compressed_content(content: object) -> bool:
+    """
+    Whether a `Part::Any` content is compressed.
+    """
+    return isinstance(content, str) and content.startswith(COMPRESSED_CONTENT_PREFIX)
+
+
+def compress_content(content: str, level: int = 6) -> str:
+    """
+    Returns the compressed form of a `Part::Any` content.
+
+    :param content: The content to compress.
+    :param level: The zlib compression level, from 1 (fastest) to 9 (smallest).
+    """
+    data = zlib.compress(content.encode("utf-8"), level)
+    return COMPRESSED_CONTENT_PREFIX + base64.b64encode(data).decode("ascii")
+
+
+def decompress_content(content: str) -> str:
+    """
+    Returns the original form of a `Part::Any` content, which is returned as
+    is if it is not compressed.
+    """
+    if not is_compressed_content(content):
+        return content
+    data = base64.b64decode(content[len(COMPRESSED_CONTENT_PREFIX) :])
+    return zlib.decompress(data).decode("utf-8")
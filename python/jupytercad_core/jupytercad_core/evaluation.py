@@ -0,0 +1,864 @@
+"""
+Evaluation of the shapes of a jcad document with Open Cascade.
+
+The shapes are built like in the OCC worker, using ``pythonocc-core`` which is
+an optional dependency. Each shape is memoized by the hash of its operator
+subtree, i.e. its parameters and the hashes of the shapes it is computed from,
+so that after a modification only the modified objects and the objects
+depending on them are recomputed.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Executor, Future, wait
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Union
+
+from .blobstore import BLOB_REF_PREFIX, is_blob_reference
+from .compression import decompress_content
+from .graph import OPERATOR_DEPENDENCIES, DependencyGraph
+
+logger = logging.getLogger(__name__)
+
+# The parameters which do not change the geometry of a shape
+NON_GEOMETRIC_PARAMETERS = frozenset(("Color",))
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def _js_number(value: float) -> str:
+    """
+    Format a number like JavaScript does, so that hashes can be computed the
+    same way in the browser.
+    """
+    if not math.isfinite(value):
+        return "null"
+    if value == 0:
+        return "0"
+    # The shortest representation of the number, as in JavaScript
+    sign, digits, exponent = Decimal(repr(float(value))).normalize().as_tuple()
+    digits = "".join(map(str, digits))
+    sign = "-" if sign else ""
+    count = len(digits)
+    point = exponent + count  # The position of the decimal point
+    if count <= point <= 21:
+        return sign + digits + "0" * (point - count)
+    if 0 < point <= 21:
+        return sign + digits[:point] + "." + digits[point:]
+    if -6 < point <= 0:
+        return sign + "0." + "0" * -point + digits
+    mantissa = digits if count == 1 else digits[0] + "." + digits[1:]
+    return f"{sign}{mantissa}e{'+' if point > 0 else '-'}{abs(point - 1)}"
+
+
+def canonical_json(value: Any) -> str:
+    """
+    Serialize a JSON value in a canonical form: objects with sorted keys,
+    no whitespace, and numbers formatted like in JavaScript.
+    """
+    if value is None or isinstance(value, bool):
+        return json.dumps(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (int, float)):
+        return _js_number(value)
+    if isinstance(value, Mapping):
+        return (
+            "{"
+            + ",".join(
+                f"{json.dumps(key, ensure_ascii=False)}:{canonical_json(value[key])}"
+                for key in sorted(value)
+            )
+            + "}"
+        )
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(map(canonical_json, value)) + "]"
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def object_hash(
+    shape: Optional[str],
+    parameters: Optional[Mapping[str, Any]],
+    hashes: Mapping[str, str],
+) -> str:
+    """
+    Returns the hash of the operator subtree of an object.
+
+    The operands of operators are replaced by the hash of their own subtree,
+    so the hash does not depend on the names of the objects, and changes if
+    any object the shape is computed from changes. ``Part::Any`` contents are
+    replaced by their blob reference, so the hash is the same whether the
+    content is stored in the document or in the blob store.
+
+    The hash is the SHA-256 of the :func:`canonical_json` of the shape and
+    its parameters, and is computed the same way by the JupyterCAD frontend.
+
+    :param shape: The shape of the object.
+    :param parameters: The parameters of the object.
+    :param hashes: The hashes of the objects the object depends on, by name.
+    """
+    parameters = {
+        key: value
+        for key, value in (parameters or {}).items()
+        if key not in NON_GEOMETRIC_PARAMETERS
+    }
+    for key in OPERATOR_DEPENDENCIES.get(shape, ()):
+        value = parameters.get(key)
+        if isinstance(value, list):
+            parameters[key] = [hashes.get(name) for name in value]
+        elif value is not None:
+            parameters[key] = hashes.get(value)
+    content = parameters.get("Content")
+    if isinstance(content, str) and not is_blob_reference(content):
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        parameters["Content"] = BLOB_REF_PREFIX + digest
+    data = canonical_json([shape, parameters])
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def object_hashes(
+    objects: Iterable[Mapping[str, Any]], graph: Optional[DependencyGraph] = None
+) -> Dict[str, str]:
+    """
+    Returns the hash of the operator subtree of each object, by name.
+    The objects in a dependency cycle, and the objects depending on them,
+    cannot be built and have no hash.
+
+    :param objects: The objects of the document, as stored in a jcad file.
+    :param graph: The dependency graph of the objects, built if not given.
+    """
+    objects = {obj["name"]: obj for obj in objects}
+    if graph is None:
+        graph = DependencyGraph(objects.values())
+    try:
+        order = graph.topological_order(objects)
+    except ValueError:
+        # The objects in a dependency cycle, and the objects depending on them,
+        # have no hash, as in the frontend
+        order = graph.topological_order(_acyclic(graph, objects))
+    hashes: Dict[str, str] = {}
+    for name in order:
+        obj = objects[name]
+        hashes[name] = object_hash(obj.get("shape"), obj.get("parameters"), hashes)
+    return hashes
+
+
+def _acyclic(graph: DependencyGraph, names: Iterable[str]) -> Set[str]:
+    """
+    Returns the objects which are neither in a dependency cycle nor depend on
+    an object in a cycle.
+    """
+    names = set(names)
+    pending = {
+        name: {
+            dependency for dependency in graph.dependencies(name) if dependency in names
+        }
+        for name in names
+    }
+    ready = [name for name, dependencies in pending.items() if not dependencies]
+    acyclic = set()
+    while ready:
+        name = ready.pop()
+        acyclic.add(name)
+        for dependant in graph.dependants(name):
+            dependencies = pending.get(dependant)
+            if dependencies and name in dependencies:
+                dependencies.remove(name)
+                if not dependencies:
+                    ready.append(dependant)
+    return acyclic
+
+
+def _import_occ() -> None:
+    try:
+        import OCC.Core  # noqa: F401
+    except ImportError:
+        raise RuntimeError(
+            "Cannot evaluate shapes if pythonocc-core is not installed."
+        ) from None
+
+
+def _to_rad(angle: float) -> float:
+    return math.radians(angle)
+
+
+def _set_placement(shape, placement: Optional[Mapping[str, Any]]):
+    if not placement:
+        return shape
+    from OCC.Core.gp import gp_Ax1, gp_Dir, gp_Pnt, gp_Trsf, gp_Vec
+    from OCC.Core.TopLoc import TopLoc_Location
+
+    trsf = gp_Trsf()
+    axis = gp_Ax1(gp_Pnt(0, 0, 0), gp_Dir(*placement["Axis"]))
+    trsf.SetRotation(axis, _to_rad(placement["Angle"]))
+    trsf.SetTranslationPart(gp_Vec(*placement["Position"]))
+    # Operands are shared with the cache, the placed shape is a new shape
+    return shape.Located(TopLoc_Location(trsf))
+
+
+def _box(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeBox
+
+    shape = BRepPrimAPI_MakeBox(
+        parameters["Length"], parameters["Width"], parameters["Height"]
+    ).Shape()
+    return _set_placement(shape, parameters.get("Placement"))
+
+
+def _cone(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeCone
+
+    shape = BRepPrimAPI_MakeCone(
+        parameters["Radius1"],
+        parameters["Radius2"],
+        parameters["Height"],
+        _to_rad(parameters["Angle"]),
+    ).Shape()
+    return _set_placement(shape, parameters.get("Placement"))
+
+
+def _cylinder(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeCylinder
+
+    shape = BRepPrimAPI_MakeCylinder(
+        parameters["Radius"], parameters["Height"], _to_rad(parameters["Angle"])
+    ).Shape()
+    return _set_placement(shape, parameters.get("Placement"))
+
+
+def _sphere(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeSphere
+
+    shape = BRepPrimAPI_MakeSphere(
+        parameters["Radius"],
+        _to_rad(parameters["Angle1"]),
+        _to_rad(parameters["Angle2"]),
+        _to_rad(parameters["Angle3"]),
+    ).Shape()
+    return _set_placement(shape, parameters.get("Placement"))
+
+
+def _torus(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeTorus
+
+    shape = BRepPrimAPI_MakeTorus(
+        parameters["Radius1"],
+        parameters["Radius2"],
+        _to_rad(parameters["Angle1"]),
+        _to_rad(parameters["Angle2"]),
+        _to_rad(parameters["Angle3"]),
+    ).Shape()
+    return _set_placement(shape, parameters.get("Placement"))
+
+
+def _cut(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Cut
+
+    operator = BRepAlgoAPI_Cut(operands["Base"], operands["Tool"])
+    if not operator.IsDone():
+        return None
+    return _set_placement(operator.Shape(), parameters.get("Placement"))
+
+
+def _fuse(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Fuse
+
+    shapes = operands["Shapes"]
+    fused = shapes[0]
+    for shape in shapes[1:]:
+        operator = BRepAlgoAPI_Fuse(fused, shape)
+        if not operator.IsDone():
+            return None
+        fused = operator.Shape()
+    return _set_placement(fused, parameters.get("Placement"))
+
+
+def _intersection(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Common
+
+    shapes = operands["Shapes"]
+    if len(shapes) < 2:
+        return None
+    operator = BRepAlgoAPI_Common(shapes[0], shapes[1])
+    if not operator.IsDone():
+        return None
+    return _set_placement(operator.Shape(), parameters.get("Placement"))
+
+
+def _extrusion(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepBuilderAPI import (
+        BRepBuilderAPI_Copy,
+        BRepBuilderAPI_MakeFace,
+        BRepBuilderAPI_MakeWire,
+    )
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakePrism
+    from OCC.Core.gp import gp_Trsf, gp_Vec
+    from OCC.Core.TopAbs import TopAbs_EDGE, TopAbs_FACE
+    from OCC.Core.TopExp import TopExp_Explorer
+    from OCC.Core.TopLoc import TopLoc_Location
+    from OCC.Core.TopoDS import topods
+
+    direction = gp_Vec(*parameters["Dir"])
+    length_fwd = parameters["LengthFwd"]
+    length_rev = parameters["LengthRev"]
+    vec = direction.Multiplied(length_fwd + length_rev)
+    base = BRepBuilderAPI_Copy(operands["Base"], True, False).Shape()
+    if length_rev:
+        move = gp_Trsf()
+        move.SetTranslation(direction.Multiplied(-length_rev))
+        base.Move(TopLoc_Location(move))
+
+    if parameters.get("Solid") and not TopExp_Explorer(base, TopAbs_FACE).More():
+        # Extrude the face bounded by the edges of the base
+        wire = BRepBuilderAPI_MakeWire()
+        explorer = TopExp_Explorer(base, TopAbs_EDGE)
+        while explorer.More():
+            wire.Add(topods.Edge(explorer.Current()))
+            explorer.Next()
+        base = BRepBuilderAPI_MakeFace(wire.Wire(), False).Face()
+
+    shape = BRepPrimAPI_MakePrism(base, vec, False, True).Shape()
+    return _set_placement(shape, parameters.get("Placement"))
+
+
+def _edges(shape, edge: Any) -> List[Any]:
+    from OCC.Core.TopAbs import TopAbs_EDGE
+    from OCC.Core.TopExp import topexp
+    from OCC.Core.TopoDS import topods
+    from OCC.Core.TopTools import TopTools_IndexedMapOfShape
+
+    edges = TopTools_IndexedMapOfShape()
+    topexp.MapShapes(shape, TopAbs_EDGE, edges)
+    indices = edge if isinstance(edge, list) else [edge]
+    return [topods.Edge(edges.FindKey(int(index) + 1)) for index in indices]
+
+
+def _fillet(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepFilletAPI import BRepFilletAPI_MakeFillet
+    from OCC.Core.ChFi3d import ChFi3d_Rational
+
+    base = operands["Base"]
+    builder = BRepFilletAPI_MakeFillet(base, ChFi3d_Rational)
+    for edge in _edges(base, parameters["Edge"]):
+        builder.Add(parameters["Radius"], edge)
+    builder.Build()
+    if not builder.IsDone():
+        return None
+    return _set_placement(builder.Shape(), parameters.get("Placement"))
+
+
+def _chamfer(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRepFilletAPI import BRepFilletAPI_MakeChamfer
+
+    base = operands["Base"]
+    builder = BRepFilletAPI_MakeChamfer(base)
+    for edge in _edges(base, parameters["Edge"]):
+        builder.Add(parameters["Dist"], edge)
+    builder.Build()
+    if not builder.IsDone():
+        return None
+    return _set_placement(builder.Shape(), parameters.get("Placement"))
+
+
+def _sketch(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    from OCC.Core.BRep import BRep_Builder
+    from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakeEdge, BRepBuilderAPI_MakeWire
+    from OCC.Core.GC import GC_MakeCircle
+    from OCC.Core.gp import gp_Dir, gp_Pnt
+    from OCC.Core.TopoDS import TopoDS_Compound
+
+    geometries = parameters.get("Geometry") or []
+    if not geometries:
+        return None
+    builder = BRep_Builder()
+    compound = TopoDS_Compound()
+    builder.MakeCompound(compound)
+    for geometry in geometries:
+        if geometry.get("TypeId") == "Part::GeomCircle":
+            circle = GC_MakeCircle(
+                gp_Pnt(geometry["CenterX"], geometry["CenterY"], geometry["CenterZ"]),
+                gp_Dir(geometry["NormalX"], geometry["NormalY"], geometry["NormalZ"]),
+                geometry["Radius"],
+            ).Value()
+            edge = BRepBuilderAPI_MakeEdge(circle.Circ()).Edge()
+        elif geometry.get("TypeId") == "Part::GeomLineSegment":
+            edge = BRepBuilderAPI_MakeEdge(
+                gp_Pnt(geometry["StartX"], geometry["StartY"], geometry["StartZ"]),
+                gp_Pnt(geometry["EndX"], geometry["EndY"], geometry["EndZ"]),
+            ).Edge()
+        else:
+            continue
+        builder.Add(compound, BRepBuilderAPI_MakeWire(edge).Wire())
+    return compound
+
+
+def read_shape(content: str, file_type: str):
+    """
+    Read an Open Cascade shape from the content of a `Part::Any` object.
+
+    :param content: The BREP, STEP or STL content.
+    :param file_type: The type of the content, ``brep``, ``step`` or ``stl``.
+    """
+    from OCC.Core.BRep import BRep_Builder
+    from OCC.Core.BRepTools import breptools
+    from OCC.Core.IFSelect import IFSelect_RetDone
+    from OCC.Core.StlAPI import StlAPI_Reader
+    from OCC.Core.STEPControl import STEPControl_Reader
+    from OCC.Core.TopoDS import TopoDS_Shape
+
+    file_type = file_type.lower()
+    if file_type == "brep" and hasattr(breptools, "ReadFromString"):
+        return breptools.ReadFromString(content)
+    if file_type not in ("brep", "step", "stl"):
+        raise ValueError(f"{file_type} file not supported")
+
+    # The readers need a file
+    fd, tmp = tempfile.mkstemp(suffix=f".{file_type}")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fobj:
+            fobj.write(content)
+        shape = TopoDS_Shape()
+        if file_type == "brep":
+            breptools.Read(shape, tmp, BRep_Builder())
+        elif file_type == "step":
+            reader = STEPControl_Reader()
+            if reader.ReadFile(tmp) != IFSelect_RetDone:
+                return None
+            reader.TransferRoots()
+            shape = reader.OneShape()
+        else:
+            StlAPI_Reader().Read(shape, tmp)
+    finally:
+        os.remove(tmp)
+    return None if shape.IsNull() else shape
+
+
+def write_brep(shape) -> str:
+    """
+    Returns the BREP data of an Open Cascade shape.
+    """
+    from OCC.Core.BRepTools import breptools
+
+    if hasattr(breptools, "WriteToString"):
+        return breptools.WriteToString(shape)
+    # Older pythonocc versions can only write to a file
+    with tempfile.NamedTemporaryFile() as tmp:
+        breptools.Write(shape, tmp.name, True, False, 1)
+        return tmp.read().decode("ascii")
+
+
+def write_step(shapes: Iterable[Any], path: Union[str, Path]) -> None:
+    """
+    Write Open Cascade shapes in a STEP file.
+
+    :param shapes: The shapes to write, as root shapes of the file.
+    :param path: The path of the file.
+    """
+    from OCC.Core.IFSelect import IFSelect_RetDone
+    from OCC.Core.STEPControl import STEPControl_AsIs, STEPControl_Writer
+
+    writer = STEPControl_Writer()
+    for shape in shapes:
+        writer.Transfer(shape, STEPControl_AsIs)
+    if writer.Write(str(path)) != IFSelect_RetDone:
+        raise RuntimeError(f"Cannot write the STEP file {path}")
+
+
+def _any(parameters: Mapping[str, Any], operands: Mapping[str, Any]):
+    content = parameters.get("Content")
+    if content is None:
+        return None
+    shape = read_shape(decompress_content(content), parameters["Type"])
+    if shape is None:
+        return None
+    return _set_placement(shape, parameters.get("Placement"))
+
+
+# The builder of each shape, called with the parameters of the object and its
+# evaluated operands, by parameter name
+SHAPE_BUILDERS: Dict[str, Callable[[Mapping[str, Any], Mapping[str, Any]], Any]] = {
+    "Part::Box": _box,
+    "Part::Cone": _cone,
+    "Part::Cylinder": _cylinder,
+    "Part::Sphere": _sphere,
+    "Part::Torus": _torus,
+    "Part::Cut": _cut,
+    "Part::MultiFuse": _fuse,
+    "Part::MultiCommon": _intersection,
+    "Part::Extrusion": _extrusion,
+    "Part::Fillet": _fillet,
+    "Part::Chamfer": _chamfer,
+    "Sketcher::SketchObject": _sketch,
+    "Part::Any": _any,
+}
+
+
+def shape_metadata(shape) -> Dict[str, Any]:
+    """
+    Returns the mass properties of a shape, like the OCC worker: its
+    ``mass``, ``centerOfMass`` and ``matrixOfInertia``.
+    """
+    from OCC.Core.BRepGProp import brepgprop
+    from OCC.Core.GProp import GProp_GProps
+
+    props = GProp_GProps()
+    brepgprop.VolumeProperties(shape, props)
+    center = props.CentreOfMass()
+    matrix = props.MatrixOfInertia()
+    return {
+        "mass": props.Mass(),
+        "centerOfMass": [center.X(), center.Y(), center.Z()],
+        "matrixOfInertia": [
+            [matrix.Value(row, column) for column in range(1, 4)] for row in range(1, 4)
+        ],
+    }
+
+
+class ShapeEvaluator:
+    """
+    Evaluate the shapes of jcad documents, memoizing each shape by the hash of
+    its operator subtree. The same evaluator can be used for successive
+    versions of a document, or for several documents sharing objects.
+
+    Evaluated shapes are shared with the cache, and must not be modified.
+
+    :param max_size: The maximum number of shapes in the cache, the least
+    recently used shapes being evicted first. ``None`` for an unbounded cache.
+    :param resolve_content: A function returning the content of a
+    ``Part::Any`` object from its blob reference.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = DEFAULT_CACHE_SIZE,
+        resolve_content: Optional[Callable[[str], str]] = None,
+    ):
+        self._max_size = max_size
+        self._resolve_content = resolve_content
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        # The BREP data of the shapes sent to worker processes
+        self._breps: "OrderedDict[str, str]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._cache or key in self._breps
+
+    def cache_info(self) -> Dict[str, Optional[int]]:
+        """
+        Returns the ``hits``, ``misses``, ``size`` and ``max_size`` of the cache.
+        """
+        return dict(
+            hits=self._hits,
+            misses=self._misses,
+            size=len(self._cache),
+            max_size=self._max_size,
+        )
+
+    def clear(self) -> None:
+        """
+        Empty the cache.
+        """
+        self._cache.clear()
+        self._breps.clear()
+        self._hits = self._misses = 0
+
+    def get(self, key: str) -> Any:
+        """
+        Returns the cached shape of an operator subtree hash, or None.
+        """
+        shape = self._cache.get(key)
+        if shape is not None:
+            self._cache.move_to_end(key)
+        elif key in self._breps:
+            shape = read_shape(self._breps[key], "brep")
+            if shape is not None:
+                self.put(key, shape)
+        return shape
+
+    def put(self, key: str, shape: Any) -> None:
+        """
+        Cache the shape of an operator subtree hash.
+        """
+        self._cache[key] = shape
+        self._cache.move_to_end(key)
+        if self._max_size is not None:
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+
+    def evaluate(
+        self,
+        objects: Iterable[Mapping[str, Any]],
+        names: Optional[Iterable[str]] = None,
+        executor: Optional[Executor] = None,
+    ) -> Dict[str, Any]:
+        """
+        Evaluate the shapes of a document.
+
+        :param objects: The objects of the document, as stored in a jcad file.
+        :param names: The objects to evaluate, all objects by default. The
+        objects they depend on are evaluated too, but not returned.
+        :param executor: A process pool in which the independent branches of
+        the document are evaluated in parallel. By default, the shapes are
+        evaluated in this process.
+        :return: The shape of each object, in dependency order. The shape is
+        None if it cannot be built.
+        """
+        _import_occ()
+        objects = {obj["name"]: obj for obj in objects}
+        graph = DependencyGraph(objects.values())
+        if names is None:
+            selected = wanted = set(objects)
+        else:
+            wanted = set(names)
+            selected = set(wanted)
+            for name in wanted:
+                selected |= graph.ancestors(name)
+        order = graph.topological_order(selected)
+
+        hashes: Dict[str, str] = {}
+        for name in order:
+            obj = objects[name]
+            hashes[name] = object_hash(obj.get("shape"), obj.get("parameters"), hashes)
+
+        # Only the objects whose shape is not cached and which are needed by
+        # the requested objects are built, the cached shapes being held here
+        # so that they are not evicted while the others are built
+        needed = set()
+        shapes: Dict[str, Any] = {}
+        for name in reversed(order):
+            if name not in wanted and not any(
+                dependant in needed and dependant not in shapes
+                for dependant in graph.dependants(name)
+            ):
+                continue
+            needed.add(name)
+            shape = self.get(hashes[name])
+            if shape is not None:
+                shapes[name] = shape
+        pending = [name for name in order if name in needed and name not in shapes]
+        self._hits += len(needed) - len(pending)
+        self._misses += len(pending)
+
+        branches = _branches(graph, pending, wanted)
+        if executor is not None and len(branches) > 1:
+            self._evaluate_branches(
+                objects, graph, branches, hashes, wanted, shapes, executor
+            )
+        else:
+            for name in pending:
+                shape = shapes[name] = self.build(objects[name], shapes)
+                if shape is not None:
+                    self.put(hashes[name], shape)
+
+        return {name: shapes.get(name) for name in order if name in wanted}
+
+    def build(self, obj: Mapping[str, Any], shapes: Mapping[str, Any]) -> Any:
+        """
+        Build the shape of an object, without caching it.
+
+        :param obj: The object, as stored in a jcad file.
+        :param shapes: The shapes of the objects it depends on, by name.
+        :return: The shape, or None if it cannot be built.
+        """
+        shape_type = obj.get("shape")
+        builder = SHAPE_BUILDERS.get(shape_type)
+        if builder is None:
+            logger.warning(f"Cannot evaluate {obj['name']}: unknown shape {shape_type}")
+            return None
+
+        parameters = self._parameters(obj)
+        if parameters is None:
+            return None
+        operands: Dict[str, Any] = {}
+        for key in OPERATOR_DEPENDENCIES.get(shape_type, ()):
+            value = parameters.get(key)
+            if isinstance(value, list):
+                # Like the OCC worker, the missing shapes of a list are skipped
+                operands[key] = [
+                    shapes[name] for name in value if shapes.get(name) is not None
+                ]
+            else:
+                operands[key] = shapes.get(value)
+            if operands[key] is None or operands[key] == []:
+                return None
+
+        try:
+            return builder(parameters, operands)
+        except Exception as e:
+            logger.warning(f"Cannot evaluate {obj['name']}: {e}")
+            return None
+
+    def _parameters(self, obj: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Returns the parameters of an object, with the content of ``Part::Any``
+        objects loaded from the blob store, or None if it cannot be loaded.
+        """
+        parameters = dict(obj.get("parameters") or {})
+        content = parameters.get("Content")
+        if is_blob_reference(content):
+            if self._resolve_content is None:
+                logger.warning(f"Cannot evaluate {obj['name']}: no blob store")
+                return None
+            parameters["Content"] = self._resolve_content(content)
+        return parameters
+
+    def _brep(self, key: str, shape: Any) -> str:
+        """
+        Returns the BREP data of a cached shape, which is kept to send the
+        shape to other processes.
+        """
+        brep = self._breps.get(key)
+        if brep is None:
+            brep = write_brep(shape)
+        self._store_brep(key, brep)
+        return brep
+
+    def _store_brep(self, key: str, brep: Optional[str]) -> None:
+        if brep is None:
+            return
+        self._breps[key] = brep
+        self._breps.move_to_end(key)
+        if self._max_size is not None:
+            while len(self._breps) > self._max_size:
+                self._breps.popitem(last=False)
+
+    def _evaluate_branches(
+        self,
+        objects: Mapping[str, Mapping[str, Any]],
+        graph: DependencyGraph,
+        branches: Mapping[str, List[str]],
+        hashes: Mapping[str, str],
+        wanted: Set[str],
+        shapes: Dict[str, Any],
+        executor: Executor,
+    ) -> None:
+        """
+        Evaluate branches in the executor, each branch being submitted once
+        the branches it depends on are evaluated. The shapes are sent to and
+        from the worker processes as BREP data, which is only read here for the
+        requested objects.
+        """
+        inputs: Dict[str, List[str]] = {}
+        waiting: Dict[str, Set[str]] = {}
+        for root, members in branches.items():
+            inputs[root] = list(
+                {
+                    dependency: None
+                    for member in members
+                    for dependency in graph.dependencies(member)
+                    if dependency not in members
+                }
+            )
+            waiting[root] = {name for name in inputs[root] if name in branches}
+        dependants: Dict[str, List[str]] = {root: [] for root in branches}
+        for root in branches:
+            for name in waiting[root]:
+                dependants[name].append(root)
+
+        breps: Dict[str, Optional[str]] = {}
+        futures: Dict[Future, str] = {}
+
+        def submit(root: str) -> None:
+            members = branches[root]
+            payload = []
+            for name in members:
+                parameters = self._parameters(objects[name])
+                if parameters is None:
+                    break
+                payload.append(dict(objects[name], parameters=parameters))
+            operands = {}
+            for name in inputs[root]:
+                if name in breps:
+                    operands[name] = breps[name]
+                elif shapes.get(name) is not None:
+                    operands[name] = self._brep(hashes[name], shapes[name])
+            future = executor.submit(_evaluate_branch, payload, operands, root)
+            futures[future] = root
+
+        for root in branches:
+            if not waiting[root]:
+                submit(root)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                root = futures.pop(future)
+                try:
+                    brep = future.result()
+                except BrokenExecutor:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Cannot evaluate {root}: {e}")
+                    brep = None
+                breps[root] = brep
+                if brep is None:
+                    shapes[root] = None
+                elif root in wanted:
+                    shapes[root] = read_shape(brep, "brep")
+                    self.put(hashes[root], shapes[root])
+                # The other shapes are read from their BREP data when needed
+                self._store_brep(hashes[root], brep)
+                for dependant in dependants[root]:
+                    waiting[dependant].discard(root)
+                    if not waiting[dependant]:
+                        submit(dependant)
+
+
+def _branches(
+    graph: DependencyGraph, names: List[str], wanted: Set[str]
+) -> Dict[str, List[str]]:
+    """
+    Split objects into branches, each branch being evaluated in one process.
+
+    A branch follows the first operand of its objects: an object is evaluated
+    with the object using it if it is its only user and first operand. Other
+    objects, like the other operands of a boolean operation, are the root of
+    their own branch, which can be evaluated in parallel.
+
+    :param names: The objects to evaluate, in dependency order.
+    :param wanted: The objects whose shape is returned, which are always the
+    root of their branch.
+    :return: The objects of each branch, in dependency order, by root.
+    """
+    selected = set(names)
+    root_of: Dict[str, str] = {}
+    for name in reversed(names):
+        dependants = [item for item in graph.dependants(name) if item in selected]
+        if name not in wanted and len(dependants) == 1:
+            operands = graph.dependencies(dependants[0])
+            if next(item for item in operands if item in selected) == name:
+                root_of[name] = root_of[dependants[0]]
+                continue
+        root_of[name] = name
+    branches: Dict[str, List[str]] = {}
+    for name in names:
+        branches.setdefault(root_of[name], []).append(name)
+    return branches
+
+
+def _evaluate_branch(
+    objects: List[Dict[str, Any]], inputs: Dict[str, str], root: str
+) -> Optional[str]:
+    """
+    Evaluate a branch in a worker process.
+
+    :param objects: The objects of the branch, in dependency order.
+    :param inputs: The BREP data of the shapes the branch depends on, by name.
+    :param root: The object whose shape is returned.
+    :return: The BREP data of the root shape, or None if it cannot be built.
+    """
+    evaluator = ShapeEvaluator(max_size=None)
+    shapes = {name: read_shape(brep, "brep") for name, brep in inputs.items()}
+    for obj in objects:
+        shapes[obj["name"]] = evaluator.build(obj, shapes)
+    shape = shapes.get(root)
+    return None if shape is None else write_brep(shape)
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Dict, Iterator, Optional, Union
+
+from .blobstore import BlobStore
+from .files import replacement_mode
+from .schema import SCHEMA_VERSION
+from .stl import binary_to_ascii, is_binary_stl, map_stl_file, stl_shape_metadata
+
+# The file types which can be held by a `Part::Any` object
+EXPORT_FILE_TYPES = ("brep", "step", "stl")
+
+# Size of the chunks read from the source file
+EXPORT_CHUNK_SIZE = 1 << 20
+
+_CONTENT_PLACEHOLDER = "\0content\0"
+
+
+def _iter_content(source: Path, blob_store: Union[BlobStore, None]) -> Iterator[str]:
+    """
+    Iterate over the text content of a source file, by chunks.
+    """
+    if source.suffix.lower() == ".stl":
+        data = map_stl_file(source)
+        try:
+            if is_binary_stl(data):
+                # jcad objects hold text content
+                content = binary_to_ascii(data)
+                yield blob_store.maybe_put(content) if blob_store else content
+                return
+        finally:
+            if hasattr(data, "close"):
+                data.close()
+
+    with open(source, "r", encoding="utf-8") as fobj:
+        if blob_store is not None:
+            yield blob_store.maybe_put(fobj.read())
+            return
+        while chunk := fobj.read(EXPORT_CHUNK_SIZE):
+            yield chunk
+
+
+def _shape_metadata(source: Path) -> Optional[Dict]:
+    """
+    Compute the shape metadata of the source file. Only STL meshes are
+    supported, other formats need Open Cascade.
+    """
+    if source.suffix.lower() != ".stl":
+        return None
+    data = map_stl_file(source)
+    try:
+        return stl_shape_metadata(data) or None
+    except ValueError:
+        # The metadata will be computed by the OCC worker, if it can read the file
+        return None
+    finally:
+        if hasattr(data, "close"):
+            data.close()
+
+
+def _write_jcad(
+    fobj: IO[str],
+    name: str,
+    file_type: str,
+    chunks: Iterator[str],
+    shape_metadata: Optional[Dict] = None,
+):
+    jcad = dict(
+        schemaVersion=SCHEMA_VERSION,
+        objects=[
+            dict(
+                name=name,
+                visible=True,
+                shape="Part::Any",
+                parameters=dict(
+                    Content=_CONTENT_PLACEHOLDER,
+                    Type=file_type,
+                    Color="#808080",
+                    Placement=dict(Position=[0, 0, 0], Axis=[0, 0, 1], Angle=0),
+                ),
+            )
+        ],
+        metadata={},
+        options={},
+        outputs={},
+    )
+    if shape_metadata:
+        jcad["objects"][0]["shapeMetadata"] = shape_metadata
+    # Serialize everything but the content, which is streamed in between
+    head, tail = json.dumps(jcad, indent=2).split(json.dumps(_CONTENT_PLACEHOLDER))
+    fobj.write(head)
+    fobj.write('"')
+    for chunk in chunks:
+        # Escaping is done character by character, chunks can be escaped separately
+        fobj.write(json.dumps(chunk)[1:-1])
+    fobj.write('"')
+    fobj.write(tail)
+
+
+def export_to_jcad(
+    source: Union[str, Path], target: Union[str, Path], blob: bool = False
+) -> None:
+    """
+    Export a STEP, STL or BREP file to a jcad document holding it.
+    The shape metadata of STL meshes is computed during the export.
+
+    The source file is streamed to the target file, which is written in a
+    temporary file first and then atomically renamed.
+
+    :param source: The path of the file to export.
+    :param target: The path of the jcad file.
+    :param blob: Whether to put the file content in the blob store of the jcad file.
+    """
+    source = Path(source)
+    target = Path(target)
+    blob_store = BlobStore.for_document(target) if blob else None
+
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".jcad.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fobj:
+            _write_jcad(
+                fobj,
+                target.stem,
+                source.suffix[1:],
+                _iter_content(source, blob_store),
+                _shape_metadata(source),
+            )
+        os.chmod(tmp_path, replacement_mode(target))
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
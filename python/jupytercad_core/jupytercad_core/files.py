@@ -0,0 +1,30 @@
+import os
+import stat
+from pathlib import Path
+from typing import Union
+
+
+def _read_umask() -> int:
+    # The umask can only be read by setting it
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# Read once, as setting the umask is not thread-safe
+_UMASK = _read_umask()
+
+
+def replacement_mode(path: Union[str, Path]) -> int:
+    """
+    Returns the permissions of a file written to replace `path`: the
+    permissions of the existing file, or the default permissions of new
+    files, which honour the umask.
+
+    Files written in a temporary file first are only readable by their owner,
+    these permissions are to be set before the file is renamed.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
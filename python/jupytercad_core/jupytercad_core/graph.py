@@ -0,0 +1,187 @@
+"""
+The dependency graph of the objects of a jcad document.
+
+Operators reference the objects they are computed from by name, e.g. the
+``Base`` and ``Tool`` of a ``Part::Cut``. The graph indexes these references
+in both directions, so that the objects depending on a modified object can be
+found, and recomputed in dependency order, without walking the document.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+# The parameters holding the dependencies of each operator
+OPERATOR_DEPENDENCIES = {
+    "Part::Cut": ("Base", "Tool"),
+    "Part::Extrusion": ("Base",),
+    "Part::Fillet": ("Base",),
+    "Part::Chamfer": ("Base",),
+    "Part::MultiCommon": ("Shapes",),
+    "Part::MultiFuse": ("Shapes",),
+}
+
+
+def object_dependencies(
+    shape: Optional[str],
+    parameters: Optional[Mapping[str, Any]],
+    dependencies: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Returns the names of the objects an object depends on.
+
+    The dependencies of operators are read from their parameters, which are
+    always up to date, and the ``dependencies`` field is used for other shapes.
+
+    :param shape: The shape of the object.
+    :param parameters: The parameters of the object.
+    :param dependencies: The ``dependencies`` field of the object.
+    """
+    keys = OPERATOR_DEPENDENCIES.get(shape)
+    if keys is None or parameters is None:
+        return list(dependencies or [])
+    names = []
+    for key in keys:
+        value = parameters.get(key)
+        for name in value if isinstance(value, list) else [value]:
+            if isinstance(name, str) and name not in names:
+                names.append(name)
+    return names
+
+
+class DependencyGraph:
+    """
+    A directed acyclic graph of the objects of a document, an edge going from
+    each object to the objects it depends on.
+
+    Objects are kept in the order they are added, which is used to order
+    objects which do not depend on each other. Dependencies may name objects
+    which are not in the graph, they are then ignored by the queries.
+
+    :param objects: The objects of the document, as stored in a jcad file.
+    """
+
+    def __init__(self, objects: Iterable[Mapping[str, Any]] = ()):
+        # The dependencies and dependants of each object, in insertion order
+        self._dependencies: Dict[str, List[str]] = {}
+        self._dependants: Dict[str, Dict[str, None]] = {}
+        for obj in objects:
+            self.set_object(
+                obj["name"],
+                object_dependencies(
+                    obj.get("shape"), obj.get("parameters"), obj.get("dependencies")
+                ),
+            )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._dependencies
+
+    def __len__(self) -> int:
+        return len(self._dependencies)
+
+    def set_object(self, name: str, dependencies: Iterable[str]) -> None:
+        """
+        Add an object to the graph, or update its dependencies.
+        """
+        for dependency in self._dependencies.get(name, []):
+            self._dependants[dependency].pop(name, None)
+        self._dependencies[name] = list(dependencies)
+        for dependency in self._dependencies[name]:
+            self._dependants.setdefault(dependency, {})[name] = None
+
+    def remove_object(self, name: str) -> None:
+        """
+        Remove an object from the graph. Its dependants keep their dependency
+        on it, which is restored if an object with the same name is added.
+        """
+        for dependency in self._dependencies.pop(name, []):
+            self._dependants[dependency].pop(name, None)
+
+    def rename_object(self, old_name: str, new_name: str) -> None:
+        """
+        Rename an object. The objects depending on it reference it by name, and
+        keep depending on the old name.
+        """
+        dependencies = self._dependencies.get(old_name, [])
+        self.remove_object(old_name)
+        self.set_object(new_name, dependencies)
+
+    def dependencies(self, name: str) -> List[str]:
+        """
+        Returns the objects an object directly depends on.
+        """
+        return [name for name in self._dependencies.get(name, []) if name in self]
+
+    def dependants(self, name: str) -> List[str]:
+        """
+        Returns the objects which directly depend on an object.
+        """
+        return list(self._dependants.get(name, {}))
+
+    def ancestors(self, name: str) -> Set[str]:
+        """
+        Returns the objects an object depends on, directly or not.
+        """
+        return self._reachable([name], self.dependencies) - {name}
+
+    def descendants(self, name: str) -> Set[str]:
+        """
+        Returns the objects which depend on an object, directly or not.
+        """
+        return self._reachable([name], self.dependants) - {name}
+
+    def dirty(self, names: Iterable[str]) -> List[str]:
+        """
+        Returns the objects to recompute when the given objects are modified,
+        i.e. these objects and their descendants, in dependency order.
+
+        :param names: The names of the modified, or removed, objects.
+        """
+        return self.topological_order(self._reachable(names, self.dependants))
+
+    def topological_order(self, names: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Returns objects sorted so that each object comes after its dependencies.
+
+        :param names: The objects to sort, all objects by default.
+        :return: The sorted objects, the objects which do not depend on each other
+        being kept in the order they were added.
+        """
+        selected = (
+            self._dependencies.keys()
+            if names is None
+            else {name for name in names if name in self}
+        )
+        # Objects are sorted by depth-first traversal of their dependencies,
+        # starting from the objects in the order they were added
+        order: List[str] = []
+        state: Dict[str, bool] = {}  # False while visiting, True once visited
+        for root in self._dependencies:
+            if root not in selected or root in state:
+                continue
+            state[root] = False
+            stack = [(root, iter(self.dependencies(root)))]
+            while stack:
+                name, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if dependency not in selected:
+                        continue
+                    if dependency not in state:
+                        state[dependency] = False
+                        stack.append((dependency, iter(self.dependencies(dependency))))
+                        break
+                    if not state[dependency]:
+                        raise ValueError(f"Cyclic dependency on {dependency}")
+                else:
+                    stack.pop()
+                    state[name] = True
+                    order.append(name)
+        return order
+
+    def _reachable(self, names: Iterable[str], neighbours) -> Set[str]:
+        reached = set(names)
+        stack = list(reached)
+        while stack:
+            for neighbour in neighbours(stack.pop()):
+                if neighbour not in reached:
+                    reached.add(neighbour)
+                    stack.append(neighbour)
+        return reached
@@ -1,52 +1,315 @@
+import asyncio
 import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
 
 from jupyter_server.base.handlers import APIHandler
 from jupyter_server.utils import url_path_join, ApiPath, to_os_path
 import tornado
 
-from .schema import SCHEMA_VERSION
+from .blobstore import BlobStore, is_blob_reference
+from .export import EXPORT_FILE_TYPES, export_to_jcad
+from .meshcache import MeshCache, decode_mesh
+
+# Maximum number of processes used by batch exports
+BATCH_EXPORT_MAX_WORKERS = min(os.cpu_count() or 1, 8)
+
+
+def _in_root(handler: APIHandler, path: Path) -> Path:
+    """Resolve an OS path, refusing the paths outside of the server root"""
+    root_dir = Path(handler.contents_manager.root_dir).resolve()
+    path = path.resolve()
+    if path != root_dir and root_dir not in path.parents:
+        raise tornado.web.HTTPError(403, "Cannot access files outside of the root")
+    return path
+
+
+def _document_path(handler: APIHandler, path: str) -> Path:
+    """Get the OS path of a document, removing the drive prefix"""
+    if ":" in path:
+        path = path.split(":", 1)[1]
+    root_dir = Path(handler.contents_manager.root_dir).resolve()
+    return _in_root(handler, Path(to_os_path(ApiPath(path), str(root_dir))))
+
+
+def _api_path(handler: APIHandler, path: Path) -> str:
+    """Get the API path of a file, relative to the server root"""
+    root_dir = Path(handler.contents_manager.root_dir).resolve()
+    return path.resolve().relative_to(root_dir).as_posix()
+
+
+def _future_error(future: asyncio.Future) -> Optional[str]:
+    """Get the error message of a finished export, None if it succeeded"""
+    if future.cancelled():
+        return "The export was cancelled"
+    error = future.exception()
+    return None if error is None else str(error)
+
+
+class ExportJobs:
+    """
+    The exports running in the background, indexed by job id.
+    """
+
+    # Number of finished jobs kept for status requests
+    MAX_FINISHED = 100
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+
+    def start(self, future: asyncio.Future) -> str:
+        job_id, job = self._create()
+
+        def on_done(future: asyncio.Future) -> None:
+            job["done"] = True
+            job["error"] = _future_error(future)
+            self._prune()
+
+        future.add_done_callback(on_done)
+        return job_id
+
+    def start_batch(self, futures: Dict[str, asyncio.Future]) -> str:
+        """
+        Track a batch export, `futures` being the exports indexed by source path.
+        The job reports the status of each file and the overall progress.
+        """
+        job_id, job = self._create(
+            total=len(futures),
+            completed=0,
+            failed=0,
+            files={path: dict(done=False, error=None) for path in futures},
+        )
+        if not futures:
+            job["done"] = True
+            self._prune()
+
+        def on_done(path: str, future: asyncio.Future) -> None:
+            status = job["files"][path]
+            status["done"] = True
+            job["completed"] += 1
+            status["error"] = _future_error(future)
+            if status["error"] is not None:
+                job["failed"] += 1
+            if job["completed"] == job["total"]:
+                job["done"] = True
+                self._prune()
+
+        for path, future in futures.items():
+            future.add_done_callback(lambda future, path=path: on_done(path, future))
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+
+    def _create(self, **kwargs) -> tuple:
+        job_id = str(uuid4())
+        job = self._jobs[job_id] = dict(done=False, error=None, **kwargs)
+        return job_id, job
+
+    def _prune(self) -> None:
+        finished = [key for key, job in self._jobs.items() if job["done"]]
+        for key in finished[: -self.MAX_FINISHED]:
+            del self._jobs[key]
 
 
 class JCadExportHandler(APIHandler):
+    # Sources larger than this are exported in the background
+    BACKGROUND_SIZE = 8 * 1024 * 1024
+
+    @property
+    def export_jobs(self) -> ExportJobs:
+        return self.settings["jupytercad_export_jobs"]
+
+    @tornado.web.authenticated
+    async def post(self):
+        body = self.get_json_body()
+
+        file_name = _document_path(self, body["path"])
+        target = _in_root(self, file_name.parent / body["newName"])
+        blob = body.get("blob", False)
+
+        background = file_name.stat().st_size >= self.BACKGROUND_SIZE
+
+        # Run the export off the event loop, so that other requests are served
+        future = asyncio.get_running_loop().run_in_executor(
+            None, export_to_jcad, file_name, target, blob
+        )
+        if not background:
+            await future
+            self.finish(json.dumps({"done": True}))
+            return
+
+        job_id = self.export_jobs.start(future)
+        self.set_status(202)
+        self.finish(json.dumps({"done": False, "job": job_id}))
+
+
+class JCadBatchExportHandler(APIHandler):
+    """
+    Export many files to jcad documents in parallel, in a pool of processes.
+
+    The request body holds either a list of ``paths``, or a ``directory``
+    and a ``glob`` pattern (``*`` by default) selecting the STEP, STL and
+    BREP files in it. Each file is exported next to its source, or in
+    ``outputDirectory`` if given. The response holds a job id whose
+    progress is reported by the export job endpoint.
+    """
+
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         body = self.get_json_body()
+        blob = body.get("blob", False)
+
+        if "paths" in body:
+            sources = [_document_path(self, path) for path in body["paths"]]
+        elif "directory" in body:
+            directory = _document_path(self, body["directory"])
+            if not directory.is_dir():
+                raise tornado.web.HTTPError(404, f"No directory {body['directory']}")
+            sources = await asyncio.get_running_loop().run_in_executor(
+                None, _find_sources, directory, body.get("glob", "*")
+            )
+        else:
+            raise tornado.web.HTTPError(400, "Missing 'paths' or 'directory'")
+
+        output_dir = None
+        if "outputDirectory" in body:
+            output_dir = _document_path(self, body["outputDirectory"])
+
+        # Globbed files may be links to files outside of the root
+        for source in sources:
+            _in_root(self, source)
+        paths = [_api_path(self, source) for source in sources]
+
+        if output_dir is not None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future] = {}
+        for path, source in zip(paths, sources):
+            target = (output_dir or source.parent) / f"{source.stem}.jcad"
+            futures[path] = self._export(loop, source, target, blob)
+
+        job_id = self.settings["jupytercad_export_jobs"].start_batch(futures)
+        self.set_status(202)
+        self.finish(json.dumps({"done": not futures, "job": job_id}))
+
+    def _export(
+        self, loop: asyncio.AbstractEventLoop, source: Path, target: Path, blob: bool
+    ) -> asyncio.Future:
+        if source.suffix[1:].lower() not in EXPORT_FILE_TYPES:
+            future = loop.create_future()
+            future.set_exception(ValueError(f"{source.suffix} files are not supported"))
+            return future
+        return loop.run_in_executor(
+            _batch_export_pool(self.settings), export_to_jcad, source, target, blob
+        )
+
+
+def _find_sources(directory: Path, pattern: str) -> List[Path]:
+    """Find the files of `directory` matching `pattern` which can be exported"""
+    return sorted(
+        path
+        for path in directory.glob(pattern)
+        if path.is_file() and path.suffix[1:].lower() in EXPORT_FILE_TYPES
+    )
+
+
+def _batch_export_pool(settings: Dict) -> ProcessPoolExecutor:
+    """Get the process pool of batch exports, creating it on first use"""
+    pool = settings.get("jupytercad_export_pool")
+    if pool is None:
+        # Forking a process running the server threads is not safe
+        pool = settings["jupytercad_export_pool"] = ProcessPoolExecutor(
+            max_workers=BATCH_EXPORT_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return pool
+
+
+class JCadExportJobHandler(APIHandler):
+    @tornado.web.authenticated
+    def get(self, job_id: str):
+        job = self.settings["jupytercad_export_jobs"].get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, f"No export job {job_id}")
+        self.finish(json.dumps(job))
+
+
+class JCadBlobHandler(APIHandler):
+    @tornado.web.authenticated
+    def get(self):
+        path = self.get_query_argument("path")
+        reference = self.get_query_argument("ref")
+        if not is_blob_reference(reference):
+            raise tornado.web.HTTPError(400, f"Invalid blob reference {reference}")
+        if not path.split(":", 1)[-1].strip("/"):
+            raise tornado.web.HTTPError(400, "A document without a path has no blobs")
+
+        blob_store = BlobStore.for_document(_document_path(self, path))
+        try:
+            content = blob_store.get(reference)
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"Invalid blob reference {reference}")
+        except FileNotFoundError:
+            raise tornado.web.HTTPError(404, f"Blob {reference} not found")
+
+        self.set_header("Content-Type", "text/plain; charset=UTF-8")
+        # Blobs are content-addressed, they never change
+        self.set_header("Cache-Control", "private, max-age=31536000, immutable")
+        self.finish(content)
+
+
+class JCadMeshHandler(APIHandler):
+    """
+    The persistent cache of meshes, shared by all the clients and kernels.
+
+    Meshes are opaque payloads keyed by the hash of their object subtree and
+    tessellation settings, see :func:`jupytercad_core.meshcache.mesh_cache_key`.
+    A client computing a mesh which is not in the cache stores it with a PUT
+    request, in the format of :func:`jupytercad_core.meshcache.encode_mesh`.
+    """
 
-        # Get filename removing the drive prefix
-        file_name = body["path"].split(":")[1]
-        export_name = body["newName"]
-
-        root_dir = Path(self.contents_manager.root_dir).resolve()
-        file_name = Path(to_os_path(ApiPath(file_name), str(root_dir)))
-
-        with open(file_name, "r") as fobj:
-            file_content = fobj.read()
-
-        jcad = dict(
-            schemaVersion=SCHEMA_VERSION,
-            objects=[
-                dict(
-                    name=Path(export_name).stem,
-                    visible=True,
-                    shape="Part::Any",
-                    parameters=dict(
-                        Content=file_content,
-                        Type=str(Path(Path(file_name).suffix[1:])),
-                        Color="#808080",
-                        Placement=dict(Position=[0, 0, 0], Axis=[0, 0, 1], Angle=0),
-                    ),
-                )
-            ],
-            metadata={},
-            options={},
-            outputs={},
+    # Meshes larger than this are not cached
+    MAX_MESH_SIZE = 64 * 1024 * 1024
+
+    @property
+    def mesh_cache(self) -> MeshCache:
+        return self.settings["jupytercad_mesh_cache"]
+
+    @tornado.web.authenticated
+    async def get(self, key: str):
+        data = await asyncio.get_running_loop().run_in_executor(
+            None, self.mesh_cache.get, key
         )
+        if data is None:
+            raise tornado.web.HTTPError(404, f"Mesh {key} not found")
+
+        self.set_header("Content-Type", "application/octet-stream")
+        # Meshes are content-addressed, they never change
+        self.set_header("Cache-Control", "private, max-age=31536000, immutable")
+        self.finish(data)
 
-        with open(Path(file_name).parents[0] / export_name, "w") as fobj:
-            fobj.write(json.dumps(jcad, indent=2))
+    @tornado.web.authenticated
+    async def put(self, key: str):
+        data = self.request.body
+        if len(data) > self.MAX_MESH_SIZE:
+            raise tornado.web.HTTPError(413, "The mesh is too large to be cached")
+        try:
+            self.mesh_cache.path(key)
+            decode_mesh(data)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, str(e))
 
-        self.finish(json.dumps({"done": True}))
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.mesh_cache.put, key, data
+        )
+        self.set_status(204)
+        self.finish()
 
 
 def setup_handlers(web_app):
@@ -54,5 +317,25 @@ def setup_handlers(web_app):
 
     base_url = web_app.settings["base_url"]
     route_pattern = url_path_join(base_url, "jupytercad", "export")
-    handlers = [(route_pattern, JCadExportHandler)]
+    batch_pattern = url_path_join(base_url, "jupytercad", "export", "batch")
+    job_pattern = url_path_join(base_url, "jupytercad", "export", r"([^/]+)")
+    blob_pattern = url_path_join(base_url, "jupytercad", "blob")
+    mesh_pattern = url_path_join(base_url, "jupytercad", "mesh", r"([0-9a-f]{64})")
+    handlers = [
+        (route_pattern, JCadExportHandler),
+        # Before the job pattern, which would match it
+        (batch_pattern, JCadBatchExportHandler),
+        (job_pattern, JCadExportJobHandler),
+        (blob_pattern, JCadBlobHandler),
+        (mesh_pattern, JCadMeshHandler),
+    ]
+    web_app.settings["jupytercad_export_jobs"] = ExportJobs()
+    web_app.settings["jupytercad_mesh_cache"] = MeshCache()
     web_app.add_handlers(host_pattern, handlers)
+
+
+def shutdown_handlers(web_app):
+    # Cancel the pending batch exports rather than waiting for them on exit
+    pool = web_app.settings.pop("jupytercad_export_pool", None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,270 @@
+"""
+Lazy reading of ``.jcad`` files.
+
+The file is memory-mapped and indexed in one pass over its bytes: the span of
+each object in the file is found by matching its brackets, string bodies being
+skipped without being decoded, and only the name, shape and visibility of the
+objects are decoded. Objects, and their possibly large contents, are then
+decoded only when they are accessed, so that the decoded objects are never
+held in memory as a whole.
+"""
+
+import json
+import mmap
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .schema import SCHEMA_VERSION
+
+Span = Tuple[int, int]
+
+BytesLike = Union[bytes, mmap.mmap]
+
+# A JSON string, escapes included
+_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# The tokens of a JSON array or object that matter to find its end, strings
+# being matched whole so that the brackets they hold are ignored
+_TOKEN_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]', re.DOTALL)
+# A number, true, false or null
+_SCALAR_RE = re.compile(rb"[^\s,:\[\]{}\"]+")
+_WHITESPACE_RE = re.compile(rb"[ \t\n\r]*")
+
+_COLON_RE = re.compile(rb"[ \t\n\r]*:[ \t\n\r]*")
+
+_QUOTE, _BRACE, _BRACKET = ord('"'), ord("{"), ord("]")
+_OPENING = frozenset(b"[{")
+
+# The members of the objects which are decoded when indexing, by raw key
+_ENTRY_KEYS = {b'"name"': "name", b'"shape"': "shape", b'"visible"': "visible"}
+_MAX_KEY_SIZE = max(map(len, _ENTRY_KEYS))
+
+
+def _skip(data: BytesLike, position: int, token: Optional[bytes] = None) -> int:
+    """
+    Skip the whitespace at `position`, and the `token` following it and its
+    trailing whitespace if given.
+
+    :return: The position of the next value or token.
+    """
+    position = _WHITESPACE_RE.match(data, position).end()
+    if token is None:
+        return position
+    if data[position : position + 1] != token:
+        raise ValueError(f"Invalid jcad file, expected {token!r} at {position}")
+    return _WHITESPACE_RE.match(data, position + 1).end()
+
+
+def _value_end(data: BytesLike, position: int) -> int:
+    """
+    Returns the end of the JSON value at `position`, without decoding it.
+    """
+    if position >= len(data):
+        raise ValueError("Invalid jcad file, unexpected end of file")
+    first = data[position]
+    if first == _QUOTE:
+        match = _STRING_RE.match(data, position)
+    elif first in _OPENING:
+        depth = 0
+        for match in _TOKEN_RE.finditer(data, position):
+            token = data[match.start()]
+            if token == _QUOTE:
+                continue
+            if token in _OPENING:
+                depth += 1
+            else:
+                depth -= 1
+                if not depth:
+                    return match.end()
+        match = None
+    else:
+        match = _SCALAR_RE.match(data, position)
+    if match is None:
+        raise ValueError(f"Invalid jcad file, invalid value at {position}")
+    return match.end()
+
+
+def _decode_value(raw: bytes) -> Any:
+    """
+    Decode a small JSON value, sparing the JSON decoder for the common cases.
+    """
+    if raw == b"true":
+        return True
+    if raw == b"false":
+        return False
+    if raw[:1] == b'"' and b"\\" not in raw:
+        return raw[1:-1].decode()
+    return json.loads(raw)
+
+
+def _index_objects(data: BytesLike, position: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Index the array of objects starting at `position`.
+
+    :return: The entries of the objects and the position following the array.
+    """
+    entries: List[Dict[str, Any]] = []
+    entry: Dict[str, Any] = {}
+    depth = 0
+    for match in _TOKEN_RE.finditer(data, _skip(data, position, b"[")):
+        start, end = match.span()
+        token = data[start]
+        if token == _QUOTE:
+            # Only the short keys of the objects themselves are looked at
+            if depth == 1 and end - start <= _MAX_KEY_SIZE:
+                field = _ENTRY_KEYS.get(data[start:end])
+                colon = field and _COLON_RE.match(data, end)
+                if colon:
+                    value_end = _value_end(data, colon.end())
+                    entry[field] = _decode_value(data[colon.end() : value_end])
+            elif depth == 0:
+                raise ValueError("Invalid jcad file, objects must be JSON objects")
+        elif token in _OPENING:
+            if depth == 0:
+                if token != _BRACE:
+                    raise ValueError("Invalid jcad file, objects must be JSON objects")
+                entry = dict(name=None, shape=None, visible=True, span=(start, None))
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                entry["span"] = (entry["span"][0], end)
+                entries.append(entry)
+            elif depth < 0:
+                if token != _BRACKET:
+                    break
+                return entries, end
+    raise ValueError("Invalid jcad file, the objects array is not terminated")
+
+
+def index_jcad(data: BytesLike) -> Dict[str, Any]:
+    """
+    Index the content of a ``.jcad`` file in one pass, without decoding the
+    objects.
+
+    :param data: The content of the file, e.g. memory-mapped.
+    :return: A dictionary holding the other ``members`` of the document, like
+    its ``options``, and the ``objects`` entries. Each entry holds the byte
+    ``span`` of the object in `data`, and its ``name``, ``shape`` and
+    ``visible`` members.
+    """
+    members: Dict[str, Any] = {}
+    entries: Optional[List[Dict[str, Any]]] = None
+    position = _skip(data, _skip(data, 0), b"{")
+    while data[position : position + 1] != b"}":
+        match = _STRING_RE.match(data, position)
+        if match is None:
+            raise ValueError(f"Invalid jcad file, expected a key at {position}")
+        key = json.loads(match.group())
+        position = _skip(data, match.end(), b":")
+        if key == "objects":
+            entries, position = _index_objects(data, position)
+        else:
+            end = _value_end(data, position)
+            members[key] = json.loads(data[position:end])
+            position = end
+        position = _skip(data, position)
+        if data[position : position + 1] == b",":
+            position = _skip(data, position, b",")
+        elif data[position : position + 1] != b"}":
+            raise ValueError(f"Invalid jcad file, expected ',' at {position}")
+    if entries is None or _skip(data, position + 1) != len(data):
+        raise ValueError("Invalid jcad file")
+    return dict(members=members, objects=entries)
+
+
+class JCadFile:
+    """
+    Read a ``.jcad`` file, decoding each object only when it is accessed.
+    The file is memory-mapped and indexed when it is opened.
+
+    :param file: The path of the file.
+    """
+
+    def __init__(self, file: Union[str, Path]):
+        with open(file, "rb") as fobj:
+            try:
+                self._data: BytesLike = mmap.mmap(
+                    fobj.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                # Empty files cannot be mapped
+                self._data = b""
+        try:
+            index = index_jcad(self._data)
+        except (ValueError, IndexError):
+            self.close()
+            raise ValueError(f"Invalid jcad file {file}") from None
+
+        members = index["members"]
+        self._objects = index["objects"]
+        self._entries = {}
+        for entry in self._objects:
+            # The first object wins if names are duplicated
+            self._entries.setdefault(entry["name"], entry)
+        self.manifest: Dict[str, Any] = dict(
+            schemaVersion=members.get("schemaVersion", SCHEMA_VERSION),
+            objects=[
+                dict(name=entry["name"], shape=entry["shape"], visible=entry["visible"])
+                for entry in self._objects
+            ],
+            options=members.get("options", {}),
+            metadata=members.get("metadata", {}),
+            outputs=members.get("outputs", {}),
+        )
+
+    def __enter__(self) -> "JCadFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = b""
+
+    def _decode(self, span: Span) -> Dict[str, Any]:
+        return json.loads(self._data[span[0] : span[1]].decode())
+
+    @property
+    def names(self) -> List[str]:
+        """
+        The names of the objects, in the document order.
+        """
+        return [entry["name"] for entry in self.manifest["objects"]]
+
+    @property
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        The entries (name, shape and visibility) of the objects.
+        """
+        return self.manifest["objects"]
+
+    def get_object(self, name: str) -> Dict[str, Any]:
+        """
+        Returns an object, decoding it from the file.
+
+        :param name: The name of the object.
+        """
+        if name not in self._entries:
+            raise KeyError(f"No object named {name}")
+        return self._decode(self._entries[name]["span"])
+
+    def get_content(self, name: str) -> Optional[str]:
+        """
+        Returns the ``Content`` parameter of an object, or None.
+
+        :param name: The name of the object.
+        """
+        return (self.get_object(name).get("parameters") or {}).get("Content")
+
+    def iter_objects(self, reverse: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the objects in the document order, decoding them one at
+        a time.
+
+        :param reverse: Whether to iterate in the reverse order.
+        """
+        for entry in reversed(self._objects) if reverse else self._objects:
+            yield self._decode(entry["span"])
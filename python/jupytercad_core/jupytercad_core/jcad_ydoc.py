@@ -1,5 +1,5 @@
 import json
-from typing import Any, Callable
+from typing import Any, Callable, Collection, Dict, List, Optional
 from functools import partial
 
 from packaging.version import Version
@@ -20,6 +20,13 @@ class YJCad(YBaseDoc):
         self._ydoc["outputs"] = self._youtputs = Map()
         self.undo_manager.expand_scope(self._yobjects)
 
+        # Serialized JSON of each object, aligned with the objects array.
+        # `None` marks an object which needs to be serialized again.
+        self._object_fragments: List[Optional[str]] = [None] * len(self._yobjects)
+        self._fragments_subscription = self._yobjects.observe_deep(
+            self._invalidate_fragments
+        )
+
     @property
     def version(self) -> str:
         return SCHEMA_VERSION
@@ -30,14 +37,13 @@ class YJCad(YBaseDoc):
         :return: Document's content.
         :rtype: Any
         """
-        objects = self._yobjects.to_py()
         options = self._yoptions.to_py()
         meta = self._ymetadata.to_py()
         outputs = self._youtputs.to_py()
-        return json.dumps(
+        content = json.dumps(
             dict(
                 schemaVersion=SCHEMA_VERSION,
-                objects=objects,
+                objects=[],
                 options=options,
                 metadata=meta,
                 outputs=outputs,
@@ -45,6 +51,12 @@ class YJCad(YBaseDoc):
             indent=2,
             sort_keys=True,
         )
+        fragments = self._get_object_fragments()
+        if not fragments:
+            return content
+
+        objects = "[\n" + ",\n".join(fragments) + "\n  ]"
+        return content.replace('\n  "objects": []', '\n  "objects": ' + objects, 1)
 
     def set(self, value: str) -> None:
         """
@@ -52,32 +64,93 @@ class YJCad(YBaseDoc):
         :param value: The content of the document.
         :type value: Any
         """
-        valueDict = json.loads(value)
+        self._set_content(json.loads(value))
 
-        # Assuming file version 3.0.0 if the version is not specified
-        file_version = (
-            Version(valueDict["schemaVersion"])
-            if "schemaVersion" in valueDict
-            else Version("3.0.0")
-        )
-        if file_version > Version(SCHEMA_VERSION):
-            raise ValueError(f"Cannot load file version {file_version}")
+    def _set_content(self, valueDict: Dict) -> None:
+        _check_version(valueDict)
+        objects = valueDict["objects"]
+        with self._ydoc.transaction():
+            self._set_objects([obj["name"] for obj in objects], objects.__getitem__)
+            self._set_metadata(valueDict)
 
-        newObj = []
-        for obj in valueDict["objects"]:
-            newObj.append(Map(obj))
+    def _set_metadata(self, valueDict: Dict) -> None:
+        _patch_map(self._yoptions, valueDict.get("options", {}))
+        _patch_map(self._ymetadata, valueDict.get("metadata", {}))
+        _patch_map(self._youtputs, valueDict.get("outputs", {}))
 
-        self._yobjects.clear()
-        self._yobjects.extend(newObj)
+    def _set_objects(
+        self,
+        names: List[str],
+        get_object: Callable[[int], Dict],
+        unchanged: Collection[str] = (),
+        current: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Update the objects array so that it matches the new objects, touching
+        only the objects (and the object keys) that actually changed.
+        Objects are matched by name, and only loaded with `get_object` (from
+        their new index) when they need to be compared or inserted.
+
+        :param names: The names of the new objects.
+        :param get_object: Returns the new object at an index.
+        :param unchanged: The names of the objects known to be unchanged, which
+        are not compared if they did not move.
+        :param current: The names of the current objects, if they are known.
+        """
+        if len(set(names)) != len(names):
+            # Objects cannot be matched by name, rebuild the whole array
+            self._yobjects.clear()
+            self._yobjects.extend([Map(get_object(i)) for i in range(len(names))])
+            return
 
-        self._yoptions.clear()
-        self._yoptions.update(valueDict.get("options", {}))
+        if current is None:
+            current = [yobj.get("name") for yobj in self._yobjects]
+        else:
+            current = list(current)
+        wanted = set(names)
+        for index in reversed(range(len(current))):
+            if current[index] not in wanted:
+                del self._yobjects[index]
+                del current[index]
 
-        self._ymetadata.clear()
-        self._ymetadata.update(valueDict.get("metadata", {}))
+        for index, name in enumerate(names):
+            if index < len(current) and current[index] == name:
+                if name not in unchanged:
+                    _patch_map(self._yobjects[index], get_object(index))
+                continue
 
-        self._youtputs.clear()
-        self._youtputs.update(valueDict.get("outputs", {}))
+            if name in current:
+                # The object moved, remove it from its old position
+                old_index = current.index(name, index)
+                del self._yobjects[old_index]
+                del current[old_index]
+
+            self._yobjects.insert(index, Map(get_object(index)))
+            current.insert(index, name)
+
+        if len(self._yobjects) > len(names):
+            del self._yobjects[len(names) :]
+
+    def _get_object_fragments(self) -> List[str]:
+        return [self._get_object_fragment(i) for i in range(len(self._yobjects))]
+
+    def _get_object_fragment(self, index: int) -> str:
+        """
+        Returns the serialized JSON of the object at `index`, as it is
+        indented in the whole document, serializing it again if it changed.
+        """
+        fragments = self._object_fragments
+        if len(fragments) != len(self._yobjects):
+            fragments[:] = [None] * len(self._yobjects)
+
+        fragment = fragments[index]
+        if fragment is None:
+            obj = json.dumps(self._yobjects[index].to_py(), indent=2, sort_keys=True)
+            fragment = fragments[index] = "    " + obj.replace("\n", "\n    ")
+        return fragment
+
+    def _invalidate_fragments(self, events: List[Any]) -> None:
+        _invalidate_object_cache(self._object_fragments, events)
 
     def observe(self, callback: Callable[[str, Any], None]):
         self.unobserve()
@@ -96,3 +169,54 @@ class YJCad(YBaseDoc):
         self._subscriptions[self._ymetadata] = self._ymetadata.observe_deep(
             partial(callback, "meta")
         )
+
+
+def _invalidate_object_cache(cache: List[Any], events: List[Any]) -> None:
+    """
+    Update a cache aligned with the objects array after changes to the array,
+    `None` marking the objects which were inserted or modified.
+    """
+    # Structural changes of the objects array
+    for event in events:
+        if event.path:
+            continue
+        index = 0
+        for change in event.delta:
+            if "retain" in change:
+                index += change["retain"]
+            elif "delete" in change:
+                del cache[index : index + change["delete"]]
+            elif "insert" in change:
+                count = len(change["insert"])
+                cache[index:index] = [None] * count
+                index += count
+
+    # Changes inside an object, paths are relative to the new array state
+    for event in events:
+        if event.path and event.path[0] < len(cache):
+            cache[event.path[0]] = None
+
+
+def _check_version(valueDict: Dict) -> None:
+    # Assuming file version 3.0.0 if the version is not specified
+    file_version = Version(valueDict.get("schemaVersion", "3.0.0"))
+    if file_version > Version(SCHEMA_VERSION):
+        raise ValueError(f"Cannot load file version {file_version}")
+
+
+def _to_py(value: Any) -> Any:
+    return value.to_py() if hasattr(value, "to_py") else value
+
+
+def _patch_map(ymap: Map, value: Dict) -> None:
+    """
+    Update `ymap` so that it matches `value`, only writing the keys
+    that were added, removed or modified.
+    """
+    for key in list(ymap.keys()):
+        if key not in value:
+            del ymap[key]
+
+    for key, item in value.items():
+        if key not in ymap or _to_py(ymap[key]) != item:
+            ymap[key] = item
@@ -0,0 +1,346 @@
+"""
+The ``.jcadz`` container format.
+
+A ``.jcadz`` file is a zip archive holding a ``manifest.json`` member and one
+compressed member per object. The manifest holds the document options,
+metadata and outputs, and a lightweight entry (name, shape, visibility) for
+each object, so that a document can be opened and listed without
+decompressing the object payloads.
+"""
+
+import io
+import json
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from .schema import SCHEMA_VERSION
+
+JCADZ_FORMAT_VERSION = 1
+JCADZ_MANIFEST = "manifest.json"
+
+# Fixed timestamp (1980-01-01 00:00:00 in DOS format) so that saving the same
+# content always gives the same bytes
+_ZIP_DOS_TIME, _ZIP_DOS_DATE = 0, (1 << 5) | 1
+# Names are UTF-8 encoded
+_ZIP_FLAGS = 1 << 11
+_ZIP_VERSION = 20
+_ZIP64_VERSION = 45
+_ZIP_LIMIT = 0xFFFFFFFF
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_END_LOCATOR = struct.Struct("<IIQI")
+
+
+class CompressedMember(NamedTuple):
+    """
+    A member of a ``.jcadz`` archive, as a raw deflate stream.
+    """
+
+    data: bytes
+    crc: int
+    size: int
+
+    @classmethod
+    def compress(cls, text: str) -> "CompressedMember":
+        raw = text.encode("utf-8")
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        data = compressor.compress(raw) + compressor.flush()
+        return cls(data, zlib.crc32(raw), len(raw))
+
+    def decompress(self) -> str:
+        raw = zlib.decompress(self.data, -15)
+        if len(raw) != self.size or zlib.crc32(raw) != self.crc:
+            raise ValueError("Invalid jcadz member, the checksum does not match")
+        return raw.decode("utf-8")
+
+
+def _write_zip(
+    file: IO[bytes], members: Iterable[Tuple[str, CompressedMember]]
+) -> None:
+    """
+    Write a zip archive of already compressed members, so that the members of
+    a document which did not change are not compressed again.
+    Archives of more than 65535 members use the zip64 end records, larger
+    archives are not supported.
+    """
+    central = []
+    offset = 0
+    for name, member in members:
+        encoded = name.encode("utf-8")
+        header = (
+            zlib.DEFLATED,
+            _ZIP_DOS_TIME,
+            _ZIP_DOS_DATE,
+            member.crc,
+            len(member.data),
+            member.size,
+            len(encoded),
+        )
+        if offset > _ZIP_LIMIT or member.size > _ZIP_LIMIT:
+            raise ValueError("jcadz files larger than 4 GiB are not supported")
+        file.write(_LOCAL_HEADER.pack(0x04034B50, _ZIP_VERSION, _ZIP_FLAGS, *header, 0))
+        file.write(encoded)
+        file.write(member.data)
+        central.append(
+            _CENTRAL_HEADER.pack(
+                0x02014B50,
+                _ZIP_VERSION,
+                _ZIP_VERSION,
+                _ZIP_FLAGS,
+                *header,
+                0,
+                0,
+                0,
+                0,
+                0,
+                offset,
+            )
+            + encoded
+        )
+        offset += _LOCAL_HEADER.size + len(encoded) + len(member.data)
+
+    directory = b"".join(central)
+    count = len(central)
+    if offset + len(directory) > _ZIP_LIMIT:
+        raise ValueError("jcadz files larger than 4 GiB are not supported")
+    file.write(directory)
+    if count > 0xFFFF:
+        end = offset + len(directory)
+        file.write(
+            _ZIP64_END_RECORD.pack(
+                0x06064B50,
+                _ZIP64_END_RECORD.size - 12,
+                _ZIP64_VERSION,
+                _ZIP64_VERSION,
+                0,
+                0,
+                count,
+                count,
+                len(directory),
+                offset,
+            )
+        )
+        file.write(_ZIP64_END_LOCATOR.pack(0x07064B50, 0, end, 1))
+        count = 0xFFFF
+    file.write(
+        _END_RECORD.pack(0x06054B50, 0, 0, count, count, len(directory), offset, 0)
+    )
+
+
+def dump_jcadz_members(
+    content: Dict[str, Any],
+    objects: Iterable[Tuple[Dict[str, Any], CompressedMember]],
+    file: Union[str, Path, IO[bytes]],
+) -> None:
+    """
+    Write a ``.jcadz`` file from already compressed objects.
+
+    :param content: The document content, its objects being ignored.
+    :param objects: The manifest entry (name, shape and visibility) of each
+    object, and its compressed member.
+    :param file: The path of the file or a writable binary file object.
+    """
+    if isinstance(file, (str, Path)):
+        with open(file, "wb") as fobj:
+            dump_jcadz_members(content, objects, fobj)
+        return
+
+    entries = []
+
+    def members() -> Iterator[Tuple[str, CompressedMember]]:
+        for index, (entry, member) in enumerate(objects):
+            name = f"objects/{index}.json"
+            entries.append(dict(entry, member=name))
+            yield name, member
+
+        manifest = dict(
+            formatVersion=JCADZ_FORMAT_VERSION,
+            schemaVersion=content.get("schemaVersion", SCHEMA_VERSION),
+            objects=entries,
+            options=content.get("options", {}),
+            metadata=content.get("metadata", {}),
+            outputs=content.get("outputs", {}),
+        )
+        text = json.dumps(manifest, indent=2, sort_keys=True)
+        yield JCADZ_MANIFEST, CompressedMember.compress(text)
+
+    _write_zip(file, members())
+
+
+def manifest_entry(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the manifest entry (name, shape and visibility) of an object.
+    """
+    return dict(
+        name=obj["name"], shape=obj.get("shape"), visible=obj.get("visible", True)
+    )
+
+
+def dump_jcadz(content: Dict[str, Any], file: Union[str, Path, IO[bytes]]) -> None:
+    """
+    Write a document content to a ``.jcadz`` file.
+
+    :param content: The document content, as in a ``.jcad`` file.
+    :param file: The path of the file or a writable binary file object.
+    """
+    dump_jcadz_members(
+        content,
+        (
+            (
+                manifest_entry(obj),
+                CompressedMember.compress(
+                    json.dumps(obj, separators=(",", ":"), sort_keys=True)
+                ),
+            )
+            for obj in content.get("objects", [])
+        ),
+        file,
+    )
+
+
+def dumps_jcadz(content: Dict[str, Any]) -> bytes:
+    """
+    Returns the ``.jcadz`` bytes of a document content.
+    """
+    buffer = io.BytesIO()
+    dump_jcadz(content, buffer)
+    return buffer.getvalue()
+
+
+class JCadZFile:
+    """
+    Read a ``.jcadz`` file, decompressing each object only when it is
+    accessed.
+
+    :param file: The path of the file, its content, or a readable binary file object.
+    """
+
+    def __init__(self, file: Union[str, Path, bytes, IO[bytes]]):
+        if isinstance(file, bytes):
+            file = io.BytesIO(file)
+        self._owned = isinstance(file, (str, Path))
+        self._file: IO[bytes] = open(file, "rb") if self._owned else file
+        try:
+            self._archive = zipfile.ZipFile(self._file, "r")
+            self.manifest: Dict[str, Any] = json.loads(
+                self._archive.read(JCADZ_MANIFEST)
+            )
+        except KeyError:
+            self.close()
+            raise ValueError("Invalid jcadz file, the manifest is missing")
+        except BaseException:
+            self.close()
+            raise
+
+        version = self.manifest.get("formatVersion", JCADZ_FORMAT_VERSION)
+        if version > JCADZ_FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Cannot load jcadz format version {version}")
+
+        self._entries = {entry["name"]: entry for entry in self.manifest["objects"]}
+
+    def __enter__(self) -> "JCadZFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if hasattr(self, "_archive"):
+            self._archive.close()
+        if self._owned:
+            self._file.close()
+
+    @property
+    def names(self) -> List[str]:
+        """
+        The names of the objects, in the document order.
+        """
+        return [entry["name"] for entry in self.manifest["objects"]]
+
+    @property
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        The manifest entries (name, shape and visibility) of the objects.
+        """
+        return self.manifest["objects"]
+
+    def get_object(self, name: str) -> Dict[str, Any]:
+        """
+        Returns an object, decompressing it from the archive.
+
+        :param name: The name of the object.
+        """
+        if name not in self._entries:
+            raise KeyError(f"No object named {name}")
+        return json.loads(self._archive.read(self._entries[name]["member"]))
+
+    def get_member(self, name: str) -> CompressedMember:
+        """
+        Returns the compressed member of an object, without decompressing it.
+
+        :param name: The name of the object.
+        """
+        if name not in self._entries:
+            raise KeyError(f"No object named {name}")
+        return self._read_member(self._entries[name])
+
+    def iter_members(self) -> Iterator[CompressedMember]:
+        """
+        Iterate over the compressed members of the objects in the document
+        order, without decompressing them.
+        """
+        for entry in self.manifest["objects"]:
+            yield self._read_member(entry)
+
+    def _read_member(self, entry: Dict[str, Any]) -> CompressedMember:
+        info = self._archive.getinfo(entry["member"])
+        if info.compress_type != zipfile.ZIP_DEFLATED or info.flag_bits & 0x1:
+            # Not a plain deflate stream, compress it again
+            return CompressedMember.compress(self._archive.read(info).decode("utf-8"))
+
+        # The local header of a member may differ from its central header
+        self._file.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(self._file.read(_LOCAL_HEADER.size))
+        if header[0] != 0x04034B50:
+            raise ValueError(f"Invalid jcadz file, bad header for {info.filename}")
+        self._file.seek(info.header_offset + _LOCAL_HEADER.size + sum(header[-2:]))
+        return CompressedMember(
+            self._file.read(info.compress_size), info.CRC, info.file_size
+        )
+
+    def iter_objects(self, reverse: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the objects in the document order, decompressing them one
+        at a time.
+
+        :param reverse: Whether to iterate in the reverse order.
+        """
+        entries = self.manifest["objects"]
+        for entry in reversed(entries) if reverse else entries:
+            yield json.loads(self._archive.read(entry["member"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the whole document content, as in a ``.jcad`` file.
+        """
+        return dict(
+            schemaVersion=self.manifest.get("schemaVersion", SCHEMA_VERSION),
+            objects=list(self.iter_objects()),
+            options=self.manifest.get("options", {}),
+            metadata=self.manifest.get("metadata", {}),
+            outputs=self.manifest.get("outputs", {}),
+        )
+
+
+def load_jcadz(file: Union[str, Path, bytes, IO[bytes]]) -> Dict[str, Any]:
+    """
+    Returns the content of a ``.jcadz`` file, as in a ``.jcad`` file.
+    """
+    with JCadZFile(file) as jcadz:
+        return jcadz.to_dict()
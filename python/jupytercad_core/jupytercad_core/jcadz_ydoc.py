@@ -0,0 +1,102 @@
+import base64
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from .jcad_ydoc import YJCad, _check_version, _invalidate_object_cache
+from .jcadz import CompressedMember, JCadZFile, dump_jcadz_members, manifest_entry
+
+_Member = Tuple[Dict[str, Any], CompressedMember]
+
+
+class YJCadZ(YJCad):
+    """
+    A document backed by a compressed ``.jcadz`` file. The file content is
+    exchanged as a base64 string, the shared model is the same as for ``.jcad``.
+
+    The compressed member of each object is kept, so that only the objects
+    which changed are compressed again when the document is saved, and only
+    the objects which changed are decompressed when the file is loaded again.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Manifest entry and compressed member of each object, aligned with the
+        # objects array. `None` marks an object which needs to be compressed
+        # again.
+        self._object_members: List[Optional[_Member]] = [None] * len(self._yobjects)
+
+    def get(self) -> str:
+        """
+        Returns the content of the document.
+        :return: Document's content, as a base64 encoded ``.jcadz`` file.
+        :rtype: Any
+        """
+        members = self._get_object_members()
+        for index, member in enumerate(members):
+            if member is None:
+                members[index] = (
+                    manifest_entry(self._yobjects[index]),
+                    CompressedMember.compress(self._get_object_fragment(index)),
+                )
+
+        content = dict(
+            schemaVersion=self.version,
+            options=self._yoptions.to_py(),
+            metadata=self._ymetadata.to_py(),
+            outputs=self._youtputs.to_py(),
+        )
+        buffer = io.BytesIO()
+        dump_jcadz_members(content, members, buffer)
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    def set(self, value: str) -> None:
+        """
+        Sets the content of the document.
+        :param value: The base64 encoded content of the ``.jcadz`` file.
+        :type value: Any
+        """
+        with JCadZFile(base64.b64decode(value)) as jcadz:
+            _check_version(jcadz.manifest)
+            entries = [manifest_entry(entry) for entry in jcadz.entries]
+            members = list(zip(entries, jcadz.iter_members()))
+        names = [entry["name"] for entry in entries]
+
+        known = {
+            member[0]["name"]: member[1]
+            for member in self._get_object_members()
+            if member is not None
+        }
+        unchanged = {
+            entry["name"]
+            for entry, member in members
+            if known.get(entry["name"]) == member
+        }
+        # The names of the current objects are known if they are all cached,
+        # which spares reading them from the shared model
+        current = (
+            [member[0]["name"] for member in self._object_members]
+            if len(known) == len(self._object_members)
+            else None
+        )
+
+        with self._ydoc.transaction():
+            self._set_objects(
+                names,
+                lambda index: json.loads(members[index][1].decompress()),
+                unchanged,
+                current,
+            )
+            self._set_metadata(jcadz.manifest)
+        # The objects now match the members of the file
+        self._object_members[:] = members
+
+    def _get_object_members(self) -> List[Optional[_Member]]:
+        members = self._object_members
+        if len(members) != len(self._yobjects):
+            members[:] = [None] * len(self._yobjects)
+        return members
+
+    def _invalidate_fragments(self, events: List[Any]) -> None:
+        super()._invalidate_fragments(events)
+        _invalidate_object_cache(self._object_members, events)
@@ -0,0 +1,474 @@
+"""
+Triangle meshes of Open Cascade shapes, and their export to glTF.
+
+Shapes are tessellated with the same settings as the OCC worker, and meshes
+are indexed: a (n, 3) ``float32`` array of vertices and a (m, 3) ``uint32``
+array of vertex indices per triangle. :func:`shape_mesh_data` computes the
+meshes displayed by the 3D view instead, with the faces and edge polylines of
+the shape, and the tessellation settings of the document and object, see
+:func:`mesh_settings`.
+"""
+
+import json
+import math
+import struct
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# The tessellation settings of the OCC worker
+DEFAULT_LINEAR_DEFLECTION = 0.1
+DEFAULT_ANGULAR_DEFLECTION = 0.5
+
+# The default tessellation settings of the documents, which can be set in the
+# "tessellation" document option and object member
+DEFAULT_TESSELLATION = {
+    "mode": "fixed",
+    "linearDeflection": DEFAULT_LINEAR_DEFLECTION,
+    "relativeDeflection": 0.001,
+    "angularDeflection": DEFAULT_ANGULAR_DEFLECTION,
+    "progressive": False,
+}
+
+# The factors applied to the deflections of the coarse level of detail
+COARSE_LINEAR_FACTOR = 10
+COARSE_ANGULAR_FACTOR = 2
+
+LEVELS_OF_DETAIL = ("coarse", "fine")
+
+Mesh = Tuple[np.ndarray, np.ndarray]
+
+_GLB_MAGIC = 0x46546C67  # glTF
+_GLB_JSON_CHUNK = 0x4E4F534A  # JSON
+_GLB_BIN_CHUNK = 0x004E4942  # BIN
+_GLTF_FLOAT = 5126
+_GLTF_UNSIGNED_INT = 5125
+_GLTF_ARRAY_BUFFER = 34962
+_GLTF_ELEMENT_ARRAY_BUFFER = 34963
+_GLTF_TRIANGLES = 4
+
+
+def resolve_tessellation(
+    options: Optional[Mapping[str, Any]], jc_object: Mapping[str, Any]
+) -> Dict[str, Any]:
+    """
+    Returns the tessellation settings of an object, set on the object or in
+    the document options.
+
+    :param options: The document options.
+    :param jc_object: The object, from the jcad document.
+    """
+    return {
+        **DEFAULT_TESSELLATION,
+        **((options or {}).get("tessellation") or {}),
+        **(jc_object.get("tessellation") or {}),
+    }
+
+
+def mesh_settings(
+    tessellation: Optional[Mapping[str, Any]] = None, level: str = "fine"
+) -> Dict[str, float]:
+    """
+    Returns the settings of the mesh of an object at a level of detail, as
+    used by :func:`shape_mesh_data` and in the mesh cache keys.
+
+    In the ``fixed`` tessellation mode the linear deflection is absolute,
+    while in the ``auto`` mode it is relative to the bounding box diagonal of
+    the shape. The deflections of the ``coarse`` level are larger.
+
+    :param tessellation: The tessellation settings of the object, see
+    :func:`resolve_tessellation`. The default settings if not given.
+    :param level: The level of detail, ``coarse`` or ``fine``.
+    """
+    if level not in LEVELS_OF_DETAIL:
+        raise ValueError(f"Unknown level of detail {level}")
+    tessellation = {**DEFAULT_TESSELLATION, **(tessellation or {})}
+    coarse = level == "coarse"
+    linear_factor = COARSE_LINEAR_FACTOR if coarse else 1
+    angular_deflection = tessellation["angularDeflection"] * (
+        COARSE_ANGULAR_FACTOR if coarse else 1
+    )
+    if tessellation["mode"] == "auto":
+        return {
+            "relativeDeflection": tessellation["relativeDeflection"] * linear_factor,
+            "angularDeflection": angular_deflection,
+        }
+    return {
+        "linearDeflection": tessellation["linearDeflection"] * linear_factor,
+        "angularDeflection": angular_deflection,
+    }
+
+
+def linear_deflection(shape, settings: Mapping[str, float]) -> float:
+    """
+    Returns the linear deflection of the mesh of a shape, derived from its
+    bounding box if the settings hold a ``relativeDeflection``.
+    You need `pythonocc-core` installed in order to use this function.
+    """
+    relative = settings.get("relativeDeflection")
+    deflection = settings.get("linearDeflection", DEFAULT_LINEAR_DEFLECTION)
+    if relative is None:
+        return deflection
+
+    from OCC.Core.Bnd import Bnd_Box
+    from OCC.Core.BRepBndLib import brepbndlib
+
+    box = Bnd_Box()
+    brepbndlib.Add(shape, box, False)
+    if not box.IsVoid():
+        diagonal = math.sqrt(box.SquareExtent())
+        if diagonal > 0:
+            return diagonal * relative
+    return deflection
+
+
+def tessellate(
+    shape,
+    linear_deflection: float = DEFAULT_LINEAR_DEFLECTION,
+    angular_deflection: float = DEFAULT_ANGULAR_DEFLECTION,
+) -> Mesh:
+    """
+    Tessellate an Open Cascade shape.
+    You need `pythonocc-core` installed in order to use this function.
+
+    :param shape: The shape to tessellate.
+    :param linear_deflection: The maximum distance between the mesh and the shape.
+    :param angular_deflection: The maximum angle between the normals of
+    adjacent triangles, in radians.
+    :return: The vertices and triangles of the mesh.
+    """
+    from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
+
+    BRepMesh_IncrementalMesh(shape, linear_deflection, False, angular_deflection, True)
+
+    vertices: List[np.ndarray] = []
+    triangles: List[np.ndarray] = []
+    offset = 0
+    for nodes, indices in _face_triangulations(shape):
+        vertices.append(nodes)
+        triangles.append(indices + offset)
+        offset += len(nodes)
+
+    if not vertices:
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.uint32)
+    return (
+        np.concatenate(vertices),
+        np.ascontiguousarray(np.concatenate(triangles), dtype=np.uint32),
+    )
+
+
+def _face_triangulations(shape) -> Iterator[Mesh]:
+    """
+    Iterate over the triangulations of the faces of a tessellated shape, as
+    the (n, 3) vertices and the (m, 3) zero-based vertex indices of each face.
+    The triangles of the faces which are not forward are flipped, as in the
+    OCC worker.
+    """
+    from OCC.Core.BRep import BRep_Tool
+    from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_FORWARD
+    from OCC.Core.TopExp import TopExp_Explorer
+    from OCC.Core.TopLoc import TopLoc_Location
+    from OCC.Core.TopoDS import topods
+
+    explorer = TopExp_Explorer(shape, TopAbs_FACE)
+    while explorer.More():
+        face = topods.Face(explorer.Current())
+        explorer.Next()
+        location = TopLoc_Location()
+        triangulation = BRep_Tool.Triangulation(face, location)
+        if triangulation is None:
+            continue
+        transformation = location.Transformation()
+        nodes = np.array(
+            [
+                triangulation.Node(index).Transformed(transformation).Coord()
+                for index in range(1, triangulation.NbNodes() + 1)
+            ],
+            dtype=np.float32,
+        ).reshape(-1, 3)
+        # Triangulation indices start at 1
+        indices = (
+            np.array(
+                [
+                    triangulation.Triangle(index).Get()
+                    for index in range(1, triangulation.NbTriangles() + 1)
+                ],
+                dtype=np.int64,
+            ).reshape(-1, 3)
+            - 1
+        )
+        if face.Orientation() != TopAbs_FORWARD:
+            indices = indices[:, [1, 0, 2]]
+        yield nodes, indices
+
+
+def _concatenate(arrays: Sequence[np.ndarray], dtype) -> np.ndarray:
+    if not arrays:
+        return np.zeros(0, dtype)
+    return np.concatenate(arrays).astype(dtype)
+
+
+def _face_meshes(shape) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    vertices: List[np.ndarray] = []
+    triangles: List[np.ndarray] = []
+    offsets = [0]
+    vertex_count = 0
+    for nodes, indices in _face_triangulations(shape):
+        vertices.append(nodes.reshape(-1))
+        triangles.append((indices + vertex_count).reshape(-1))
+        vertex_count += len(nodes)
+        offsets.append(offsets[-1] + len(indices))
+    return (
+        _concatenate(vertices, np.float32),
+        _concatenate(triangles, np.uint32),
+        np.array(offsets, dtype=np.uint32),
+    )
+
+
+def _merge_polylines(polylines: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(polylines) + 1, dtype=np.uint32)
+    np.cumsum([len(polyline) // 3 for polyline in polylines], out=offsets[1:])
+    return _concatenate(polylines, np.float32), offsets
+
+
+def _edge_polylines(shape) -> List[np.ndarray]:
+    from OCC.Core.BRep import BRep_Tool
+    from OCC.Core.TopAbs import TopAbs_EDGE, TopAbs_FACE
+    from OCC.Core.TopExp import topexp
+    from OCC.Core.TopLoc import TopLoc_Location
+    from OCC.Core.TopoDS import topods
+    from OCC.Core.TopTools import TopTools_IndexedDataMapOfShapeListOfShape
+
+    edges = []
+    edge_faces = TopTools_IndexedDataMapOfShapeListOfShape()
+    topexp.MapShapesAndAncestors(shape, TopAbs_EDGE, TopAbs_FACE, edge_faces)
+    for index in range(1, edge_faces.Extent() + 1):
+        faces = edge_faces.FindFromIndex(index)
+        if faces.Size() == 0:
+            continue
+        edge = topods.Edge(edge_faces.FindKey(index))
+        location = TopLoc_Location()
+        polygon = BRep_Tool.Polygon3D(edge, location)
+        if polygon is not None:
+            nodes = polygon.Nodes()
+            points = [nodes.Value(i) for i in range(nodes.Lower(), nodes.Upper() + 1)]
+        else:
+            triangulation = BRep_Tool.Triangulation(
+                topods.Face(faces.First()), location
+            )
+            if triangulation is None:
+                continue
+            polygon = BRep_Tool.PolygonOnTriangulation(edge, triangulation, location)
+            if polygon is None:
+                continue
+            nodes = polygon.Nodes()
+            points = [
+                triangulation.Node(nodes.Value(i))
+                for i in range(nodes.Lower(), nodes.Upper() + 1)
+            ]
+        transformation = location.Transformation()
+        edges.append(
+            np.array(
+                [point.Transformed(transformation).Coord() for point in points],
+                dtype=np.float32,
+            ).reshape(-1)
+        )
+    return edges
+
+
+def _wire_polylines(shape, linear_deflection: float) -> List[np.ndarray]:
+    from OCC.Core.BRepAdaptor import BRepAdaptor_Curve
+    from OCC.Core.GCPnts import GCPnts_TangentialDeflection
+    from OCC.Core.TopAbs import TopAbs_EDGE
+    from OCC.Core.TopExp import TopExp_Explorer
+    from OCC.Core.TopoDS import topods
+
+    wires = []
+    explorer = TopExp_Explorer(shape, TopAbs_EDGE)
+    while explorer.More():
+        curve = BRepAdaptor_Curve(topods.Edge(explorer.Current()))
+        explorer.Next()
+        points = GCPnts_TangentialDeflection(
+            curve, linear_deflection, 0.1, 2, 1.0e-9, 1.0e-7
+        )
+        wires.append(
+            np.array(
+                [
+                    points.Value(index).Coord()
+                    for index in range(1, points.NbPoints() + 1)
+                ],
+                dtype=np.float32,
+            ).reshape(-1)
+        )
+    return wires
+
+
+def shape_mesh_data(
+    shape,
+    jc_object: Mapping[str, Any],
+    settings: Optional[Mapping[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Compute the mesh of an object as displayed by the 3D view, like the OCC
+    worker. The faces are merged in one mesh, with the flat ``float32`` array
+    of its vertex coordinates (``faceVertices``), the ``uint32`` array of the
+    vertex indices of its triangles (``faceTriangles``) and the index of the
+    first triangle of each face followed by the number of triangles
+    (``faceOffsets``). The polylines of the edges are merged likewise in
+    ``edgeVertices`` and ``edgeOffsets``, which holds vertex indices. The mass
+    properties of the shape are in ``meta``.
+    You need `pythonocc-core` installed in order to use this function.
+
+    :param shape: The shape of the object.
+    :param jc_object: The object, from the jcad document.
+    :param settings: The settings of the mesh, see :func:`mesh_settings`.
+    The default settings if not given.
+    """
+    from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
+    from OCC.Core.BRepTools import breptools
+
+    from .evaluation import shape_metadata
+
+    if settings is None:
+        settings = mesh_settings()
+    deflection = linear_deflection(shape, settings)
+    # Open Cascade keeps an existing triangulation if it is finer
+    breptools.Clean(shape)
+    BRepMesh_IncrementalMesh(
+        shape, deflection, False, settings["angularDeflection"], True
+    )
+    shape_type = jc_object.get("shape")
+    parameters = jc_object.get("parameters") or {}
+    edges = []
+    # The edges of STL meshes are the edges of all their triangles
+    if shape_type != "Part::Any" or parameters.get("Type") != "STL":
+        edges = _edge_polylines(shape)
+    # Only 2D geometries display their wires
+    if shape_type == "Sketcher::SketchObject":
+        edges += _wire_polylines(shape, deflection)
+    face_vertices, face_triangles, face_offsets = _face_meshes(shape)
+    edge_vertices, edge_offsets = _merge_polylines(edges)
+    return dict(
+        faceVertices=face_vertices,
+        faceTriangles=face_triangles,
+        faceOffsets=face_offsets,
+        edgeVertices=edge_vertices,
+        edgeOffsets=edge_offsets,
+        meta=shape_metadata(shape),
+    )
+
+
+def merge_meshes(meshes: Sequence[Mesh]) -> Mesh:
+    """
+    Merge meshes into one mesh.
+    """
+    vertices = [mesh[0] for mesh in meshes]
+    offsets = np.cumsum([0] + [len(v) for v in vertices[:-1]])
+    triangles = [mesh[1] + offset for mesh, offset in zip(meshes, offsets)]
+    if not vertices:
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.uint32)
+    return (
+        np.concatenate(vertices).astype(np.float32),
+        np.concatenate(triangles).astype(np.uint32),
+    )
+
+
+def _color_factor(color: str) -> List[float]:
+    color = color.lstrip("#")
+    return [int(color[i : i + 2], 16) / 255 for i in (0, 2, 4)] + [1.0]
+
+
+def mesh_to_glb(meshes: Sequence[Dict[str, Any]]) -> bytes:
+    """
+    Write meshes in a binary glTF file, with one node per mesh.
+
+    :param meshes: The meshes, as dictionaries holding their ``name``,
+    ``vertices`` and ``triangles``, and optionally their ``color``, as a
+    ``#rrggbb`` string. Empty meshes are skipped.
+    :return: The content of the ``.glb`` file.
+    """
+    buffer = bytearray()
+    gltf: Dict[str, Any] = dict(
+        asset=dict(version="2.0", generator="JupyterCAD"),
+        scene=0,
+        scenes=[dict(nodes=[])],
+        nodes=[],
+        meshes=[],
+        materials=[],
+        accessors=[],
+        bufferViews=[],
+        buffers=[],
+    )
+    materials: Dict[str, int] = {}
+
+    def add_view(data: bytes, target: int) -> int:
+        # Views are aligned on 4 bytes, like their float and uint32 elements
+        gltf["bufferViews"].append(
+            dict(buffer=0, byteOffset=len(buffer), byteLength=len(data), target=target)
+        )
+        buffer.extend(data)
+        return len(gltf["bufferViews"]) - 1
+
+    for mesh in meshes:
+        vertices = np.ascontiguousarray(mesh["vertices"], dtype="<f4")
+        triangles = np.ascontiguousarray(mesh["triangles"], dtype="<u4")
+        if not len(vertices) or not len(triangles):
+            continue
+        positions = len(gltf["accessors"])
+        gltf["accessors"].append(
+            dict(
+                bufferView=add_view(vertices.tobytes(), _GLTF_ARRAY_BUFFER),
+                componentType=_GLTF_FLOAT,
+                count=len(vertices),
+                type="VEC3",
+                min=vertices.min(axis=0).tolist(),
+                max=vertices.max(axis=0).tolist(),
+            )
+        )
+        gltf["accessors"].append(
+            dict(
+                bufferView=add_view(triangles.tobytes(), _GLTF_ELEMENT_ARRAY_BUFFER),
+                componentType=_GLTF_UNSIGNED_INT,
+                count=triangles.size,
+                type="SCALAR",
+            )
+        )
+        primitive = dict(
+            attributes=dict(POSITION=positions),
+            indices=positions + 1,
+            mode=_GLTF_TRIANGLES,
+        )
+        color: Optional[str] = mesh.get("color")
+        if color:
+            if color not in materials:
+                materials[color] = len(gltf["materials"])
+                gltf["materials"].append(
+                    dict(
+                        pbrMetallicRoughness=dict(
+                            baseColorFactor=_color_factor(color),
+                            metallicFactor=0.0,
+                        )
+                    )
+                )
+            primitive["material"] = materials[color]
+        gltf["meshes"].append(dict(name=mesh["name"], primitives=[primitive]))
+        gltf["nodes"].append(dict(name=mesh["name"], mesh=len(gltf["meshes"]) - 1))
+        gltf["scenes"][0]["nodes"].append(len(gltf["nodes"]) - 1)
+
+    if not gltf["nodes"]:
+        del gltf["scene"], gltf["scenes"]
+    for key in ("nodes", "meshes", "materials", "accessors", "bufferViews"):
+        if not gltf[key]:
+            del gltf[key]
+    if buffer:
+        gltf["buffers"].append(dict(byteLength=len(buffer)))
+    else:
+        del gltf["buffers"]
+
+    content = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    content += b" " * (-len(content) % 4)
+    buffer.extend(b"\0" * (-len(buffer) % 4))
+    chunks = struct.pack("<II", len(content), _GLB_JSON_CHUNK) + content
+    if buffer:
+        chunks += struct.pack("<II", len(buffer), _GLB_BIN_CHUNK) + bytes(buffer)
+    return struct.pack("<III", _GLB_MAGIC, 2, 12 + len(chunks)) + chunks
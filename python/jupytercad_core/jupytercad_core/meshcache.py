@@ -0,0 +1,235 @@
+"""
+A persistent cache of the meshes of shapes.
+
+Meshes are stored on disk, keyed by the hash of the operator subtree of their
+object and the tessellation settings, see :func:`mesh_cache_key`. A mesh
+computed once, by any client or kernel, is then reused by all of them. The
+cache is bounded in size, the least recently used meshes being evicted first.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Union
+
+import numpy as np
+
+from .evaluation import canonical_json
+
+# The version of the format of the cached meshes, part of their key
+MESH_FORMAT_VERSION = 2
+
+# The arrays of the binary meshes, in their order in the format, and their type
+MESH_ARRAYS = (
+    ("faceVertices", "<f4"),
+    ("faceTriangles", "<u4"),
+    ("faceOffsets", "<u4"),
+    ("edgeVertices", "<f4"),
+    ("edgeOffsets", "<u4"),
+)
+
+_MESH_MAGIC = b"JCMS"
+# The magic number, the version, the length of each array and of the metadata
+_MESH_HEADER = struct.Struct(f"<4sI{len(MESH_ARRAYS)}II")
+
+MESH_CACHE_DIR_ENV = "JUPYTERCAD_MESH_CACHE_DIR"
+MESH_CACHE_SIZE_ENV = "JUPYTERCAD_MESH_CACHE_SIZE"
+
+DEFAULT_MESH_CACHE_SIZE = 1 << 30
+
+# Eviction removes meshes until the cache is below this fraction of its size,
+# so that it does not run on every insertion once the cache is full
+_EVICTION_RATIO = 0.9
+
+
+def mesh_cache_key(object_hash: str, settings: Mapping[str, Any]) -> str:
+    """
+    Returns the cache key of the mesh of an object.
+
+    :param object_hash: The hash of the operator subtree of the object, see
+    :func:`jupytercad_core.evaluation.object_hash`.
+    :param settings: The settings of the mesh, see
+    :func:`jupytercad_core.mesh.mesh_settings`.
+    """
+    data = canonical_json([MESH_FORMAT_VERSION, object_hash, dict(settings)])
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def encode_mesh(data: Mapping[str, Any]) -> bytes:
+    """
+    Serialize the mesh of an object, as computed by
+    :func:`jupytercad_core.mesh.shape_mesh_data`, for the cache.
+
+    The binary format is shared with the 3D view: a header holding the
+    ``JCMS`` magic number, the format version, the length of each array of
+    :data:`MESH_ARRAYS` and the length of the metadata, as little-endian
+    32-bit unsigned integers, followed by the arrays and the metadata, as JSON.
+    """
+    arrays = [
+        np.ascontiguousarray(data[name], dtype=dtype).reshape(-1)
+        for name, dtype in MESH_ARRAYS
+    ]
+    meta = b""
+    if data.get("meta") is not None:
+        meta = json.dumps(
+            data["meta"], separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+    header = _MESH_HEADER.pack(
+        _MESH_MAGIC,
+        MESH_FORMAT_VERSION,
+        *(array.size for array in arrays),
+        len(meta),
+    )
+    return b"".join([header, *(array.tobytes() for array in arrays), meta])
+
+
+def decode_mesh(content: bytes) -> Dict[str, Any]:
+    """
+    Deserialize a cached mesh, see :func:`encode_mesh`. The arrays of the mesh
+    are read-only views of `content`.
+    """
+    if len(content) < _MESH_HEADER.size:
+        raise ValueError("Invalid mesh")
+    magic, version, *lengths, meta_length = _MESH_HEADER.unpack_from(content)
+    if magic != _MESH_MAGIC or version != MESH_FORMAT_VERSION:
+        raise ValueError("Unsupported mesh format")
+    if _MESH_HEADER.size + 4 * sum(lengths) + meta_length != len(content):
+        raise ValueError("Invalid mesh")
+
+    data: Dict[str, Any] = {}
+    offset = _MESH_HEADER.size
+    for (name, dtype), length in zip(MESH_ARRAYS, lengths):
+        data[name] = np.frombuffer(content, dtype=dtype, count=length, offset=offset)
+        offset += 4 * length
+    if meta_length:
+        data["meta"] = json.loads(content[offset:])
+    return data
+
+
+def default_mesh_cache_dir() -> Path:
+    """
+    Returns the directory of the mesh cache, ``$JUPYTERCAD_MESH_CACHE_DIR`` if
+    set, or ``jupytercad/meshes`` in the user cache directory.
+    """
+    if os.environ.get(MESH_CACHE_DIR_ENV):
+        return Path(os.environ[MESH_CACHE_DIR_ENV])
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "jupytercad" / "meshes"
+
+
+class MeshCache:
+    """
+    A size-bounded on-disk store of meshes, shared by the processes using the
+    same directory. The meshes are opaque bytes, keyed by their SHA-256 key.
+
+    :param root: The directory holding the meshes, see
+    :func:`default_mesh_cache_dir`.
+    :param max_size: The maximum total size of the meshes, in bytes.
+    ``$JUPYTERCAD_MESH_CACHE_SIZE`` if set, 1 GiB by default.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path, None] = None,
+        max_size: Optional[int] = None,
+    ):
+        self.root = Path(root) if root is not None else default_mesh_cache_dir()
+        if max_size is None:
+            max_size = int(
+                os.environ.get(MESH_CACHE_SIZE_ENV) or DEFAULT_MESH_CACHE_SIZE
+            )
+        self.max_size = max_size
+        # The total size of the meshes, computed on the first eviction check
+        # and approximated afterwards, as other processes may add meshes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+            raise ValueError(f"Invalid mesh key {key!r}")
+        return self.root / key[:2] / key
+
+    def __contains__(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the mesh stored under `key`, or None.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fobj:
+                data = fobj.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # The modification time orders the meshes for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store a mesh, evicting the least recently used meshes if the cache
+        is full.
+        """
+        path = self.path(key)
+        if len(data) > self.max_size:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write in a temporary file first so that readers never see
+        # a partially written mesh
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as fobj:
+                fobj.write(data)
+            # The size of the mesh replaced by this one, if any
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - replaced
+            if self._size is None or self._size > self.max_size:
+                self._evict()
+
+    def clear(self) -> None:
+        """
+        Remove all the meshes.
+        """
+        with self._lock:
+            for path in self.root.glob("*/*"):
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.root.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        size = sum(entry[1] for entry in entries)
+        if size > self.max_size:
+            target = self.max_size * _EVICTION_RATIO
+            for _, file_size, path in sorted(entries):
+                if size <= target:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                size -= file_size
+        self._size = size
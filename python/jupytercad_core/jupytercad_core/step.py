@@ -0,0 +1,293 @@
+"""
+A lightweight scanner for STEP (ISO-10303-21) files.
+
+The file is memory-mapped and scanned in one pass, without parsing the
+geometry, to extract its header, product names, entity-type histogram and
+assembly structure. Only the few product-related entities are decoded.
+"""
+
+import mmap
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# An entity instance: its id, its type (None for complex instances) and its
+# parameters. Strings may contain semicolons. The parameters are matched one
+# character or string at a time, an escaped quote in a string being matched as
+# two adjacent strings, so that an unterminated record cannot backtrack
+# exponentially.
+_PARAMETERS = rb"((?:[^;']|'[^']*')*)"
+_RECORD_RE = re.compile(
+    rb"#(\d+)\s*=\s*([A-Za-z_][A-Za-z0-9_]*)?\s*\(" + _PARAMETERS + rb"\)\s*;"
+)
+_HEADER_RE = re.compile(rb"HEADER\s*;(.*?)ENDSEC\s*;", re.DOTALL)
+_HEADER_RECORD_RE = re.compile(rb"([A-Z_][A-Z0-9_]*)\s*\(" + _PARAMETERS + rb"\)\s*;")
+_TOKEN_RE = re.compile(
+    r"\s*(?:"
+    r"'(?P<string>(?:[^']|'')*)'"
+    r"|#(?P<ref>\d+)"
+    r"|\.(?P<enum>[A-Za-z0-9_]+)\."
+    r"|(?P<number>[+-]?[0-9][0-9.Ee+-]*)"
+    r"|(?P<keyword>[A-Za-z_][A-Za-z0-9_]*)\s*\("
+    r"|(?P<open>\()|(?P<close>\))|(?P<comma>,)|(?P<unset>[$*])"
+    r")"
+)
+_ENCODED_RE = re.compile(r"\\X2\\((?:[0-9A-F]{4})+)\\X0\\|\\X\\([0-9A-F]{2})")
+
+# The entities decoded to get the products and the assembly structure
+_PRODUCT_TYPES = {
+    b"PRODUCT",
+    b"PRODUCT_DEFINITION",
+    b"PRODUCT_DEFINITION_FORMATION",
+    b"PRODUCT_DEFINITION_FORMATION_WITH_SPECIFIED_SOURCE",
+    b"NEXT_ASSEMBLY_USAGE_OCCURRENCE",
+}
+
+
+class StepReference(int):
+    """An entity instance reference, ``#<id>``."""
+
+
+def _decode_string(value: str) -> str:
+    def decode(match: re.Match) -> str:
+        if match.group(1):
+            code = match.group(1)
+            return "".join(
+                chr(int(code[i : i + 4], 16)) for i in range(0, len(code), 4)
+            )
+        return bytes([int(match.group(2), 16)]).decode("latin-1")
+
+    return _ENCODED_RE.sub(decode, value.replace("''", "'"))
+
+
+def parse_parameters(text: Union[str, bytes]) -> List[Any]:
+    """
+    Parse the parameter list of a STEP entity instance.
+
+    Strings, numbers and enumerations are returned as Python values, entity
+    references as :class:`StepReference`, aggregates as lists and unset values
+    as None. Typed parameters, e.g. ``LENGTH_MEASURE(1.)``, are returned as
+    their value.
+
+    :param text: The parameters, without the enclosing parentheses.
+    """
+    if isinstance(text, bytes):
+        text = text.decode("latin-1")
+
+    # The aggregates being parsed, and whether they are typed parameters
+    stack: List[Tuple[List[Any], bool]] = [([], False)]
+    position = 0
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None:
+            if text[position:].strip():
+                raise ValueError(f"Invalid STEP parameters {text[position:][:32]!r}")
+            break
+        position = match.end()
+        kind = match.lastgroup
+        values = stack[-1][0]
+        if kind == "string":
+            values.append(_decode_string(match.group("string")))
+        elif kind == "ref":
+            values.append(StepReference(match.group("ref")))
+        elif kind == "enum":
+            values.append(match.group("enum"))
+        elif kind == "number":
+            number = match.group("number")
+            values.append(float(number) if "." in number else int(number))
+        elif kind == "unset":
+            values.append(None)
+        elif kind in ("keyword", "open"):
+            stack.append(([], kind == "keyword"))
+        elif kind == "close":
+            if len(stack) == 1:
+                raise ValueError("Unbalanced parentheses in STEP parameters")
+            values, typed = stack.pop()
+            # A typed parameter holds a single value
+            stack[-1][0].append((values[0] if values else None) if typed else values)
+    if len(stack) != 1:
+        raise ValueError("Unbalanced parentheses in STEP parameters")
+    return stack[0][0]
+
+
+def _complex_types(parameters: bytes) -> List[bytes]:
+    """
+    Returns the types of the parts of a complex entity instance,
+    ``A(...) B(...)``.
+    """
+    types = []
+    depth = 0
+    in_string = False
+    start = None
+    for index, char in enumerate(parameters):
+        if char == 0x27:  # '
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif char == 0x28:  # (
+            if depth == 0 and start is not None:
+                types.append(parameters[start:index].strip())
+            depth += 1
+            start = None
+        elif char == 0x29:  # )
+            depth -= 1
+        elif depth == 0 and start is None and not chr(char).isspace():
+            start = index
+    return types
+
+
+def _map_file(path: Union[str, Path]) -> BytesLike:
+    with open(path, "rb") as fobj:
+        try:
+            return mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return b""
+
+
+def iter_records(data: BytesLike) -> Iterator[Tuple[int, bytes, bytes]]:
+    """
+    Iterate over the entity instances of a STEP file, without decoding them.
+
+    :param data: The content of the file.
+    :return: An iterator of (id, type, parameters) tuples. The type of a
+    complex instance is the types of its parts joined by spaces, and its
+    parameters are the parts themselves.
+    """
+    for match in _RECORD_RE.finditer(data):
+        entity_id, entity_type, parameters = match.groups()
+        if entity_type is None:
+            entity_type = b" ".join(_complex_types(parameters))
+        yield int(entity_id), entity_type, parameters
+
+
+def _parse_header(data: BytesLike) -> Dict[str, Any]:
+    match = _HEADER_RE.search(data, 0, 1 << 16)
+    if match is None:
+        raise ValueError("Invalid STEP file, the header is missing")
+
+    header: Dict[str, Any] = {}
+    for name, parameters in _HEADER_RECORD_RE.findall(match.group(1)):
+        values = parse_parameters(parameters)
+        if name == b"FILE_DESCRIPTION" and len(values) >= 2:
+            header["description"] = values[0]
+            header["implementationLevel"] = values[1]
+        elif name == b"FILE_NAME" and len(values) >= 7:
+            header.update(
+                name=values[0],
+                timeStamp=values[1],
+                author=values[2],
+                organization=values[3],
+                preprocessorVersion=values[4],
+                originatingSystem=values[5],
+                authorization=values[6],
+            )
+        elif name == b"FILE_SCHEMA" and values:
+            header["schemas"] = values[0]
+    return header
+
+
+def _assembly(
+    products: Dict[int, Dict[str, Any]],
+    formations: Dict[int, int],
+    definitions: Dict[int, int],
+    occurrences: List[List[Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Build the assembly tree from the product entities.
+    """
+
+    def product_name(definition: int) -> Optional[str]:
+        product = products.get(formations.get(definitions.get(definition, -1), -1))
+        return product["name"] if product else None
+
+    children: Dict[int, List[Tuple[str, int]]] = {}
+    related = set()
+    for occurrence in occurrences:
+        # id, name, description, relating definition, related definition, ...
+        if len(occurrence) < 5:
+            continue
+        children.setdefault(occurrence[3], []).append((occurrence[1], occurrence[4]))
+        related.add(occurrence[4])
+
+    def node(definition: int, visited: frozenset) -> Dict[str, Any]:
+        result = dict(product=product_name(definition), children=[])
+        if definition in visited:
+            # Cyclic assemblies are invalid, but should not break the scan
+            return result
+        for name, child in children.get(definition, []):
+            child_node = node(child, visited | {definition})
+            child_node["name"] = name
+            result["children"].append(child_node)
+        return result
+
+    return [
+        node(definition, frozenset())
+        for definition in definitions
+        if definition not in related
+    ]
+
+
+def scan_step(source: Union[str, Path, BytesLike]) -> Dict[str, Any]:
+    """
+    Scan a STEP file in one pass, without parsing its geometry.
+
+    :param source: The path of the file, which is memory-mapped, or its content.
+    A memory map given as content is not closed.
+    :return: A dictionary holding:
+
+    - ``header``: the ``FILE_DESCRIPTION``, ``FILE_NAME`` and ``FILE_SCHEMA``
+      fields.
+    - ``products``: the ``id``, ``name`` and ``description`` of the products.
+    - ``entities``: the number of instances of each entity type.
+    - ``entityCount``: the total number of entity instances.
+    - ``assembly``: the assembly trees, each node holding a ``product`` name,
+      its ``children`` and, for components, the occurrence ``name``.
+    """
+    mapped = isinstance(source, (str, Path))
+    data = _map_file(source) if mapped else source
+
+    try:
+        header = _parse_header(data)
+        histogram: Counter = Counter()
+        products: Dict[int, Dict[str, Any]] = {}
+        formations: Dict[int, int] = {}
+        definitions: Dict[int, int] = {}
+        occurrences: List[List[Any]] = []
+        count = 0
+
+        for entity_id, entity_type, parameters in iter_records(data):
+            count += 1
+            if b" " in entity_type:
+                histogram.update(entity_type.split(b" "))
+                continue
+            histogram[entity_type] += 1
+            if entity_type not in _PRODUCT_TYPES:
+                continue
+
+            values = parse_parameters(parameters)
+            if entity_type == b"PRODUCT" and len(values) >= 3:
+                products[entity_id] = dict(
+                    id=values[0], name=values[1], description=values[2]
+                )
+            elif entity_type.startswith(b"PRODUCT_DEFINITION_FORMATION"):
+                if len(values) >= 3:
+                    formations[entity_id] = values[2]
+            elif entity_type == b"PRODUCT_DEFINITION" and len(values) >= 3:
+                definitions[entity_id] = values[2]
+            elif entity_type == b"NEXT_ASSEMBLY_USAGE_OCCURRENCE":
+                occurrences.append(values)
+    finally:
+        if mapped and isinstance(data, mmap.mmap):
+            data.close()
+
+    return dict(
+        header=header,
+        products=list(products.values()),
+        entities={key.decode("ascii"): value for key, value in histogram.most_common()},
+        entityCount=count,
+        assembly=_assembly(products, formations, definitions, occurrences),
+    )
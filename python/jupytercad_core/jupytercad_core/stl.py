@@ -0,0 +1,252 @@
+import mmap
+import re
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+
+import numpy as np
+
+STL_HEADER_SIZE = 80
+STL_RECORD = struct.Struct("<12fH")
+
+# Size of the binary chunks used to store STL data in a shared document
+STL_CHUNK_SIZE = 1 << 20
+
+# A binary STL record, as a NumPy structured type
+STL_DTYPE = np.dtype(
+    [("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")]
+)
+
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+_FACET_RE = re.compile(rb"facet\s+normal\s+(\S+)\s+(\S+)\s+(\S+)")
+_VERTEX_RE = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+
+
+def triangle_count(data: BytesLike) -> int:
+    """
+    Returns the number of triangles announced in a binary STL header.
+    """
+    return struct.unpack_from("<I", data, STL_HEADER_SIZE)[0]
+
+
+def is_binary_stl(data: BytesLike) -> bool:
+    """
+    Whether `data` is a binary STL file.
+
+    Some binary files start with ``solid`` like ASCII ones, so the size
+    announced in the header is used instead.
+    """
+    if len(data) < STL_HEADER_SIZE + 4:
+        return False
+    expected = STL_HEADER_SIZE + 4 + triangle_count(data) * STL_RECORD.size
+    return len(data) == expected
+
+
+def ascii_to_binary(data: Union[str, BytesLike]) -> bytes:
+    """
+    Convert an ASCII STL file to the binary STL format.
+    """
+    if isinstance(data, str):
+        data = data.encode("ascii")
+
+    normals = _FACET_RE.findall(data)
+    vertices = _VERTEX_RE.findall(data)
+    if len(vertices) != 3 * len(normals):
+        raise ValueError("Invalid ASCII STL file")
+
+    header = STL_HEADER_SIZE + 4
+    output = bytearray(header + len(normals) * STL_RECORD.size)
+    output[:5] = b"jcad "
+    struct.pack_into("<I", output, STL_HEADER_SIZE, len(normals))
+    for index, normal in enumerate(normals):
+        v0, v1, v2 = vertices[3 * index : 3 * index + 3]
+        STL_RECORD.pack_into(
+            output,
+            header + index * STL_RECORD.size,
+            *map(float, normal + v0 + v1 + v2),
+            0,
+        )
+    return bytes(output)
+
+
+def binary_to_ascii(data: BytesLike, name: str = "") -> str:
+    """
+    Convert a binary STL file to the ASCII STL format.
+    """
+    start = STL_HEADER_SIZE + 4
+    end = start + triangle_count(data) * STL_RECORD.size
+    lines = [f"solid {name}"]
+    for record in STL_RECORD.iter_unpack(data[start:end]):
+        lines.append(
+            "  facet normal {:e} {:e} {:e}\n"
+            "    outer loop\n"
+            "      vertex {:e} {:e} {:e}\n"
+            "      vertex {:e} {:e} {:e}\n"
+            "      vertex {:e} {:e} {:e}\n"
+            "    endloop\n"
+            "  endfacet".format(*record[:12])
+        )
+    lines.append(f"endsolid {name}\n")
+    return "\n".join(lines)
+
+
+def mesh_to_binary(vertices: np.ndarray, triangles: np.ndarray) -> bytes:
+    """
+    Convert an indexed triangle mesh to the binary STL format.
+
+    :param vertices: The vertices of the mesh, as a (n, 3) array.
+    :param triangles: The vertex indices of the triangles, as a (m, 3) array.
+    """
+    records = np.zeros(len(triangles), STL_DTYPE)
+    corners = np.asarray(vertices, dtype=np.float64)[np.asarray(triangles)]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    records["normal"] = np.divide(
+        normals, lengths, out=np.zeros_like(normals), where=lengths > 0
+    )
+    records["vertices"] = corners
+    header = bytearray(STL_HEADER_SIZE + 4)
+    header[:5] = b"jcad "
+    struct.pack_into("<I", header, STL_HEADER_SIZE, len(records))
+    return bytes(header) + records.tobytes()
+
+
+def to_binary(data: Union[str, BytesLike]) -> BytesLike:
+    """
+    Returns `data` in the binary STL format, converting it if it is ASCII.
+    Binary data is returned as is, without copy.
+    """
+    if isinstance(data, str):
+        return ascii_to_binary(data)
+    if is_binary_stl(data):
+        return data
+    return ascii_to_binary(data)
+
+
+def map_stl_file(path: Union[str, Path]) -> BytesLike:
+    """
+    Memory-map an STL file for reading.
+    """
+    with open(path, "rb") as fobj:
+        try:
+            return mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return b""
+
+
+def iter_chunks(data: BytesLike, size: int = STL_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Split `data` in chunks of at most `size` bytes.
+    """
+    with memoryview(data) as view:
+        for start in range(0, len(view), size):
+            yield bytes(view[start : start + size])
+
+
+def _cross(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Cross product of (3, n) arrays"""
+    return np.stack(
+        (
+            u[1] * v[2] - u[2] * v[1],
+            u[2] * v[0] - u[0] * v[2],
+            u[0] * v[1] - u[1] * v[0],
+        )
+    )
+
+
+def read_triangles(data: Union[str, BytesLike]) -> np.ndarray:
+    """
+    Read the triangles of a binary or ASCII STL file.
+
+    :param data: The content of the file.
+    :return: The vertices of the triangles, as a (n, 3, 3) array. Binary data
+    is not copied, the array is a view on it.
+    """
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    if is_binary_stl(data):
+        records = np.frombuffer(
+            data, STL_DTYPE, count=triangle_count(data), offset=STL_HEADER_SIZE + 4
+        )
+        return records["vertices"]
+
+    vertices = np.array(_VERTEX_RE.findall(data), dtype=np.float64)
+    if len(vertices) % 3:
+        raise ValueError("Invalid ASCII STL file")
+    return vertices.reshape(-1, 3, 3)
+
+
+def mesh_properties(triangles: np.ndarray) -> Dict[str, Any]:
+    """
+    Compute the geometric properties of a triangle mesh.
+
+    The volume properties assume a closed mesh with a uniform density of 1,
+    they are computed by summing the signed tetrahedra formed by the origin
+    and each triangle. The matrix of inertia is expressed at the center of mass,
+    as done by Open Cascade.
+
+    :param triangles: The vertices of the triangles, as a (n, 3, 3) array.
+    :return: The triangle count, bounding box, surface area, signed volume,
+    center of mass and matrix of inertia of the mesh.
+    """
+    properties = dict(triangleCount=len(triangles))
+    if not len(triangles):
+        return properties
+
+    # One contiguous (3, n) array of coordinates per vertex, which is much
+    # faster to process than the strided (n, 3) views
+    a, b, c = np.array(triangles.transpose(1, 2, 0), dtype=np.float64, order="C")
+    properties["boundingBox"] = dict(
+        min=np.minimum(np.minimum(a, b), c).min(axis=1).tolist(),
+        max=np.maximum(np.maximum(a, b), c).max(axis=1).tolist(),
+    )
+    normals = _cross(b - a, c - a)
+    properties["area"] = float(np.sqrt((normals * normals).sum(axis=0)).sum() / 2)
+
+    # Six times the signed volume of each tetrahedron
+    det = (a * _cross(b, c)).sum(axis=0)
+    volume = det.sum() / 6
+    properties["volume"] = float(volume)
+    if volume == 0:
+        return properties
+
+    if volume < 0:
+        # Inverted orientation, the volume properties are computed on the
+        # reoriented mesh
+        det, volume = -det, -volume
+
+    s = a + b + c
+    center = (s @ det) / (24 * volume)
+    # Second moments of the volume about the origin: each tetrahedron
+    # contributes det / 120 * (aa^T + bb^T + cc^T + ss^T)
+    moments = sum((v * det) @ v.T for v in (a, b, c, s)) / 120
+    moments -= volume * np.outer(center, center)
+    inertia = np.trace(moments) * np.eye(3) - moments
+
+    properties["mass"] = float(volume)
+    properties["centerOfMass"] = center.tolist()
+    properties["matrixOfInertia"] = inertia.tolist()
+    return properties
+
+
+def stl_properties(data: Union[str, BytesLike]) -> Dict[str, Any]:
+    """
+    Compute the geometric properties of a binary or ASCII STL file,
+    see :func:`mesh_properties`.
+    """
+    return mesh_properties(read_triangles(data))
+
+
+def stl_shape_metadata(data: Union[str, BytesLike]) -> Dict[str, Any]:
+    """
+    Returns the shape metadata (mass, center of mass and matrix of inertia)
+    of a binary or ASCII STL file, as computed by the OCC worker.
+    """
+    properties = stl_properties(data)
+    return {
+        key: properties[key]
+        for key in ("mass", "centerOfMass", "matrixOfInertia")
+        if key in properties
+    }
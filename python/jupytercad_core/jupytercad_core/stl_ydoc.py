@@ -1,17 +1,30 @@
-import json
-from typing import Any, Callable
+import base64
+import binascii
+from pathlib import Path
+from typing import Any, Callable, Union
 from functools import partial
 
-from pycrdt import Text
+from pycrdt import Array, Map, Text
 from jupyter_ydoc.ybasedoc import YBaseDoc
 
 from .schema import SCHEMA_VERSION
+from .stl import BytesLike, is_binary_stl, iter_chunks, map_stl_file, to_binary
 
 
 class YSTL(YBaseDoc):
+    """
+    An STL document. The content of the file, binary or ASCII, is stored
+    unchanged, split in chunks.
+
+    The file content is exchanged as a base64 string. Plain ASCII STL
+    content is accepted as well.
+    """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._ydoc["source"] = self._ysource = Text()
+        self._ydoc["chunks"] = self._ychunks = Array()
+        self._ydoc["stl"] = self._ystl = Map()
 
     @property
     def version(self) -> str:
@@ -20,21 +33,72 @@ class YSTL(YBaseDoc):
     def get(self) -> str:
         """
         Returns the content of the document.
-        :return: Document's content.
+        :return: Document's content, base64 encoded.
         :rtype: Any
         """
-        return json.dumps(self._ysource.to_py())
+        return base64.b64encode(self.get_content()).decode("ascii")
 
     def set(self, value: str) -> None:
         """
         Sets the content of the document.
-        :param value: The content of the document.
+        :param value: The content of the document, base64 encoded or ASCII.
         :type value: Any
         """
-        self._ysource[:] = value
+        if value.lstrip().startswith("solid"):
+            self.set_binary(value.encode("utf-8"))
+            return
+        try:
+            data = base64.b64decode(value, validate=True)
+        except binascii.Error:
+            # Not base64, assume an ASCII file
+            data = value.encode("utf-8")
+        self.set_binary(data)
+
+    def set_binary(self, data: Union[str, BytesLike]) -> None:
+        """
+        Sets the content of the document from a binary or ASCII STL file content.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._ydoc.transaction():
+            self._ystl["format"] = "binary" if is_binary_stl(data) else "ascii"
+            self._ychunks.clear()
+            self._ychunks.extend(list(iter_chunks(data)))
+            if len(self._ysource):
+                self._ysource.clear()
+
+    def get_content(self) -> bytes:
+        """
+        Returns the content of the STL file, in its original format.
+        """
+        return b"".join(bytes(chunk) for chunk in self._ychunks)
+
+    def get_binary(self) -> bytes:
+        """
+        Returns the mesh in the binary STL format.
+        """
+        data = self.get_content()
+        if self._ystl.get("format") == "ascii":
+            data = to_binary(data)
+        return data
+
+    def load(self, path: Union[str, Path]) -> None:
+        """
+        Sets the content of the document from an STL file, which is
+        memory-mapped instead of being read in memory.
+        """
+        data = map_stl_file(path)
+        try:
+            self.set_binary(data)
+        finally:
+            if hasattr(data, "close"):
+                data.close()
 
     def observe(self, callback: Callable[[str, Any], None]):
         self.unobserve()
         self._subscriptions[self._ysource] = self._ysource.observe(
             partial(callback, "source")
         )
+        self._subscriptions[self._ychunks] = self._ychunks.observe(
+            partial(callback, "source")
+        )
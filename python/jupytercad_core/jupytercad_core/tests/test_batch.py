@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from jupytercad_core.batch import collect_documents, export_document, load_document
+from jupytercad_core.jcadz import dump_jcadz
+
+CONTENT = dict(
+    schemaVersion="3.0.0",
+    objects=[
+        dict(
+            name="Sphere 1",
+            shape="Part::Sphere",
+            parameters=dict(
+                Radius=1.0,
+                Angle1=-90.0,
+                Angle2=90.0,
+                Angle3=360.0,
+                Placement=dict(Position=[0, 0, 0], Axis=[0, 0, 1], Angle=0),
+            ),
+            visible=True,
+        )
+    ],
+    options={},
+    metadata={},
+    outputs={},
+)
+
+
+def test_collect_documents(tmp_path):
+    (tmp_path / "models" / "parts").mkdir(parents=True)
+    for name in ("models/a.jcad", "models/parts/b.jcadz", "models/c.step", "d.jcad"):
+        (tmp_path / name).write_text("{}")
+    documents = collect_documents([tmp_path / "models", tmp_path / "d.jcad"])
+    assert [
+        (source.relative_to(tmp_path).as_posix(), stem) for source, stem in documents
+    ] == [
+        ("models/a.jcad", "a"),
+        ("models/parts/b.jcadz", "parts/b"),
+        ("d.jcad", "d"),
+    ]
+
+    (tmp_path / "a.jcad").write_text("{}")
+    with pytest.raises(ValueError):
+        collect_documents([tmp_path / "models", tmp_path / "a.jcad"])
+
+
+def test_load_document(tmp_path):
+    dump_jcadz(CONTENT, tmp_path / "doc.jcadz")
+    (tmp_path / "doc.jcad").write_text(json.dumps(CONTENT))
+    assert load_document(tmp_path / "doc.jcadz") == CONTENT
+    assert load_document(tmp_path / "doc.jcad") == CONTENT
+
+
+def test_export_tessellation(tmp_path):
+    pytest.importorskip("OCC")
+    path = tmp_path / "doc.jcad"
+    triangles = []
+    for deflection in (0.1, 0.01):
+        options = dict(tessellation=dict(mode="fixed", linearDeflection=deflection))
+        path.write_text(json.dumps(dict(CONTENT, options=options)))
+        result = export_document(path, tmp_path / "doc", ["stl"])
+        with open(result["outputs"]["stl"], "rb") as fobj:
+            triangles.append(int.from_bytes(fobj.read()[80:84], "little"))
+    assert triangles[1] > triangles[0]
@@ -0,0 +1,51 @@
+import pytest
+
+from jupytercad_core.blobstore import (
+    BLOB_DIR_NAME,
+    BlobStore,
+    blob_key,
+    is_blob_reference,
+    open_blob_store,
+)
+
+
+def test_blob_store(tmp_path):
+    store = BlobStore(tmp_path, threshold=10)
+    content = "solid part\r\n  facet normal 0 0 1\r\nendsolid part\n"
+    reference = store.put(content)
+    assert is_blob_reference(reference)
+    assert blob_key(reference) in store
+    assert store.get(reference) == content
+    assert store.resolve(reference) == content
+    assert store.put(content) == reference
+    assert len(list(tmp_path.glob("*/*"))) == 1
+
+
+def test_maybe_put(tmp_path):
+    store = BlobStore(tmp_path, threshold=10)
+    assert store.maybe_put("small") == "small"
+    reference = store.maybe_put("large content")
+    assert store.resolve(reference) == "large content"
+    assert store.resolve("small") == "small"
+
+
+@pytest.mark.parametrize(
+    "reference", ["small", "blob:sha256:abc", "blob:sha256:" + "../" * 21 + "a"]
+)
+def test_invalid_blob_reference(tmp_path, reference):
+    with pytest.raises(ValueError):
+        BlobStore(tmp_path).get(reference)
+
+
+def test_missing_blob(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        BlobStore(tmp_path).get("blob:sha256:" + "0" * 64)
+
+
+def test_open_blob_store(tmp_path):
+    store = open_blob_store(tmp_path / "doc.jcad")
+    assert store.root == tmp_path.resolve() / BLOB_DIR_NAME
+    # Documents without a path have no blob store
+    for path in (None, ""):
+        with pytest.raises(ValueError):
+            open_blob_store(path)
@@ -0,0 +1,76 @@
+import pytest
+
+from jupytercad_core.evaluation import _js_number, canonical_json, object_hashes
+
+# The hashes of DOCUMENT are also checked by the frontend tests, see
+# packages/base/src/__tests__/meshcache.spec.ts
+DOCUMENT = [
+    dict(
+        name="Box 1",
+        shape="Part::Box",
+        parameters=dict(
+            Length=1,
+            Width=2.5,
+            Height=1e21,
+            Color="#808080",
+            Placement=dict(Position=[0, 0.1, 1e-7], Axis=[0, 0, 1], Angle=0),
+        ),
+    ),
+    dict(
+        name="Any 1",
+        shape="Part::Any",
+        parameters=dict(Content="solid é\nendsolid\n", Type="STL"),
+    ),
+    dict(
+        name="Cut 1",
+        shape="Part::Cut",
+        parameters=dict(Base="Box 1", Tool="Missing", Refine=False),
+    ),
+    # A dependency cycle, and an object depending on it
+    dict(
+        name="Fuse 1",
+        shape="Part::MultiFuse",
+        parameters=dict(Shapes=["Fuse 2", "Box 1"]),
+    ),
+    dict(name="Fuse 2", shape="Part::MultiFuse", parameters=dict(Shapes=["Fuse 1"])),
+    dict(
+        name="Fillet 1",
+        shape="Part::Fillet",
+        parameters=dict(Base="Fuse 1", Radius=0.1 + 0.2),
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (0, "0"),
+        (-0.0, "0"),
+        (100, "100"),
+        (1e20, "100000000000000000000"),
+        (1e21, "1e+21"),
+        (1.5e-6, "0.0000015"),
+        (1e-7, "1e-7"),
+        (-1e-7, "-1e-7"),
+        (0.1 + 0.2, "0.30000000000000004"),
+        (2**53, "9007199254740992"),
+        (5e-324, "5e-324"),
+        (float("nan"), "null"),
+    ],
+)
+def test_js_number(value, expected):
+    assert _js_number(value) == expected
+
+
+def test_canonical_json():
+    value = dict(b=[1.0, None, True], a="é", c=dict(y=1e21, x=1e-7))
+    expected = '{"a":"é","b":[1,null,true],"c":{"x":1e-7,"y":1e+21}}'
+    assert canonical_json(value) == expected
+
+
+def test_object_hashes():
+    assert object_hashes(DOCUMENT) == {
+        "Box 1": "7c609f3ae30bc656cb7e0fb19a331a9db71cbc833762acf224aa14e64ed65071",
+        "Any 1": "83b8c24106ac57f0ed71e5c3380d3bcee088f0c4bb2ebcb67ebcb1a079e08d23",
+        "Cut 1": "79bd9c40b13cb6e161ab62851905b2fed8e765f29296590a1d35932327387af4",
+    }
@@ -0,0 +1,11 @@
+import os
+
+from jupytercad_core.files import _UMASK, replacement_mode
+
+
+def test_replacement_mode(tmp_path):
+    path = tmp_path / "doc.jcad"
+    assert replacement_mode(path) == 0o666 & ~_UMASK
+    path.write_text("{}")
+    os.chmod(path, 0o640)
+    assert replacement_mode(path) == 0o640
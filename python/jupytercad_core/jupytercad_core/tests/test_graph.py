@@ -0,0 +1,83 @@
+import pytest
+
+from jupytercad_core.graph import DependencyGraph, object_dependencies
+
+
+def _object(name, shape="Part::Box", **parameters):
+    return dict(name=name, shape=shape, parameters=parameters)
+
+
+OBJECTS = [
+    _object("Cut 1", "Part::Cut", Base="Box 1", Tool="Sphere 1"),
+    _object("Box 1"),
+    _object("Sphere 1"),
+    _object("Fuse 1", "Part::MultiFuse", Shapes=["Cut 1", "Cone 1", "Cut 1"]),
+    _object("Cone 1"),
+    _object("Chamfer 1", "Part::Chamfer", Base="Fuse 1"),
+]
+
+
+def test_object_dependencies():
+    assert object_dependencies("Part::Cut", dict(Base="A", Tool="B")) == ["A", "B"]
+    assert object_dependencies("Part::MultiFuse", dict(Shapes=["A", "B", "A"])) == [
+        "A",
+        "B",
+    ]
+    assert object_dependencies("Part::Box", dict(), ["A"]) == ["A"]
+    assert object_dependencies("Part::Cut", None, ["A"]) == ["A"]
+
+
+def test_topological_order():
+    graph = DependencyGraph(OBJECTS)
+    assert graph.topological_order() == [
+        "Box 1",
+        "Sphere 1",
+        "Cut 1",
+        "Cone 1",
+        "Fuse 1",
+        "Chamfer 1",
+    ]
+    assert graph.topological_order(["Chamfer 1", "Box 1", "Cut 1"]) == [
+        "Box 1",
+        "Cut 1",
+        "Chamfer 1",
+    ]
+
+
+def test_queries():
+    graph = DependencyGraph(OBJECTS)
+    assert graph.dependencies("Fuse 1") == ["Cut 1", "Cone 1"]
+    assert graph.dependants("Box 1") == ["Cut 1"]
+    assert graph.ancestors("Chamfer 1") == {
+        "Fuse 1",
+        "Cut 1",
+        "Cone 1",
+        "Box 1",
+        "Sphere 1",
+    }
+    assert graph.descendants("Sphere 1") == {"Cut 1", "Fuse 1", "Chamfer 1"}
+    assert graph.dirty(["Cone 1"]) == ["Cone 1", "Fuse 1", "Chamfer 1"]
+
+
+def test_updates():
+    graph = DependencyGraph(OBJECTS)
+    graph.remove_object("Box 1")
+    assert graph.dependencies("Cut 1") == ["Sphere 1"]
+    graph.set_object("Box 1", [])
+    assert graph.dependencies("Cut 1") == ["Box 1", "Sphere 1"]
+
+    graph.rename_object("Cone 1", "Cone 2")
+    assert "Cone 2" in graph and "Cone 1" not in graph
+    assert graph.dependencies("Fuse 1") == ["Cut 1"]
+
+    graph.set_object("Cut 1", ["Box 1"])
+    assert graph.dependants("Sphere 1") == []
+    assert len(graph) == 6
+
+
+def test_cyclic_dependency():
+    graph = DependencyGraph(
+        [_object("A", "Part::Fillet", Base="B"), _object("B", "Part::Fillet", Base="A")]
+    )
+    with pytest.raises(ValueError):
+        graph.topological_order()
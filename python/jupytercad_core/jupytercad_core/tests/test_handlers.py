@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import tornado
+
+from jupytercad_core.handlers import (
+    ExportJobs,
+    _batch_export_pool,
+    _document_path,
+    _find_sources,
+    _in_root,
+    shutdown_handlers,
+)
+
+
+def test_export_jobs():
+    async def run():
+        loop = asyncio.get_running_loop()
+        jobs = ExportJobs()
+        futures = {path: loop.create_future() for path in ("a.step", "b.stl", "c.brep")}
+        job_id = jobs.start_batch(futures)
+        futures["a.step"].set_result(None)
+        futures["b.stl"].set_exception(ValueError("Invalid file"))
+        futures["c.brep"].cancel()
+        await asyncio.sleep(0)
+        return jobs.get(job_id)
+
+    job = asyncio.run(run())
+    assert job["done"]
+    assert (job["completed"], job["failed"]) == (3, 2)
+    assert job["files"]["a.step"] == dict(done=True, error=None)
+    assert job["files"]["b.stl"]["error"] == "Invalid file"
+    assert job["files"]["c.brep"]["error"] == "The export was cancelled"
+
+
+def test_cancelled_export_job():
+    async def run():
+        jobs = ExportJobs()
+        future = asyncio.get_running_loop().create_future()
+        job_id = jobs.start(future)
+        future.cancel()
+        await asyncio.sleep(0)
+        return jobs.get(job_id)
+
+    assert asyncio.run(run()) == dict(done=True, error="The export was cancelled")
+
+
+def test_document_path(tmp_path):
+    handler = SimpleNamespace(contents_manager=SimpleNamespace(root_dir=str(tmp_path)))
+    root = tmp_path.resolve()
+    assert _document_path(handler, "RTC:a/doc.jcad") == root / "a" / "doc.jcad"
+    assert _document_path(handler, "") == root
+    for path in ("../doc.jcad", "a/../../doc.jcad"):
+        with pytest.raises(tornado.web.HTTPError) as error:
+            _document_path(handler, path)
+        assert error.value.status_code == 403
+    with pytest.raises(tornado.web.HTTPError):
+        _in_root(handler, root / "a" / ".." / ".." / "doc.jcad")
+
+
+def test_find_sources(tmp_path):
+    for name in ("b.STEP", "a.stl", "c.brep", "notes.txt", "sub/d.step"):
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).touch()
+    (tmp_path / "dir.stl").mkdir()
+    assert [path.name for path in _find_sources(tmp_path, "*")] == [
+        "a.stl",
+        "b.STEP",
+        "c.brep",
+    ]
+    assert _find_sources(tmp_path, "**/*.step") == [tmp_path / "sub" / "d.step"]
+
+
+def test_shutdown_handlers():
+    web_app = SimpleNamespace(settings={})
+    shutdown_handlers(web_app)
+    pool = _batch_export_pool(web_app.settings)
+    shutdown_handlers(web_app)
+    assert "jupytercad_export_pool" not in web_app.settings
+    with pytest.raises(RuntimeError):
+        pool.submit(print)
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from jupytercad_core.jcad import JCadFile, index_jcad
+
+CONTENT = {
+    "schemaVersion": "3.0.0",
+    "objects": [
+        {
+            "name": "Box 1",
+            "shape": "Part::Box",
+            "parameters": {"Length": 1, "Width": 1, "Height": 1},
+            "visible": False,
+        },
+        {
+            "name": "Cut [1]",
+            "shape": "Part::Cut",
+            "parameters": {"Base": "Box 1", "Tool": "Box 1", "Note": 'é \\"}]'},
+            "dependencies": ["Box 1"],
+        },
+    ],
+    "options": {"foo": [1, 2]},
+    "metadata": {},
+    "outputs": {},
+}
+
+
+@pytest.fixture(params=[None, 2])
+def jcad_path(request, tmp_path):
+    path = tmp_path / "doc.jcad"
+    path.write_text(
+        json.dumps(CONTENT, indent=request.param, ensure_ascii=False), encoding="utf-8"
+    )
+    return path
+
+
+def test_index_jcad(jcad_path):
+    data = jcad_path.read_bytes()
+    index = index_jcad(data)
+    assert index["members"] == {
+        key: value for key, value in CONTENT.items() if key != "objects"
+    }
+    assert [entry["name"] for entry in index["objects"]] == ["Box 1", "Cut [1]"]
+    assert [entry["visible"] for entry in index["objects"]] == [False, True]
+    for entry, obj in zip(index["objects"], CONTENT["objects"]):
+        start, end = entry["span"]
+        assert json.loads(data[start:end]) == obj
+
+
+def test_index_jcad_skips_contents():
+    # The content is not decoded when indexing
+    data = b'{"objects": [{"name": "A", "parameters": {"Content": "\\x{["}}]}'
+    index = index_jcad(data)
+    assert index["objects"] == [
+        dict(name="A", shape=None, visible=True, span=(13, len(data) - 2))
+    ]
+
+
+def test_jcad_file(jcad_path):
+    with JCadFile(jcad_path) as jcad:
+        assert jcad.names == ["Box 1", "Cut [1]"]
+        assert jcad.manifest["options"] == CONTENT["options"]
+        assert jcad.get_object("Cut [1]") == CONTENT["objects"][1]
+        assert list(jcad.iter_objects()) == CONTENT["objects"]
+        assert list(jcad.iter_objects(reverse=True)) == CONTENT["objects"][::-1]
+        with pytest.raises(KeyError):
+            jcad.get_object("Sphere 1")
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "[]",
+        '{"schemaVersion": "3.0.0"}',
+        '{"objects": [{"name": "Box 1"}',
+        '{"objects": [{"name": "Box 1}]}',
+        '{"objects": []} {}',
+    ],
+)
+def test_invalid_jcad_file(tmp_path, text):
+    path = tmp_path / "doc.jcad"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError):
+        JCadFile(path)
@@ -0,0 +1,124 @@
+import copy
+import json
+
+import pytest
+from pycrdt import Map
+
+from jupytercad_core.jcad_ydoc import YJCad
+from jupytercad_core.schema import SCHEMA_VERSION
+
+
+def _box(name, **parameters):
+    return dict(
+        name=name,
+        shape="Part::Box",
+        parameters=dict(Length=1.0, Width=1.0, Height=1.0, **parameters),
+        visible=True,
+    )
+
+
+CONTENT = dict(
+    schemaVersion=SCHEMA_VERSION,
+    objects=[
+        _box("Box 1"),
+        _box("Box 2", Color="#ff0000"),
+        dict(
+            name="Cut 1",
+            shape="Part::Cut",
+            parameters=dict(Base="Box 1", Tool="Box 2", Note='é\n"}'),
+            dependencies=["Box 1", "Box 2"],
+            visible=False,
+        ),
+    ],
+    options=dict(guidesVisible=True),
+    metadata=dict(author="me"),
+    outputs={},
+)
+
+
+def _dumps(content):
+    return json.dumps(content, indent=2, sort_keys=True)
+
+
+def _object_changes(doc):
+    """Record the paths of the changes of the objects array"""
+    changes = []
+    doc._yobjects.observe_deep(
+        lambda events: changes.extend(tuple(event.path) for event in events)
+    )
+    return changes
+
+
+@pytest.mark.parametrize("objects", [CONTENT["objects"], []])
+def test_get(objects):
+    content = dict(CONTENT, objects=objects)
+    doc = YJCad()
+    doc.set(json.dumps(content))
+    assert doc.get() == _dumps(content)
+
+
+def test_set_patches_changed_objects():
+    doc = YJCad()
+    doc.set(json.dumps(CONTENT))
+    changes = _object_changes(doc)
+
+    content = copy.deepcopy(CONTENT)
+    content["objects"][1]["parameters"]["Width"] = 2.0
+    doc.set(json.dumps(content))
+    assert changes == [(1,)]
+    assert doc.get() == _dumps(content)
+
+    del changes[:]
+    doc.set(json.dumps(content))
+    assert changes == []
+
+
+@pytest.mark.parametrize(
+    "objects",
+    [
+        [_box("Box 2"), _box("Box 1")],
+        [_box("Box 3"), _box("Box 1")],
+        [_box("Box 1"), _box("Box 1")],
+        [],
+    ],
+)
+def test_set_objects(objects):
+    doc = YJCad()
+    doc.set(json.dumps(CONTENT))
+    content = dict(CONTENT, objects=objects)
+    doc.set(json.dumps(content))
+    assert doc._yobjects.to_py() == objects
+    assert doc.get() == _dumps(content)
+
+
+def test_fragment_cache():
+    doc = YJCad()
+    doc.set(json.dumps(CONTENT))
+    content = copy.deepcopy(CONTENT)
+    assert doc.get() == _dumps(content)
+
+    # Changes made on the shared objects, e.g. by a client
+    doc._yobjects[0]["visible"] = False
+    content["objects"][0]["visible"] = False
+    assert doc.get() == _dumps(content)
+
+    content["objects"][2]["parameters"]["Base"] = "Box 2"
+    doc._yobjects[2]["parameters"] = content["objects"][2]["parameters"]
+    assert doc.get() == _dumps(content)
+
+    del doc._yobjects[1]
+    del content["objects"][1]
+    assert doc.get() == _dumps(content)
+
+    with doc.ydoc.transaction():
+        doc._yobjects.insert(0, Map(_box("Box 4")))
+        doc._yobjects[2]["visible"] = True
+    content["objects"].insert(0, _box("Box 4"))
+    content["objects"][2]["visible"] = True
+    assert doc.get() == _dumps(content)
+
+
+def test_set_newer_version():
+    doc = YJCad()
+    with pytest.raises(ValueError):
+        doc.set(json.dumps(dict(CONTENT, schemaVersion="1000.0.0")))
@@ -0,0 +1,101 @@
+import base64
+import json
+import zipfile
+
+import pytest
+
+from jupytercad_core.jcadz import (
+    CompressedMember,
+    JCADZ_MANIFEST,
+    JCadZFile,
+    dump_jcadz,
+    dumps_jcadz,
+    load_jcadz,
+)
+from jupytercad_core.jcadz_ydoc import YJCadZ
+
+CONTENT = dict(
+    schemaVersion="3.0.0",
+    objects=[
+        dict(
+            name="Box 1",
+            shape="Part::Box",
+            parameters=dict(Length=1.0, Width=1.0, Height=1.0),
+            visible=False,
+        ),
+        dict(
+            name="Any 1",
+            shape="Part::Any",
+            parameters=dict(Content="solid\r\nendsolid\r\n", Type="STL"),
+            visible=True,
+        ),
+    ],
+    options={},
+    metadata=dict(author="me"),
+    outputs={},
+)
+
+
+def test_dump_load_jcadz(tmp_path):
+    path = tmp_path / "doc.jcadz"
+    dump_jcadz(CONTENT, path)
+    assert load_jcadz(path) == CONTENT
+    assert path.read_bytes() == dumps_jcadz(CONTENT)
+
+
+def test_jcadz_file():
+    with JCadZFile(dumps_jcadz(CONTENT)) as jcadz:
+        assert jcadz.names == ["Box 1", "Any 1"]
+        assert [entry["visible"] for entry in jcadz.entries] == [False, True]
+        assert jcadz.manifest["metadata"] == CONTENT["metadata"]
+        assert jcadz.get_object("Any 1") == CONTENT["objects"][1]
+        assert list(jcadz.iter_objects(reverse=True)) == CONTENT["objects"][::-1]
+        with pytest.raises(KeyError):
+            jcadz.get_object("Box 2")
+
+
+def test_invalid_jcadz_file(tmp_path):
+    path = tmp_path / "doc.jcadz"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("objects/0.json", "{}")
+    with pytest.raises(ValueError):
+        JCadZFile(path)
+
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(JCADZ_MANIFEST, json.dumps(dict(formatVersion=1000)))
+    with pytest.raises(ValueError):
+        JCadZFile(path)
+
+
+def test_yjcadz():
+    value = base64.b64encode(dumps_jcadz(CONTENT)).decode("ascii")
+    doc = YJCadZ()
+    doc.set(value)
+    assert doc.get() == value
+
+
+def test_yjcadz_reuses_members(monkeypatch):
+    value = base64.b64encode(dumps_jcadz(CONTENT)).decode("ascii")
+    doc = YJCadZ()
+    doc.set(value)
+    doc._yobjects[0]["visible"] = True
+
+    with JCadZFile(base64.b64decode(doc.get())) as jcadz:
+        # Only the modified object was compressed again
+        with JCadZFile(base64.b64decode(value)) as original:
+            assert jcadz.get_member("Any 1") == original.get_member("Any 1")
+            assert jcadz.get_member("Box 1") != original.get_member("Box 1")
+        assert jcadz.get_object("Box 1")["visible"] is True
+        assert jcadz.entries[0]["visible"] is True
+
+    # Only the objects which changed are decompressed when loading a file
+    decompressed = []
+    decompress = CompressedMember.decompress
+    monkeypatch.setattr(
+        CompressedMember,
+        "decompress",
+        lambda member: decompressed.append(member) or decompress(member),
+    )
+    doc.set(value)
+    assert len(decompressed) == 1
+    assert doc.get() == value
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+from jupytercad_core.meshcache import (
+    MESH_ARRAYS,
+    MeshCache,
+    decode_mesh,
+    encode_mesh,
+    mesh_cache_key,
+)
+
+MESH = dict(
+    faceVertices=[0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.5, 0.0],
+    faceTriangles=[0, 1, 2],
+    faceOffsets=[0, 1],
+    edgeVertices=[0.0, 0.0, 0.0, 1.0, 0.0, 0.0],
+    edgeOffsets=[0, 2],
+    meta={"name": "Box 1", "unicode": "é"},
+)
+
+
+@pytest.mark.parametrize("meta", [True, False])
+def test_encode_decode_mesh(meta):
+    data = MESH if meta else {key: MESH[key] for key in dict(MESH_ARRAYS)}
+    mesh = decode_mesh(encode_mesh(data))
+    for name, dtype in MESH_ARRAYS:
+        assert mesh[name].dtype == np.dtype(dtype)
+        np.testing.assert_array_equal(mesh[name], data[name])
+    assert mesh.get("meta") == data.get("meta")
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"JCMS",
+        encode_mesh(MESH)[:-1],
+        encode_mesh(MESH) + b"\0",
+        b"XXXX" + encode_mesh(MESH)[4:],
+        encode_mesh(MESH)[:-2] + b"\xff}",
+    ],
+)
+def test_decode_invalid_mesh(content):
+    with pytest.raises(ValueError):
+        decode_mesh(content)
+
+
+def test_mesh_cache_key():
+    key = mesh_cache_key("a" * 64, {"linearDeflection": 0.1})
+    assert len(key) == 64
+    assert key == mesh_cache_key("a" * 64, {"linearDeflection": 0.1})
+    assert key != mesh_cache_key("a" * 64, {"linearDeflection": 0.2})
+    assert key != mesh_cache_key("b" * 64, {"linearDeflection": 0.1})
+
+
+def test_mesh_cache(tmp_path):
+    cache = MeshCache(tmp_path, max_size=250)
+    keys = [mesh_cache_key("a" * 64, {"index": index}) for index in range(3)]
+    cache.put(keys[0], b"0" * 100)
+    cache.put(keys[1], b"1" * 100)
+    assert cache.get(keys[0]) == b"0" * 100
+    assert keys[1] in cache
+    # The least recently used mesh is evicted first
+    os.utime(cache.path(keys[1]), (0, 0))
+    cache.put(keys[2], b"2" * 100)
+    assert keys[0] in cache and keys[1] not in cache and keys[2] in cache
+    assert cache.get("f" * 64) is None
+    with pytest.raises(ValueError):
+        cache.get("../" + "f" * 61)
+
+
+def test_mesh_cache_overwrite(tmp_path):
+    cache = MeshCache(tmp_path, max_size=1000)
+    keys = [mesh_cache_key("a" * 64, {"index": index}) for index in range(2)]
+    cache.put(keys[0], b"0" * 100)
+    # Storing a mesh again does not count its size twice
+    for _ in range(3):
+        cache.put(keys[1], b"1" * 100)
+    assert cache._size == 200
+    assert keys[0] in cache and keys[1] in cache
@@ -0,0 +1,88 @@
+import mmap
+import multiprocessing
+
+import pytest
+
+from jupytercad_core.step import StepReference, parse_parameters, scan_step
+
+STEP = b"""ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('A part; with a semicolon'),'2;1');
+FILE_NAME('part.step','2024-01-01T00:00:00',('Author'),(''),'','','');
+FILE_SCHEMA(('AUTOMOTIVE_DESIGN'));
+ENDSEC;
+DATA;
+#1=PRODUCT('Assembly','Assembly','It''s an assembly',(#10));
+#2=PRODUCT_DEFINITION_FORMATION('','',#1);
+#3=PRODUCT_DEFINITION('design','',#2,#11);
+#4=PRODUCT('Part','Part','',(#10));
+#5=PRODUCT_DEFINITION_FORMATION('','',#4);
+#6=PRODUCT_DEFINITION('design','',#5,#11);
+#7=NEXT_ASSEMBLY_USAGE_OCCURRENCE('1','Part:1','',#3,#6,$);
+#8=CARTESIAN_POINT('',(0.,1.5,-2.E-1));
+#9=(LENGTH_UNIT()NAMED_UNIT(*)SI_UNIT(.MILLI.,.METRE.));
+ENDSEC;
+END-ISO-10303-21;
+"""
+
+
+def test_scan_step():
+    result = scan_step(STEP)
+    assert result["header"]["description"] == ["A part; with a semicolon"]
+    assert result["header"]["schemas"] == ["AUTOMOTIVE_DESIGN"]
+    assert [product["name"] for product in result["products"]] == [
+        "Assembly",
+        "Part",
+    ]
+    assert result["products"][0]["description"] == "It's an assembly"
+    assert result["entityCount"] == 9
+    assert result["entities"]["PRODUCT"] == 2
+    assert result["entities"]["SI_UNIT"] == 1
+    assert result["assembly"] == [
+        dict(
+            product="Assembly",
+            children=[dict(product="Part", children=[], name="Part:1")],
+        )
+    ]
+
+
+def test_parse_parameters():
+    assert parse_parameters("'a''b',#12,.T.,(1,2.5),$,LENGTH_MEASURE(3.)") == [
+        "a'b",
+        StepReference(12),
+        "T",
+        [1, 2.5],
+        None,
+        3.0,
+    ]
+
+
+def _scan_truncated(size):
+    data = STEP[: STEP.index(b"#8=")] + b"#8=CLOSED_SHELL('',(" + b"#10," * size
+    scan_step(data)
+
+
+@pytest.mark.parametrize("size", [40, 10000])
+def test_scan_truncated_step(size):
+    # Unterminated records used to backtrack exponentially
+    process = multiprocessing.get_context("spawn").Process(
+        target=_scan_truncated, args=(size,)
+    )
+    process.start()
+    process.join(30)
+    if process.is_alive():
+        process.kill()
+        process.join()
+        pytest.fail("Scanning a truncated STEP file timed out")
+    assert process.exitcode == 0
+
+
+def test_scan_step_keeps_given_mmap(tmp_path):
+    path = tmp_path / "part.step"
+    path.write_bytes(STEP)
+    with open(path, "rb") as fobj:
+        data = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+    scan_step(data)
+    assert not data.closed
+    data.close()
+    assert scan_step(path)["entityCount"] == 9
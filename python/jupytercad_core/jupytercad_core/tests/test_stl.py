@@ -0,0 +1,90 @@
+import base64
+
+import numpy as np
+import pytest
+
+from jupytercad_core.stl import (
+    ascii_to_binary,
+    binary_to_ascii,
+    is_binary_stl,
+    iter_chunks,
+    mesh_to_binary,
+    read_triangles,
+    stl_properties,
+)
+from jupytercad_core.stl_ydoc import YSTL
+
+# A unit cube, with outward facing triangles
+VERTICES = np.array(
+    [[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=float
+)
+TRIANGLES = np.array(
+    [
+        [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5],
+        [0, 4, 5], [0, 5, 1], [2, 3, 7], [2, 7, 6],
+        [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3],
+    ]
+)  # fmt: skip
+
+ASCII = (
+    "solid part\r\n"
+    "  facet normal 0 0 1\r\n"
+    "    outer loop\r\n"
+    "      vertex 0.1 0 0\r\n"
+    "      vertex 1 0 0\r\n"
+    "      vertex 0 1 0.333333333333\r\n"
+    "    endloop\r\n"
+    "  endfacet\r\n"
+    "endsolid part\r\n"
+)
+
+
+def test_stl_conversions():
+    binary = mesh_to_binary(VERTICES, TRIANGLES)
+    assert is_binary_stl(binary)
+    text = binary_to_ascii(binary, "cube")
+    assert text.startswith("solid cube\n")
+    assert not is_binary_stl(text.encode("ascii"))
+    np.testing.assert_array_equal(
+        read_triangles(ascii_to_binary(text)), read_triangles(binary)
+    )
+    np.testing.assert_array_equal(read_triangles(text), VERTICES[TRIANGLES])
+    with pytest.raises(ValueError):
+        ascii_to_binary(text.replace("vertex", "", 1))
+
+
+def test_stl_properties():
+    properties = stl_properties(mesh_to_binary(VERTICES, TRIANGLES))
+    assert properties["triangleCount"] == 12
+    assert properties["boundingBox"] == dict(min=[0, 0, 0], max=[1, 1, 1])
+    assert properties["area"] == pytest.approx(6)
+    assert properties["volume"] == pytest.approx(1)
+    np.testing.assert_allclose(properties["centerOfMass"], [0.5, 0.5, 0.5])
+    np.testing.assert_allclose(properties["matrixOfInertia"], np.eye(3) / 6, atol=1e-12)
+
+
+def test_iter_chunks():
+    data = bytes(range(256)) * 10
+    chunks = list(iter_chunks(data, 1000))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 560]
+    assert b"".join(chunks) == data
+
+
+@pytest.mark.parametrize("encoded", [True, False])
+def test_ystl_ascii(encoded):
+    doc = YSTL()
+    doc.set(base64.b64encode(ASCII.encode()).decode() if encoded else ASCII)
+    assert base64.b64decode(doc.get()) == ASCII.encode()
+    np.testing.assert_allclose(
+        read_triangles(doc.get_binary()), read_triangles(ASCII), rtol=1e-7
+    )
+
+
+def test_ystl_binary(tmp_path):
+    binary = mesh_to_binary(VERTICES, TRIANGLES)
+    path = tmp_path / "cube.stl"
+    path.write_bytes(binary)
+    doc = YSTL()
+    doc.load(path)
+    assert doc.get_binary() == binary
+    assert base64.b64decode(doc.get()) == binary
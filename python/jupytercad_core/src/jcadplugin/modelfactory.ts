@@ -14,6 +14,9 @@ export class JupyterCadJcadModelFactory implements DocumentRegistry.IModelFactor
   constructor(options: JupyterCadJcadModelFactory.IOptions) {
     this._annotationModel = options.annotationModel;
     this._settingRegistry = options.settingRegistry;
+    this._name = options.name ?? 'jupytercad-jcadmodel';
+    this._contentType = options.contentType ?? 'jcad';
+    this._fileFormat = options.fileFormat ?? 'text';
   }
 
   /**
@@ -27,7 +30,7 @@ export class JupyterCadJcadModelFactory implements DocumentRegistry.IModelFactor
    * @returns The name
    */
   get name(): string {
-    return 'jupytercad-jcadmodel';
+    return this._name;
   }
 
   /**
@@ -36,7 +39,7 @@ export class JupyterCadJcadModelFactory implements DocumentRegistry.IModelFactor
    * @returns The content type
    */
   get contentType(): Contents.ContentType {
-    return 'jcad';
+    return this._contentType;
   }
 
   /**
@@ -45,7 +48,7 @@ export class JupyterCadJcadModelFactory implements DocumentRegistry.IModelFactor
    * @returns the file format
    */
   get fileFormat(): Contents.FileFormat {
-    return 'text';
+    return this._fileFormat;
   }
 
   /**
@@ -94,6 +97,9 @@ export class JupyterCadJcadModelFactory implements DocumentRegistry.IModelFactor
 
   private _annotationModel: IAnnotationModel;
   private _settingRegistry: ISettingRegistry | undefined;
+  private _name: string;
+  private _contentType: Contents.ContentType;
+  private _fileFormat: Contents.FileFormat;
   private _disposed = false;
 }
 
@@ -101,5 +107,17 @@ export namespace JupyterCadJcadModelFactory {
   export interface IOptions {
     annotationModel: IAnnotationModel;
     settingRegistry?: ISettingRegistry;
+    /**
+     * The model name, defaults to `jupytercad-jcadmodel`.
+     */
+    name?: string;
+    /**
+     * The content type, defaults to `jcad`.
+     */
+    contentType?: Contents.ContentType;
+    /**
+     * The file format, defaults to `text`.
+     */
+    fileFormat?: Contents.FileFormat;
   }
 }
@@ -1,5 +1,9 @@
 import { ICollaborativeContentProvider } from '@jupyter/collaborative-drive';
-import { logoIcon, CommandIDs as BaseCommandIDs } from '@jupytercad/base';
+import {
+  logoIcon,
+  CommandIDs as BaseCommandIDs,
+  JupyterCadDocumentWidget
+} from '@jupytercad/base';
 import {
   SCHEMA_VERSION,
   IAnnotationModel,
@@ -35,6 +39,8 @@ import { ISettingRegistry } from '@jupyterlab/settingregistry';
 
 const FACTORY = 'JupyterCAD';
 const CONTENT_TYPE = 'jcad';
+const JCADZ_FACTORY = 'JupyterCAD JCADZ';
+const JCADZ_CONTENT_TYPE = 'jcadz';
 const PALETTE_CATEGORY = 'JupyterCAD';
 const SETTINGS_ID = '@jupytercad/jupytercad-core:jupytercad-settings';
 
@@ -91,6 +97,25 @@ const activate = async (
   // Registering the widget factory
   app.docRegistry.addWidgetFactory(widgetFactory);
 
+  // The compressed .jcadz files share the jcad model, the server
+  // takes care of the (de)compression
+  const jcadzWidgetFactory = new JupyterCadDocumentWidgetFactory({
+    name: JCADZ_FACTORY,
+    modelName: 'jupytercad-jcadzmodel',
+    fileTypes: [JCADZ_CONTENT_TYPE],
+    defaultFor: [JCADZ_CONTENT_TYPE],
+    tracker,
+    commands: app.commands,
+    workerRegistry,
+    externalCommandRegistry,
+    manager: app.serviceManager,
+    contentFactory,
+    rendermime,
+    mimeTypeService: editorServices.mimeTypeService,
+    consoleTracker
+  });
+  app.docRegistry.addWidgetFactory(jcadzWidgetFactory);
+
   const factory = new MimeDocumentFactory({
     dataType: 'json',
     rendermime,
@@ -107,6 +132,15 @@ const activate = async (
     settingRegistry
   });
   app.docRegistry.addModelFactory(modelFactory);
+  app.docRegistry.addModelFactory(
+    new JupyterCadJcadModelFactory({
+      annotationModel,
+      settingRegistry,
+      name: 'jupytercad-jcadzmodel',
+      contentType: JCADZ_CONTENT_TYPE,
+      fileFormat: 'base64'
+    })
+  );
   // register the filetype
   app.docRegistry.addFileType({
     name: CONTENT_TYPE,
@@ -116,6 +150,14 @@ const activate = async (
     fileFormat: 'text',
     icon: logoIcon
   });
+  app.docRegistry.addFileType({
+    name: JCADZ_CONTENT_TYPE,
+    displayName: 'Compressed JCAD',
+    mimeTypes: ['application/zip'],
+    extensions: ['.jcadz', '.JCADZ'],
+    fileFormat: 'base64',
+    icon: logoIcon
+  });
 
   const jcadSharedModelFactory: SharedDocumentFactory = () => {
     return new JupyterCadDoc();
@@ -125,9 +167,16 @@ const activate = async (
       CONTENT_TYPE,
       jcadSharedModelFactory
     );
+    collaborativeContentProvider.sharedModelFactory.registerDocumentFactory(
+      JCADZ_CONTENT_TYPE,
+      jcadSharedModelFactory
+    );
   }
 
-  widgetFactory.widgetCreated.connect((sender, widget) => {
+  const onWidgetCreated = (
+    sender: JupyterCadDocumentWidgetFactory,
+    widget: JupyterCadDocumentWidget
+  ) => {
     widget.title.icon = logoIcon;
     widget.context.pathChanged.connect(() => {
       tracker.save(widget);
@@ -137,7 +186,9 @@ const activate = async (
     );
     tracker.add(widget);
     app.shell.activateById('jupytercad::leftControlPanel');
-  });
+  };
+  widgetFactory.widgetCreated.connect(onWidgetCreated);
+  jcadzWidgetFactory.widgetCreated.connect(onWidgetCreated);
 
   app.commands.addCommand(CommandIDs.createNew, {
     label: args => (args['label'] as string) ?? 'CAD file',
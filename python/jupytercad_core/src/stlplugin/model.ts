@@ -14,8 +14,10 @@ export class JupyterCadStlDoc extends JupyterCadDoc {
     super();
 
     this._source = this.ydoc.getText('source');
+    this._chunks = this.ydoc.getArray<Uint8Array>('chunks');
 
     this._source.observeDeep(this._sourceObserver);
+    this._chunks.observe(this._chunksObserver);
   }
 
   set source(value: string) {
@@ -31,7 +33,7 @@ export class JupyterCadStlDoc extends JupyterCadDoc {
   }
 
   get objects(): Array<IJCadObject> {
-    const source = this._source.toJSON();
+    const source = this._getContent();
 
     if (!source) {
       return [];
@@ -43,7 +45,7 @@ export class JupyterCadStlDoc extends JupyterCadDoc {
         visible: true,
         shape: 'Part::Any',
         parameters: {
-          Content: this._source.toJSON(),
+          Content: source,
           Type: 'STL',
           Color: '#808080',
           Placement: {
@@ -67,7 +69,39 @@ export class JupyterCadStlDoc extends JupyterCadDoc {
   editable = false;
   toJcadEndpoint = 'jupytercad/export';
 
+  /**
+   * The STL content. The binary chunks are joined in a binary string, which
+   * the OCC worker writes byte for byte in its file system.
+   */
+  private _getContent(): string {
+    if (this._content === undefined) {
+      this._content =
+        this._chunks.length > 0
+          ? toBinaryString(this._chunks.toArray())
+          : this._source.toJSON();
+    }
+    return this._content;
+  }
+
+  private _chunksObserver = (): void => {
+    this._content = undefined;
+    const changes: Array<{
+      name: string;
+      key: keyof IJCadObject;
+      newValue: IJCadObject;
+    }> = [
+      {
+        name: 'Stl File',
+        key: 'parameters',
+        newValue: this.objects[0]
+      }
+    ];
+    this._objectChanged.emit({ objectChange: changes });
+    this._changed.emit({ objectChange: changes });
+  };
+
   private _sourceObserver = (events: Y.YEvent<any>[]): void => {
+    this._content = undefined;
     const changes: Array<{
       name: string;
       key: keyof IJCadObject;
@@ -87,7 +121,29 @@ export class JupyterCadStlDoc extends JupyterCadDoc {
   };
 
   private _source: Y.Text;
+  private _chunks: Y.Array<Uint8Array>;
+  private _content: string | undefined = undefined;
   private _objectChanged = new Signal<IJupyterCadDoc, IJcadObjectDocChange>(
     this
   );
 }
+
+/**
+ * Convert binary data to a string with one character per byte.
+ */
+function toBinaryString(chunks: Uint8Array[]): string {
+  const parts: string[] = [];
+  // Convert by slices to stay below the maximum number of function arguments
+  const SLICE = 0x8000;
+  for (const chunk of chunks) {
+    for (let i = 0; i < chunk.length; i += SLICE) {
+      parts.push(
+        String.fromCharCode.apply(
+          null,
+          Array.from(chunk.subarray(i, i + SLICE))
+        )
+      );
+    }
+  }
+  return parts.join('');
+}
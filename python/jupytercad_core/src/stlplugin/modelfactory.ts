@@ -18,7 +18,9 @@ class JupyterCadStlModel extends JupyterCadModel {
   }
 
   fromString(data: string): void {
-    (this.sharedModel as JupyterCadStlDoc).source = data;
+    // The file is loaded in base64, but may come as text from older clients
+    const content = data.trimStart().startsWith('solid') ? data : atob(data);
+    (this.sharedModel as JupyterCadStlDoc).source = content;
     this.dirty = true;
   }
 
@@ -61,7 +63,7 @@ export class JupyterCadStlModelFactory implements DocumentRegistry.IModelFactory
    * @returns the file format
    */
   get fileFormat(): Contents.FileFormat {
-    return 'text';
+    return 'base64';
   }
 
   /**
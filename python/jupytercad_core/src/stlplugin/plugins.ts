@@ -85,7 +85,7 @@ const activate = async (
     displayName: 'STL',
     mimeTypes: ['text/plain'],
     extensions: ['.stl', '.STL'],
-    fileFormat: 'text',
+    fileFormat: 'base64',
     icon: stlIcon
   });
 
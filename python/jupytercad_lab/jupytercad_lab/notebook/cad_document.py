@@ -1,13 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import json
 import logging
+import multiprocessing
+import os
 import tempfile
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    get_args,
+)
 
-from pycrdt import Array, Doc, Map, Text
-from pydantic import BaseModel
+import numpy as np
+from numpy.typing import ArrayLike
+from pycrdt import Array, ArrayEvent, Doc, Map, MapEvent, Text
+from pydantic import (
+    BaseModel,
+    PrivateAttr,
+    create_model,
+)
 from ypywidgets.comm import CommWidget
 
 from uuid import uuid4
@@ -30,10 +57,40 @@ from jupytercad_core.schema import (
     IAny,
     SCHEMA_VERSION,
 )
+from jupytercad_core.blobstore import (
+    BlobStore,
+    blob_key,
+    is_blob_reference,
+    open_blob_store,
+)
+from jupytercad_core.compression import compress_content, decompress_content
+from jupytercad_core.evaluation import ShapeEvaluator, object_hashes, write_brep
+from jupytercad_core.files import replacement_mode
+from jupytercad_core.graph import (
+    OPERATOR_DEPENDENCIES,
+    DependencyGraph,
+    object_dependencies,
+)
+from jupytercad_core.jcad import JCadFile
+from jupytercad_core.jcadz import JCadZFile, dump_jcadz
+from jupytercad_core.mesh import mesh_settings, resolve_tessellation, shape_mesh_data
+from jupytercad_core.meshcache import MeshCache, encode_mesh, mesh_cache_key
+from jupytercad_core.stl import (
+    binary_to_ascii,
+    is_binary_stl,
+    map_stl_file,
+    stl_shape_metadata,
+)
 from jupytercad_core.schema.interfaces import geomLineSegment, geomCircle
 
 logger = logging.getLogger(__file__)
 
+# The object keys from which the dependencies of an object are read
+_DEPENDENCY_KEYS = frozenset(("shape", "parameters", "dependencies"))
+
+# Number of objects decoded before they are added to the document on import
+_IMPORT_CHUNK_SIZE = 256
+
 
 class CadDocument(CommWidget):
     """
@@ -41,10 +98,21 @@ class CadDocument(CommWidget):
 
     :param path: the path to the file that you would like to open.
     If not provided, a new empty document will be created.
+    :param blob_store: the content-addressed store used for large ``Part::Any``
+    payloads. Either a :class:`BlobStore`, ``True`` to use the store next to the
+    document, which requires a path, or ``None`` to keep all payloads inline.
     """
 
-    def __init__(self, path: Optional[str] = None):
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        blob_store: Union[BlobStore, bool, None] = None,
+    ):
         comm_metadata = CadDocument._path_to_comm(path)
+        self._path = path
+        if blob_store is True:
+            blob_store = open_blob_store(path)
+        self._blob_store: Optional[BlobStore] = blob_store or None
 
         ydoc = Doc()
 
@@ -59,30 +127,90 @@ class CadDocument(CommWidget):
         self.ydoc["outputs"] = self._outputs = Map()
         self.ydoc["options"] = self._options = Map()
 
+        # The object names in the document order, and the index of each name
+        # (rebuilt lazily when objects are inserted or removed in the middle)
+        self._names: List[Optional[str]] = []
+        self._name_index: Optional[Dict[str, int]] = {}
+        # The first possibly free number for each object type
+        self._name_counters: Dict[str, int] = {}
+        # The dependencies between the objects, updated with the name index
+        self._graph = DependencyGraph()
+        # The shapes evaluated with Open Cascade, created on first evaluation
+        self._evaluator: Optional[ShapeEvaluator] = None
+        # The worker processes of parallel evaluations, created on first use
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_workers = 0
+        # Inside a batch, the index is updated as objects are added, removed and
+        # renamed, and the changes are not applied again on commit
+        self._batch_depth = 0
+        self._delta_applied = False
+        # The digests of the document updates saved to each path, to skip
+        # unchanged saves, and the ordering of the saves running in the
+        # background
+        self._saved_states: Dict[Tuple[str, bool], Tuple[bytes, int]] = {}
+        self._save_lock = threading.Lock()
+        self._save_generation = 0
+        self._written_generations: Dict[Tuple[str, bool], int] = {}
+        self._objects_subscription = self._objects_array.observe_deep(
+            self._on_objects_changed
+        )
+
     @property
     def objects(self) -> List[str]:
         """
         Get the list of objects that the document contains as a list of strings.
         """
-        if self._objects_array:
-            return [x["name"] for x in self._objects_array]
-        return []
+        return list(self._names)
+
+    @property
+    def dependency_graph(self) -> DependencyGraph:
+        """
+        The dependency graph of the document objects, which is kept up to date
+        with the document. It must not be modified.
+
+        .. code-block:: Python
+
+            # The objects to recompute after modifying "Box 1", in order
+            doc.dependency_graph.dirty(["Box 1"])
+        """
+        return self._graph
 
     @classmethod
-    def import_from_file(cls, path: str | Path) -> CadDocument:
+    def import_from_file(
+        cls,
+        path: str | Path,
+        blob_store: Union[BlobStore, bool, None] = None,
+        objects: Optional[Sequence[str]] = None,
+    ) -> CadDocument:
         """
-        Import a CadDocument from a .jcad file.
+        Import a CadDocument from a .jcad or .jcadz file.
+
+        The file is indexed first, and the imported objects are then decoded and
+        added to the document in chunks, so that the decoded objects are never
+        held in memory as a whole.
 
         :param path: The path to the file.
+        :param blob_store: The blob store to use for large payloads, ``True`` to use
+        the one next to the file. Large payloads of the file are moved to the
+        store, and loaded from it when needed.
+        :param objects: The names of the objects to import, all objects by default.
+        The objects they depend on are not imported unless they are listed.
         :return: A new CadDocument instance.
         """
-        instance = cls()
-        with open(path, "r") as f:
-            jcad_content = json.load(f)
+        if blob_store is True:
+            blob_store = open_blob_store(path)
+        instance = cls(blob_store=blob_store)
+        instance._path = str(path)
+        reader = JCadZFile if Path(path).suffix.lower() == ".jcadz" else JCadFile
+        with reader(path) as jcad:
+            if objects is None:
+                instance._import_objects(jcad.iter_objects(reverse=True))
+            else:
+                instance._import_objects(
+                    jcad.get_object(name) for name in reversed(objects)
+                )
+            jcad_content = jcad.manifest
 
-        instance.ydoc["objects"] = instance._objects_array = Array(
-            [Map(obj) for obj in jcad_content.get("objects", [])]
-        )
         instance.ydoc["options"] = instance._options = Map(
             jcad_content.get("options", {})
         )
@@ -95,21 +223,282 @@ class CadDocument(CommWidget):
 
         return instance
 
-    def save(self, path: str | Path) -> None:
+    def _import_objects(self, objects: Iterable[Dict]) -> None:
+        """
+        Add imported objects to the empty document in one transaction, a chunk
+        at a time.
+
+        The objects are given in the reverse document order, and each chunk is
+        inserted at the start of the document: shared arrays look up an index
+        from their start, which makes appending to a large array slow.
+        """
+        objects = iter(objects)
+        with self.batch():
+            while chunk := [
+                self._import_object(obj) for obj in islice(objects, _IMPORT_CHUNK_SIZE)
+            ]:
+                chunk.reverse()
+                self._insert_yobjects(0, [Map(obj) for obj in chunk], chunk)
+
+    def _import_object(self, obj: Dict) -> Dict:
+        """
+        Move the content of an imported object to the blob store of the
+        document, if it has one.
+        """
+        parameters = obj.get("parameters", {})
+        content = parameters.get("Content")
+        if self._blob_store is not None and isinstance(content, str):
+            parameters["Content"] = self._blob_store.maybe_put(content)
+        return obj
+
+    def save(self, path: str | Path, compact: bool = False) -> None:
         """
         Save the CadDocument to a .jcad file on the local filesystem.
+        The document is saved in the compressed .jcadz format if the path
+        has a .jcadz extension.
+
+        The file is written to a temporary file first, which then replaces the
+        target atomically. Nothing is written if the document did not change
+        since it was last saved to the same path.
 
         :param path: The path to the file.
+        :param compact: Whether to write the JSON without indentation.
         """
-        content = {
+        digest = hashlib.sha256(self.ydoc.get_update()).digest()
+        if self._is_saved(path, compact, digest):
+            return
+        generation = self._next_save_generation()
+        self._write_content(self._content(), path, compact, generation, digest)
+
+    async def save_async(self, path: str | Path, compact: bool = False) -> None:
+        """
+        Save the CadDocument like :meth:`save`, in a background thread.
+
+        The document is snapshotted when the save starts and later
+        modifications are not saved, the serialization and the writing of the
+        file happen off the kernel thread.
+
+        :param path: The path to the file.
+        :param compact: Whether to write the JSON without indentation.
+        """
+        update = self.ydoc.get_update()
+        digest = hashlib.sha256(update).digest()
+        if self._is_saved(path, compact, digest):
+            return
+        generation = self._next_save_generation()
+
+        def save() -> None:
+            self._write_content(
+                _content_from_update(update), path, compact, generation, digest
+            )
+
+        await asyncio.get_running_loop().run_in_executor(None, save)
+
+    def _content(self) -> Dict[str, Any]:
+        return {
             "schemaVersion": SCHEMA_VERSION,
             "objects": self._objects_array.to_py(),
             "options": self._options.to_py(),
             "metadata": self._metadata.to_py(),
             "outputs": self._outputs.to_py(),
         }
-        with open(path, "w") as f:
-            json.dump(content, f, indent=4)
+
+    def _is_saved(self, path: str | Path, compact: bool, digest: bytes) -> bool:
+        """
+        Whether the document update with the `digest` SHA-256 digest was saved
+        to `path`, which was not modified since.
+
+        The digest is the one of the whole update of the document rather than
+        of its state vector, which does not change with deletions.
+        """
+        saved = self._saved_states.get((str(Path(path).resolve()), compact))
+        if saved is None:
+            return False
+        try:
+            return saved == (digest, os.stat(path).st_mtime_ns)
+        except OSError:
+            return False
+
+    def _next_save_generation(self) -> int:
+        with self._save_lock:
+            self._save_generation += 1
+            return self._save_generation
+
+    def _write_content(
+        self,
+        content: Dict[str, Any],
+        path: str | Path,
+        compact: bool,
+        generation: int,
+        digest: bytes,
+    ) -> None:
+        """
+        Write the content snapshotted at `generation` to `path`, unless a more
+        recent snapshot was already written.
+        """
+        self._copy_blobs(content["objects"], open_blob_store(path))
+        path = Path(path)
+        key = (str(path.resolve()), compact)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=f"{path.suffix}.tmp")
+        try:
+            with os.fdopen(fd, "wb") as fobj:
+                if path.suffix.lower() == ".jcadz":
+                    dump_jcadz(content, fobj)
+                else:
+                    text = (
+                        json.dumps(content, separators=(",", ":"))
+                        if compact
+                        else json.dumps(content, indent=4)
+                    )
+                    fobj.write(text.encode("utf-8"))
+            with self._save_lock:
+                if generation < self._written_generations.get(key, 0):
+                    os.unlink(tmp_path)
+                    return
+                os.chmod(tmp_path, replacement_mode(path))
+                os.replace(tmp_path, path)
+                self._written_generations[key] = generation
+                self._saved_states[key] = (digest, os.stat(path).st_mtime_ns)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _copy_blobs(self, objects: List[Dict], target: BlobStore) -> None:
+        """
+        Make sure the blobs referenced by `objects` exist in the `target` store.
+        """
+        for obj in objects:
+            content = obj.get("parameters", {}).get("Content")
+            if is_blob_reference(content) and blob_key(content) not in target:
+                target.put(self._resolve_content(content))
+
+    def _resolve_content(self, content: str) -> str:
+        if not is_blob_reference(content):
+            return content
+        store = self._blob_store or open_blob_store(self._path)
+        return store.get(content)
+
+    def _store_content(self, content: str, blob: Optional[bool]) -> str:
+        if blob is False or (blob is None and self._blob_store is None):
+            return content
+        if self._blob_store is None:
+            self._blob_store = open_blob_store(self._path)
+        return self._blob_store.maybe_put(content)
+
+    def get_content(self, name: str) -> Optional[str]:
+        """
+        Get the file content of a ``Part::Any`` object, loading it from the
+        blob store if the document only holds a reference to it, and
+        decompressing it if it is compressed.
+
+        :param name: The name of the object.
+        :return: The content, or None if the object has no content.
+        """
+        obj = self._get_yobject_by_name(name)
+        if obj is None:
+            raise RuntimeError(f"No object named {name}")
+        content = obj.get("parameters", {}).get("Content")
+        if content is None:
+            return None
+        return decompress_content(self._resolve_content(content))
+
+    def evaluate(
+        self, names: Optional[List[str]] = None, max_workers: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Compute the Open Cascade shapes of the document objects.
+        You need `pythonocc-core` installed in order to use this method.
+
+        Shapes are cached, and only the objects which were modified, or which
+        depend on modified objects, are recomputed by later evaluations.
+
+        :param names: The objects to evaluate, all objects by default.
+        :param max_workers: The number of processes evaluating the independent
+        branches of the document in parallel. By default, the shapes are
+        evaluated in the kernel. The processes are kept for the next
+        evaluations, until the document is closed.
+        :return: The ``TopoDS_Shape`` of each object, or None if the shape
+        cannot be built.
+        """
+        if self._evaluator is None:
+            self._evaluator = ShapeEvaluator(resolve_content=self._resolve_content)
+        objects = self._objects_array.to_py()
+        if max_workers <= 1:
+            return self._evaluator.evaluate(objects, names)
+        return self._evaluator.evaluate(
+            objects, names, self._evaluation_pool(max_workers)
+        )
+
+    def _evaluation_pool(self, max_workers: int) -> ProcessPoolExecutor:
+        """Get the process pool of parallel evaluations, creating it on first use"""
+        if self._executor is None or self._executor_workers != max_workers:
+            self.close()
+            # Forking a kernel running threads is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            self._executor_workers = max_workers
+        return self._executor
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes of parallel evaluations. The document
+        can still be used, and the processes are started again when needed.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._executor_workers = 0
+
+    def cache_meshes(
+        self,
+        names: Optional[List[str]] = None,
+        cache: Optional[MeshCache] = None,
+        max_workers: int = 1,
+    ) -> List[str]:
+        """
+        Compute the meshes of the document objects and store them in the mesh
+        cache, so that the 3D views display them without computing them. The
+        meshes are computed with the tessellation settings of the objects, see
+        :meth:`set_tessellation`.
+        You need `pythonocc-core` installed in order to use this method.
+
+        :param names: The objects to mesh, all objects by default.
+        :param cache: The mesh cache, by default the cache of the Jupyter
+        server running on this machine.
+        :param max_workers: The number of processes evaluating the shapes,
+        see :meth:`evaluate`.
+        :return: The objects whose mesh was computed, the others being
+        already cached or not being buildable.
+        """
+        if cache is None:
+            cache = MeshCache()
+        objects = {obj["name"]: obj for obj in self._objects_array.to_py()}
+        hashes = object_hashes(list(objects.values()))
+        options = self._options.to_py()
+        # Post-processing results are not meshes of shapes
+        settings = {
+            name: mesh_settings(resolve_tessellation(options, obj))
+            for name, obj in objects.items()
+            if (names is None or name in names)
+            and name in hashes
+            and not (obj.get("shape") or "").startswith("Post::")
+        }
+        keys = {name: mesh_cache_key(hashes[name], settings[name]) for name in settings}
+        missing = [name for name, key in keys.items() if key not in cache]
+        if not missing:
+            return []
+
+        computed = []
+        for name, shape in self.evaluate(missing, max_workers).items():
+            if shape is None:
+                continue
+            data = shape_mesh_data(shape, objects[name], settings[name])
+            cache.put(keys[name], encode_mesh(data))
+            computed.append(name)
+        return computed
 
     @classmethod
     def _path_to_comm(cls, filePath: Optional[str]) -> Dict:
@@ -130,16 +519,29 @@ class CadDocument(CommWidget):
             elif ext == "jcad":
                 format = "text"
                 contentType = "jcad"
+            elif ext == "jcadz":
+                format = "base64"
+                contentType = "jcadz"
             else:
                 raise ValueError("File extension is not supported!")
         return dict(
             path=path, format=format, contentType=contentType, createydoc=path is None
         )
 
-    def get_object(self, name: str) -> Optional["PythonJcadObject"]:
-        if self.check_exist(name):
-            data = self._get_yobject_by_name(name).to_py()
-            return OBJECT_FACTORY.create_object(data, self)
+    def get_object(self, name: str) -> Optional[JcadObjectProxy]:
+        """
+        Get an object of the document.
+
+        The object is a live view on the shared document: attributes are read
+        when accessed, and assigning them updates the document, e.g.
+        ``doc.get_object("Box 1").parameters.Length = 3``.
+
+        :param name: The name of the object.
+        :return: The object, or None if there is no object with this name.
+        """
+        yobject = self._get_yobject_by_name(name)
+        if yobject is not None:
+            return JcadObjectProxy(yobject, self)
 
     def _get_color(self, shape_id: str | int) -> str:
         """
@@ -163,8 +565,8 @@ class CadDocument(CommWidget):
         :return: The document itself.
         """
         index = self._get_yobject_index_by_name(name)
-        if self._objects_array and index != -1:
-            self._objects_array.pop(index)
+        if index != -1:
+            self._remove_yobject(index)
         return self
 
     def rename(self, old_name: str, new_name: str) -> CadDocument:
@@ -177,17 +579,28 @@ class CadDocument(CommWidget):
         """
         if new_name == old_name:
             return self
-        new_obj = self.get_object(old_name)
-        new_obj.name = new_name
-        self.add_object(new_obj).remove(old_name)
+        yobject = self._get_yobject_by_name(old_name)
+        if yobject is None:
+            raise RuntimeError(f"No object named {old_name}")
+        if self.check_exist(new_name):
+            logger.error(f"Object {new_name} already exists")
+            return self
+        if self._batch_depth:
+            self._set_name(self._get_yobject_index_by_name(old_name), new_name)
+        yobject["name"] = new_name
         return self
 
-    def add_object(self, new_object: "PythonJcadObject") -> CadDocument:
+    def add_object(
+        self, new_object: Union["PythonJcadObject", JcadObjectProxy]
+    ) -> CadDocument:
         if self._objects_array is not None and not self.check_exist(new_object.name):
-            obj_dict = json.loads(new_object.model_dump_json())
+            if isinstance(new_object, JcadObjectProxy):
+                obj_dict = new_object.to_py()
+            else:
+                obj_dict = json.loads(new_object.model_dump_json())
             obj_dict["visible"] = True
             new_map = Map(obj_dict)
-            self._objects_array.append(new_map)
+            self._append_yobject(new_map)
         else:
             logger.error(f"Object {new_object.name} already exists")
         return self
@@ -247,7 +660,20 @@ class CadDocument(CommWidget):
         position: List[float] = [0, 0, 0],
         rotation_axis: List[float] = [0, 0, 1],
         rotation_angle: float = 0,
+        blob: Optional[bool] = None,
     ) -> CadDocument:
+        """
+        Add a STEP file to the document.
+
+        :param path: The path to the STEP file.
+        :param name: The name that will be used for the object in the document.
+        :param position: The shape 3D position.
+        :param rotation_axis: The 3D axis used for the rotation.
+        :param rotation_angle: The shape rotation angle, in degrees.
+        :param blob: Whether to store the file content in the blob store. Defaults to
+        using the blob store if the document has one.
+        :return: The document itself.
+        """
         shape_name = name if name else Path(path).stem
         if self.check_exist(shape_name):
             logger.error(f"Object {shape_name} already exists")
@@ -260,7 +686,7 @@ class CadDocument(CommWidget):
             "shape": "Part::Any",
             "name": shape_name,
             "parameters": {
-                "Content": data,
+                "Content": self._store_content(data, blob),
                 "Type": "STEP",
                 "Placement": {
                     "Position": position,
@@ -271,7 +697,66 @@ class CadDocument(CommWidget):
             "visible": True,
         }
 
-        self._objects_array.append(Map(data))
+        self._append_yobject(Map(data))
+
+        return self
+
+    def add_stl_file(
+        self,
+        path: str,
+        name: str = "",
+        position: List[float] = [0, 0, 0],
+        rotation_axis: List[float] = [0, 0, 1],
+        rotation_angle: float = 0,
+        blob: Optional[bool] = None,
+    ) -> CadDocument:
+        """
+        Add a binary or ASCII STL file to the document. The mass properties of
+        the mesh are computed right away, and stored in the shape metadata.
+
+        :param path: The path to the STL file.
+        :param name: The name that will be used for the object in the document.
+        :param position: The shape 3D position.
+        :param rotation_axis: The 3D axis used for the rotation.
+        :param rotation_angle: The shape rotation angle, in degrees.
+        :param blob: Whether to store the file content in the blob store. Defaults to
+        using the blob store if the document has one.
+        :return: The document itself.
+        """
+        shape_name = name if name else Path(path).stem
+        if self.check_exist(shape_name):
+            logger.error(f"Object {shape_name} already exists")
+            return
+
+        mesh = map_stl_file(path)
+        try:
+            metadata = stl_shape_metadata(mesh)
+            if is_binary_stl(mesh):
+                content = binary_to_ascii(mesh)
+            else:
+                content = bytes(mesh).decode("ascii")
+        finally:
+            if hasattr(mesh, "close"):
+                mesh.close()
+
+        data = {
+            "shape": "Part::Any",
+            "name": shape_name,
+            "parameters": {
+                "Content": self._store_content(content, blob),
+                "Type": "stl",
+                "Placement": {
+                    "Position": position,
+                    "Axis": rotation_axis,
+                    "Angle": rotation_angle,
+                },
+            },
+            "visible": True,
+        }
+        if metadata:
+            data["shapeMetadata"] = metadata
+
+        self._append_yobject(Map(data))
 
         return self
 
@@ -282,6 +767,8 @@ class CadDocument(CommWidget):
         position: List[float] = [0, 0, 0],
         rotation_axis: List[float] = [0, 0, 1],
         rotation_angle: float = 0,
+        blob: Optional[bool] = None,
+        compress: bool = False,
     ) -> CadDocument:
         """
         Add an OpenCascade TopoDS shape to the document.
@@ -292,10 +779,14 @@ class CadDocument(CommWidget):
         :param position: The shape 3D position.
         :param rotation_axis: The 3D axis used for the rotation.
         :param rotation_angle: The shape rotation angle, in degrees.
+        :param blob: Whether to store the BREP data in the blob store. Defaults to
+        using the blob store if the document has one.
+        :param compress: Whether to compress the BREP data, which is then several
+        times smaller in the document.
         :return: The document itself.
         """
         try:
-            from OCC.Core.BRepTools import breptools
+            import OCC.Core  # noqa: F401
         except ImportError:
             raise RuntimeError("Cannot add an OpenCascade shape if it's not installed.")
 
@@ -304,15 +795,15 @@ class CadDocument(CommWidget):
             logger.error(f"Object {shape_name} already exists")
             return
 
-        with tempfile.NamedTemporaryFile() as tmp:
-            breptools.Write(shape, tmp.name, True, False, 1)
-            brepdata = tmp.read().decode("ascii")
+        brepdata = write_brep(shape)
+        if compress:
+            brepdata = compress_content(brepdata)
 
         data = {
             "shape": "Part::Any",
             "name": shape_name,
             "parameters": {
-                "Content": brepdata,
+                "Content": self._store_content(brepdata, blob),
                 "Type": "brep",
                 "Placement": {
                     "Position": position,
@@ -323,7 +814,7 @@ class CadDocument(CommWidget):
             "visible": True,
         }
 
-        self._objects_array.append(Map(data))
+        self._append_yobject(Map(data))
 
         return self
 
@@ -544,6 +1035,284 @@ class CadDocument(CommWidget):
         }
         return self.add_object(OBJECT_FACTORY.create_object(data, self))
 
+    def add_boxes(
+        self,
+        positions: ArrayLike,
+        sizes: ArrayLike = 1,
+        colors: Union[str, Sequence[str]] = "#808080",
+        rotation_axes: ArrayLike = (0, 0, 1),
+        rotation_angles: ArrayLike = 0,
+        names: Optional[Sequence[str]] = None,
+    ) -> CadDocument:
+        """
+        Add many boxes to the document at once, in a single transaction.
+        Parameters are either a value shared by all boxes, or an array with one
+        value per box.
+
+        :param positions: The 3D positions of the boxes, as an (N, 3) array.
+        :param sizes: The length, width and height of the boxes, as an (N, 3) array,
+        a single (3,) size or a scalar.
+        :param colors: The colors of the boxes in hex format.
+        :param rotation_axes: The 3D axes used for the rotations, as an (N, 3) array.
+        :param rotation_angles: The rotation angles, in degrees.
+        :param names: The names of the boxes. Defaults to generated names.
+        :return: The document itself.
+        """
+        positions = _positions(positions)
+        sizes = _broadcast("sizes", sizes, (len(positions), 3))
+        return self._add_primitives(
+            Parts.Part__Box,
+            "Box",
+            positions,
+            dict(Length=sizes[..., 0], Width=sizes[..., 1], Height=sizes[..., 2]),
+            colors,
+            rotation_axes,
+            rotation_angles,
+            names,
+        )
+
+    def add_cones(
+        self,
+        positions: ArrayLike,
+        radii1: ArrayLike = 1,
+        radii2: ArrayLike = 0.5,
+        heights: ArrayLike = 1,
+        angles: ArrayLike = 360,
+        colors: Union[str, Sequence[str]] = "#808080",
+        rotation_axes: ArrayLike = (0, 0, 1),
+        rotation_angles: ArrayLike = 0,
+        names: Optional[Sequence[str]] = None,
+    ) -> CadDocument:
+        """
+        Add many cones to the document at once, in a single transaction.
+        Parameters are either a value shared by all cones, or an array with one
+        value per cone.
+
+        :param positions: The 3D positions of the cones, as an (N, 3) array.
+        :param radii1: The bottom radii of the cones.
+        :param radii2: The top radii of the cones.
+        :param heights: The heights of the cones.
+        :param angles: The revolution angles of the cones.
+        :param colors: The colors of the cones in hex format.
+        :param rotation_axes: The 3D axes used for the rotations, as an (N, 3) array.
+        :param rotation_angles: The rotation angles, in degrees.
+        :param names: The names of the cones. Defaults to generated names.
+        :return: The document itself.
+        """
+        return self._add_primitives(
+            Parts.Part__Cone,
+            "Cone",
+            positions,
+            dict(Radius1=radii1, Radius2=radii2, Height=heights, Angle=angles),
+            colors,
+            rotation_axes,
+            rotation_angles,
+            names,
+        )
+
+    def add_cylinders(
+        self,
+        positions: ArrayLike,
+        radii: ArrayLike = 1,
+        heights: ArrayLike = 1,
+        angles: ArrayLike = 360,
+        colors: Union[str, Sequence[str]] = "#808080",
+        rotation_axes: ArrayLike = (0, 0, 1),
+        rotation_angles: ArrayLike = 0,
+        names: Optional[Sequence[str]] = None,
+    ) -> CadDocument:
+        """
+        Add many cylinders to the document at once, in a single transaction.
+        Parameters are either a value shared by all cylinders, or an array with
+        one value per cylinder.
+
+        :param positions: The 3D positions of the cylinders, as an (N, 3) array.
+        :param radii: The radii of the cylinders.
+        :param heights: The heights of the cylinders.
+        :param angles: The revolution angles of the cylinders.
+        :param colors: The colors of the cylinders in hex format.
+        :param rotation_axes: The 3D axes used for the rotations, as an (N, 3) array.
+        :param rotation_angles: The rotation angles, in degrees.
+        :param names: The names of the cylinders. Defaults to generated names.
+        :return: The document itself.
+        """
+        return self._add_primitives(
+            Parts.Part__Cylinder,
+            "Cylinder",
+            positions,
+            dict(Radius=radii, Height=heights, Angle=angles),
+            colors,
+            rotation_axes,
+            rotation_angles,
+            names,
+        )
+
+    def add_spheres(
+        self,
+        positions: ArrayLike,
+        radii: ArrayLike = 5,
+        angles1: ArrayLike = -90,
+        angles2: ArrayLike = 90,
+        angles3: ArrayLike = 360,
+        colors: Union[str, Sequence[str]] = "#808080",
+        rotation_axes: ArrayLike = (0, 0, 1),
+        rotation_angles: ArrayLike = 0,
+        names: Optional[Sequence[str]] = None,
+    ) -> CadDocument:
+        """
+        Add many spheres to the document at once, in a single transaction.
+        Parameters are either a value shared by all spheres, or an array with
+        one value per sphere.
+
+        :param positions: The 3D positions of the spheres, as an (N, 3) array.
+        :param radii: The radii of the spheres.
+        :param angles1: The revolution angles of the spheres on the X axis.
+        :param angles2: The revolution angles of the spheres on the Y axis.
+        :param angles3: The revolution angles of the spheres on the Z axis.
+        :param colors: The colors of the spheres in hex format.
+        :param rotation_axes: The 3D axes used for the rotations, as an (N, 3) array.
+        :param rotation_angles: The rotation angles, in degrees.
+        :param names: The names of the spheres. Defaults to generated names.
+        :return: The document itself.
+        """
+        return self._add_primitives(
+            Parts.Part__Sphere,
+            "Sphere",
+            positions,
+            dict(Radius=radii, Angle1=angles1, Angle2=angles2, Angle3=angles3),
+            colors,
+            rotation_axes,
+            rotation_angles,
+            names,
+        )
+
+    def add_tori(
+        self,
+        positions: ArrayLike,
+        radii1: ArrayLike = 10,
+        radii2: ArrayLike = 2,
+        angles1: ArrayLike = -180,
+        angles2: ArrayLike = 180,
+        angles3: ArrayLike = 360,
+        colors: Union[str, Sequence[str]] = "#808080",
+        rotation_axes: ArrayLike = (0, 0, 1),
+        rotation_angles: ArrayLike = 0,
+        names: Optional[Sequence[str]] = None,
+    ) -> CadDocument:
+        """
+        Add many tori to the document at once, in a single transaction.
+        Parameters are either a value shared by all tori, or an array with one
+        value per torus.
+
+        :param positions: The 3D positions of the tori, as an (N, 3) array.
+        :param radii1: The outer radii of the tori.
+        :param radii2: The inner radii of the tori.
+        :param angles1: The revolution angles of the tori on the X axis.
+        :param angles2: The revolution angles of the tori on the Y axis.
+        :param angles3: The revolution angles of the tori on the Z axis.
+        :param colors: The colors of the tori in hex format.
+        :param rotation_axes: The 3D axes used for the rotations, as an (N, 3) array.
+        :param rotation_angles: The rotation angles, in degrees.
+        :param names: The names of the tori. Defaults to generated names.
+        :return: The document itself.
+        """
+        return self._add_primitives(
+            Parts.Part__Torus,
+            "Torus",
+            positions,
+            dict(
+                Radius1=radii1,
+                Radius2=radii2,
+                Angle1=angles1,
+                Angle2=angles2,
+                Angle3=angles3,
+            ),
+            colors,
+            rotation_axes,
+            rotation_angles,
+            names,
+        )
+
+    def _add_primitives(
+        self,
+        shape: Parts,
+        obj_type: str,
+        positions: ArrayLike,
+        parameters: Dict[str, ArrayLike],
+        colors: Union[str, Sequence[str]],
+        rotation_axes: ArrayLike,
+        rotation_angles: ArrayLike,
+        names: Optional[Sequence[str]],
+    ) -> CadDocument:
+        """
+        Validate the parameters of many primitives with array operations, and
+        insert them in the document with a single ``extend``.
+        """
+        positions = _positions(positions)
+        count = len(positions)
+        positions = _broadcast("positions", positions, (count, 3))
+
+        model = OBJECT_FACTORY.get_model(shape.value)
+        columns = {}
+        for key, value in parameters.items():
+            column = _broadcast(key, value, (count,))
+            # Check the constraints of the schema on the whole column
+            for constraint in model.model_fields[key].metadata:
+                minimum = getattr(constraint, "gt", None)
+                if minimum is not None and not (column > minimum).all():
+                    raise ValueError(f"{key} must be greater than {minimum}")
+            columns[key] = column.tolist()
+        axes = _broadcast("rotation_axes", rotation_axes, (count, 3)).tolist()
+        angles = _broadcast("rotation_angles", rotation_angles, (count,)).tolist()
+
+        if isinstance(colors, str):
+            colors = [colors] * count
+        elif len(colors) != count:
+            raise ValueError(f"Expected {count} colors, got {len(colors)}")
+
+        if names is None:
+            names = []
+            n = self._name_counters.get(obj_type, 1)
+            while len(names) < count:
+                if not self.check_exist(f"{obj_type} {n}"):
+                    names.append(f"{obj_type} {n}")
+                n += 1
+            self._name_counters[obj_type] = n
+        else:
+            if len(names) != count:
+                raise ValueError(f"Expected {count} names, got {len(names)}")
+            if len(set(names)) != count:
+                raise ValueError("Names must be unique")
+            existing = [name for name in names if self.check_exist(name)]
+            if existing:
+                raise ValueError(f"Object {existing[0]} already exists")
+
+        keys = list(columns)
+        yobjects = [
+            Map(
+                {
+                    "shape": shape.value,
+                    "name": name,
+                    "visible": True,
+                    "parameters": {
+                        **dict(zip(keys, values)),
+                        "Color": color,
+                        "Placement": {
+                            "Position": position,
+                            "Axis": axis,
+                            "Angle": angle,
+                        },
+                    },
+                }
+            )
+            for name, color, position, axis, angle, *values in zip(
+                names, colors, positions.tolist(), axes, angles, *columns.values()
+            )
+        ]
+        with self.batch():
+            self._extend_yobjects(yobjects)
+        return self
+
     def add_sketch(
         self,
         name: str = "",
@@ -892,17 +1661,17 @@ class CadDocument(CommWidget):
 
     def _get_operand(self, shape: str | int | None, default_idx: int = -1):
         if isinstance(shape, str):
-            if shape not in self.objects:
+            if not self.check_exist(shape):
                 raise ValueError(f"Unknown object {shape}")
         elif isinstance(shape, int):
-            shape = self.objects[shape]
+            shape = self._names[shape]
         else:
-            shape = self.objects[default_idx]
+            shape = self._names[default_idx]
 
         return shape
 
     def _get_boolean_operands(self, shape1: str | int | None, shape2: str | int | None):
-        if len(self.objects) < 2:
+        if len(self._names) < 2:
             raise ValueError(
                 "Cannot apply boolean operator if there are less than two objects in the document."  # noqa E501
             )
@@ -919,12 +1688,12 @@ class CadDocument(CommWidget):
         :param name: The name of the object.
         :param value: The visibility value (True or False).
         """
-        obj: Optional[Map] = self._get_yobject_by_name(name)
+        obj = self.get_object(name)
 
         if obj is None:
             raise RuntimeError(f"No object named {name}")
 
-        obj["visible"] = value
+        obj.visible = value
 
     def set_color(self, name: str, value: str):
         """
@@ -933,43 +1702,449 @@ class CadDocument(CommWidget):
         :param name: The name of the object.
         :param value: The color in hex format (e.g., "#FF5733").
         """
-        obj: Optional[Map] = self._get_yobject_by_name(name)
+        obj = self.get_object(name)
 
         if obj is None:
             raise RuntimeError(f"No object named {name}")
-        parameters = obj.get("parameters", {})
-        parameters["Color"] = value
-        obj["parameters"] = parameters
+        obj.parameters.Color = value
+
+    def set_tessellation(
+        self,
+        name: Optional[str] = None,
+        mode: Optional[str] = None,
+        linear_deflection: Optional[float] = None,
+        relative_deflection: Optional[float] = None,
+        angular_deflection: Optional[float] = None,
+        progressive: Optional[bool] = None,
+    ) -> CadDocument:
+        """
+        Set the tessellation settings of the meshes of the document, or of
+        one of its objects. The settings which are not given are unchanged,
+        the settings of an object overriding those of the document.
+
+        :param name: The name of the object, the settings of the document are
+        set if not given.
+        :param mode: ``fixed`` to use the linear deflection, or ``auto`` to
+        derive it from the bounding box of each shape.
+        :param linear_deflection: The maximum distance between the meshes and
+        the shapes, in the ``fixed`` mode.
+        :param relative_deflection: The maximum distance between the mesh and
+        the shape, relative to the bounding box diagonal of the shape, in the
+        ``auto`` mode.
+        :param angular_deflection: The maximum angle between the normals of
+        adjacent triangles, in radians.
+        :param progressive: Whether to display a coarse mesh first, which is
+        then refined.
+        """
+        if mode is not None and mode not in ("fixed", "auto"):
+            raise ValueError(f"Unknown tessellation mode {mode}")
+        for value in (linear_deflection, relative_deflection, angular_deflection):
+            if value is not None and value <= 0:
+                raise ValueError("Deflections must be positive")
+        settings = {
+            key: value
+            for key, value in (
+                ("mode", mode),
+                ("linearDeflection", linear_deflection),
+                ("relativeDeflection", relative_deflection),
+                ("angularDeflection", angular_deflection),
+                ("progressive", progressive),
+            )
+            if value is not None
+        }
+
+        if name is None:
+            target = self._options
+        else:
+            target = self._get_yobject_by_name(name)
+            if target is None:
+                raise RuntimeError(f"No object named {name}")
+        current = target.get("tessellation") or {}
+        if {**current, **settings} != current:
+            target["tessellation"] = {**current, **settings}
+        return self
+
+    def batch(self) -> DocumentBatch:
+        """
+        Group modifications of the document in a single transaction, so that
+        they are sent to the front-end as a single update, at the end of the
+        batch. Batches can be nested, and used as async context managers as well.
+
+        .. code-block:: python
+
+            with doc.batch():
+                for i in range(500):
+                    doc.add_box(position=[2 * i, 0, 0])
+
+        Modifications are not rolled back if an exception is raised in the batch.
+
+        :return: A context manager returning the document itself.
+        """
+        return DocumentBatch(self)
+
+    def _append_yobject(self, yobject: Map) -> None:
+        self._extend_yobjects([yobject])
+
+    def _extend_yobjects(self, yobjects: List[Map]) -> None:
+        self._objects_array.extend(yobjects)
+        if self._batch_depth:
+            # Changes are only observed when the transaction is committed
+            self._apply_objects_delta(
+                [{"retain": len(self._names)}, {"insert": yobjects}]
+            )
+            self._delta_applied = True
+
+    def _insert_yobjects(
+        self, index: int, yobjects: List[Map], objects: Optional[List[Dict]] = None
+    ) -> None:
+        """
+        Insert objects in the document at `index`.
+
+        :param objects: The content of `yobjects`, if known, which is faster to
+        read than the shared objects to update the name index.
+        """
+        self._objects_array[index:index] = yobjects
+        if self._batch_depth:
+            self._apply_objects_delta(
+                [{"retain": index}, {"insert": objects or yobjects}]
+            )
+            self._delta_applied = True
+
+    def _remove_yobject(self, index: int) -> None:
+        self._objects_array.pop(index)
+        if self._batch_depth:
+            self._apply_objects_delta([{"retain": index}, {"delete": 1}])
+            self._delta_applied = True
 
     def check_exist(self, name: str) -> bool:
-        if self.objects:
-            return name in self.objects
-        return False
+        return self._get_yobject_index_by_name(name) != -1
 
     def _get_yobject_by_name(self, name: str) -> Optional[Map]:
-        if self._objects_array:
-            for index, item in enumerate(self._objects_array):
-                if item["name"] == name:
-                    return self._objects_array[index]
-        return None
+        index = self._get_yobject_index_by_name(name)
+        if index == -1:
+            return None
+        return self._objects_array[index]
 
     def _get_yobject_index_by_name(self, name: str) -> int:
-        if self._objects_array:
-            for index, item in enumerate(self._objects_array):
-                if item["name"] == name:
-                    return index
-        return -1
+        if self._name_index is None:
+            self._name_index = {}
+            for index, object_name in enumerate(self._names):
+                # The first object wins if names are duplicated
+                self._name_index.setdefault(object_name, index)
+        return self._name_index.get(name, -1)
 
     def _new_name(self, obj_type: str) -> str:
-        n = 1
-        name = f"{obj_type} 1"
-        objects = self.objects
-
-        while name in objects:
-            name = f"{obj_type} {n}"
+        n = self._name_counters.get(obj_type, 1)
+        while self.check_exist(f"{obj_type} {n}"):
             n += 1
+        self._name_counters[obj_type] = n
+        return f"{obj_type} {n}"
+
+    def _forget_name(self, name: Optional[str]) -> None:
+        """
+        Lower the counter of the object type of a removed name, so that
+        `_new_name` keeps returning the first free name.
+        """
+        if not isinstance(name, str):
+            return
+        obj_type, _, n = name.rpartition(" ")
+        if n.isdigit() and obj_type in self._name_counters:
+            self._name_counters[obj_type] = min(self._name_counters[obj_type], int(n))
+
+    def _on_objects_changed(self, events: List[Union[ArrayEvent, MapEvent]]) -> None:
+        """
+        Keep the name index up to date with the shared objects array, whether
+        it is modified locally or by a remote peer.
+        """
+        if self._delta_applied:
+            # The index was updated during a batch, the changes of the
+            # transaction are already applied
+            self._delta_applied = False
+        else:
+            for event in events:
+                if not event.path:
+                    self._apply_objects_delta(event.delta)
+        for event in events:
+            if not event.path:
+                continue
+            if "name" in event.keys:
+                # An object was renamed in place
+                self._set_name(event.path[0], event.target.get("name"))
+            if not _DEPENDENCY_KEYS.isdisjoint(event.keys):
+                self._graph.set_object(
+                    self._names[event.path[0]], _yobject_dependencies(event.target)
+                )
+
+    def _set_name(self, index: int, name: str) -> None:
+        if self._names[index] == name:
+            return
+        self._forget_name(self._names[index])
+        self._graph.rename_object(self._names[index], name)
+        self._names[index] = name
+        self._name_index = None
+
+    def _apply_objects_delta(self, delta: List[Dict]) -> None:
+        index = 0
+        for change in delta:
+            if "retain" in change:
+                index += change["retain"]
+            elif "delete" in change:
+                removed = self._names[index : index + change["delete"]]
+                del self._names[index : index + change["delete"]]
+                for name in removed:
+                    self._forget_name(name)
+                    self._graph.remove_object(name)
+                if index < len(self._names):
+                    # The following objects are shifted
+                    self._name_index = None
+                elif self._name_index is not None:
+                    for name in removed:
+                        if self._name_index.get(name, -1) >= index:
+                            del self._name_index[name]
+            elif "insert" in change:
+                names = [
+                    item.get("name") if isinstance(item, (Map, dict)) else None
+                    for item in change["insert"]
+                ]
+                if self._name_index is not None and index == len(self._names):
+                    # Appending, which is the common case, keeps the index valid
+                    for offset, name in enumerate(names):
+                        self._name_index.setdefault(name, index + offset)
+                else:
+                    self._name_index = None
+                self._names[index:index] = names
+                index += len(names)
+                for name, item in zip(names, change["insert"]):
+                    if isinstance(item, (Map, dict)):
+                        self._graph.set_object(name, _yobject_dependencies(item))
+
+
+def _yobject_dependencies(yobject: Union[Map, Dict]) -> List[str]:
+    shape = yobject.get("shape")
+    return object_dependencies(
+        shape,
+        yobject.get("parameters") if shape in OPERATOR_DEPENDENCIES else None,
+        yobject.get("dependencies"),
+    )
+
 
-        return name
+def _content_from_update(update: bytes) -> Dict[str, Any]:
+    """
+    Get the content of a document from its update, as in a jcad file.
+    """
+    ydoc = Doc()
+    ydoc.apply_update(update)
+    return {
+        "schemaVersion": SCHEMA_VERSION,
+        "objects": ydoc.get("objects", type=Array).to_py(),
+        "options": ydoc.get("options", type=Map).to_py(),
+        "metadata": ydoc.get("metadata", type=Map).to_py(),
+        "outputs": ydoc.get("outputs", type=Map).to_py(),
+    }
+
+
+def _positions(positions: ArrayLike) -> np.ndarray:
+    """
+    Returns the positions of a bulk creation as an (N, 3) array.
+    """
+    positions = np.asarray(positions, dtype=float)
+    if positions.ndim != 2 or positions.shape[1] != 3:
+        raise ValueError("positions must be an (N, 3) array")
+    return positions
+
+
+def _broadcast(name: str, value: ArrayLike, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Broadcast a parameter of a bulk creation to `shape`, checking its values.
+    """
+    try:
+        array = np.broadcast_to(np.asarray(value, dtype=float), shape)
+    except ValueError:
+        raise ValueError(f"{name} cannot be broadcast to {shape}") from None
+    if not np.isfinite(array).all():
+        raise ValueError(f"{name} must be finite")
+    return array
+
+
+class _DictProxy:
+    """
+    A live view on a dictionary held by an object of the document, like its
+    parameters. Nested dictionaries are views as well, while lists are
+    returned as copies and must be assigned as a whole.
+
+    Objects store each top-level entry as a single value, so writing a
+    nested key sets the top-level entry holding it, only if the value changed.
+    """
+
+    __slots__ = ("_yobject", "_key", "_path")
+
+    def __init__(self, yobject: Map, key: str, path: tuple = ()):
+        object.__setattr__(self, "_yobject", yobject)
+        object.__setattr__(self, "_key", key)
+        object.__setattr__(self, "_path", path)
+
+    def _get(self) -> Tuple[Dict, Dict]:
+        root = self._yobject.get(self._key)
+        if root is None:
+            root = {}
+        value = root
+        for part in self._path:
+            value = value[part]
+        return root, value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._get()[1][key]
+        if isinstance(value, dict):
+            return _DictProxy(self._yobject, self._key, self._path + (key,))
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if isinstance(value, _DictProxy):
+            value = value.to_py()
+        root, current = self._get()
+        if key in current and current[key] == value:
+            return
+        current[key] = value
+        self._yobject[self._key] = root
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self[name] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._get()[1]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._get()[1])
+
+    def __len__(self) -> int:
+        return len(self._get()[1])
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, _DictProxy):
+            other = other.to_py()
+        return self.to_py() == other
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def keys(self):
+        return self._get()[1].keys()
+
+    def to_py(self) -> Dict:
+        return self._get()[1]
+
+    def __repr__(self) -> str:
+        return repr(self.to_py())
+
+
+class JcadObjectProxy:
+    """
+    A live view on an object of a :class:`CadDocument`, see
+    :meth:`CadDocument.get_object`.
+    """
+
+    __slots__ = ("_yobject", "_parent")
+
+    def __init__(self, yobject: Map, parent: CadDocument):
+        self._yobject = yobject
+        self._parent = parent
+
+    @property
+    def name(self) -> str:
+        return self._yobject["name"]
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self._parent.rename(self.name, value)
+
+    @property
+    def shape(self) -> Optional[str]:
+        return self._yobject.get("shape")
+
+    @property
+    def visible(self) -> bool:
+        return self._yobject.get("visible", True)
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+        if self._yobject.get("visible") != value:
+            self._yobject["visible"] = value
+
+    @property
+    def parameters(self) -> _DictProxy:
+        return _DictProxy(self._yobject, "parameters")
+
+    @property
+    def metadata(self) -> Optional[_DictProxy]:
+        if "shapeMetadata" not in self._yobject:
+            return None
+        return _DictProxy(self._yobject, "shapeMetadata")
+
+    def to_py(self) -> Dict:
+        """
+        Returns a copy of the object, as stored in a jcad file.
+        """
+        return self._yobject.to_py()
+
+    def to_object(self) -> Optional[PythonJcadObject]:
+        """
+        Returns a copy of the object as a :class:`PythonJcadObject`. The data
+        comes from the document, it is not validated again.
+        """
+        return OBJECT_FACTORY.create_object(self.to_py(), self._parent, trusted=True)
+
+    def __repr__(self) -> str:
+        return f"JcadObjectProxy(name={self.name!r}, shape={self.shape!r})"
+
+    def _repr_mimebundle_(self, *args, **kwargs):
+        # Only the displayed objects get a document and a comm
+        document = CadDocument()
+        document._append_yobject(Map(self.to_py()))
+        return document._repr_mimebundle_(*args, **kwargs)
+
+
+class DocumentBatch:
+    """
+    A batch of modifications of a :class:`CadDocument`, see
+    :meth:`CadDocument.batch`.
+    """
+
+    def __init__(self, document: CadDocument):
+        self._document = document
+        self._transaction = None
+
+    def __enter__(self) -> CadDocument:
+        if self._document._batch_depth == 0:
+            self._transaction = self._document.ydoc.transaction()
+            self._transaction.__enter__()
+        self._document._batch_depth += 1
+        return self._document
+
+    def __exit__(self, *args) -> None:
+        self._document._batch_depth -= 1
+        if self._transaction is not None:
+            self._transaction.__exit__(*args)
+            self._transaction = None
+
+    async def __aenter__(self) -> CadDocument:
+        if self._document._batch_depth == 0:
+            # Wait for the other async transactions on the document
+            self._transaction = self._document.ydoc.new_transaction()
+            await self._transaction.__aenter__()
+        self._document._batch_depth += 1
+        return self._document
+
+    async def __aexit__(self, *args) -> None:
+        self._document._batch_depth -= 1
+        if self._transaction is not None:
+            await self._transaction.__aexit__(*args)
+            self._transaction = None
 
 
 class PythonJcadObject(BaseModel):
@@ -995,15 +2170,21 @@ class PythonJcadObject(BaseModel):
         IChamfer,
     ]
     metadata: Optional[ShapeMetadata]
-    _caddoc = Optional[CadDocument]
-    _parent = Optional[CadDocument]
+    _caddoc: Optional[CadDocument] = PrivateAttr(default=None)
+    _parent: Optional[CadDocument] = PrivateAttr(default=None)
 
-    def __init__(__pydantic_self__, parent, **data: Any) -> None:  # noqa
+    def __init__(__pydantic_self__, parent=None, **data: Any) -> None:  # noqa
         super().__init__(**data)
-        __pydantic_self__._caddoc = CadDocument()
-        __pydantic_self__._caddoc.add_object(__pydantic_self__)
         __pydantic_self__._parent = parent
 
+    def _repr_mimebundle_(self, *args, **kwargs):
+        # The document (and its comm) showing the object is only created
+        # when the object is displayed
+        if self._caddoc is None:
+            self._caddoc = CadDocument()
+            self._caddoc.add_object(self)
+        return self._caddoc._repr_mimebundle_(*args, **kwargs)
+
 
 class SingletonMeta(type):
     _instances = {}
@@ -1018,33 +2199,145 @@ class SingletonMeta(type):
 class ObjectFactoryManager(metaclass=SingletonMeta):
     def __init__(self):
         self._factories: Dict[str, type[BaseModel]] = {}
+        # For each shape, the object model whose parameters are the shape model,
+        # so that validation does not try all the parameter models in turn
+        self._objects: Dict[str, type[PythonJcadObject]] = {}
+        # The keys of the parameters of each shape
+        self._keys: Dict[str, frozenset] = {}
+        self._shapes: Dict[str, Parts] = {}
 
     def register_factory(self, shape_type: str, cls: type[BaseModel]) -> None:
         if shape_type not in self._factories:
             self._factories[shape_type] = cls
+            self._objects[shape_type] = create_model(
+                f"{cls.__name__}Object",
+                __base__=PythonJcadObject,
+                __module__=__name__,
+                parameters=(cls, ...),
+            )
+            self._keys[shape_type] = frozenset(
+                field.alias or key for key, field in cls.model_fields.items()
+            )
+            self._shapes[shape_type] = Parts(shape_type)
+
+    def get_model(self, shape_type: str) -> type[BaseModel]:
+        if shape_type not in self._factories:
+            raise ValueError(f"Unknown shape type {shape_type}")
+        return self._factories[shape_type]
 
     def create_object(
-        self, data: Dict, parent: Optional[CadDocument] = None
+        self, data: Dict, parent: Optional[CadDocument] = None, trusted: bool = False
     ) -> Optional[PythonJcadObject]:
+        """
+        Create the Python object of a jcad object, validated by the model
+        registered for its shape.
+
+        :param data: The object, as stored in a jcad file.
+        :param parent: The document of the object.
+        :param trusted: Whether the data comes from a document, in which case it
+        is not validated. Values which do not match the schema, e.g. written by
+        older versions, are kept as they are.
+        :return: The object, or None if its shape is unknown.
+        """
         object_type = data.get("shape", None)
-        name: str = data.get("name", None)
-        meta = data.get("shapeMetadata", None)
-        if object_type and object_type in self._factories:
-            Model = self._factories[object_type]
-            args = {}
-            params = data["parameters"]
-            for field in Model.model_fields:
-                args[field] = params.get(field, None)
-            obj_params = Model(**args)
-            return PythonJcadObject(
-                parent=parent,
-                name=name,
-                shape=object_type,
-                parameters=obj_params,
-                metadata=meta,
+        Object = self._objects.get(object_type)
+        if Object is None:
+            return None
+
+        keys = self._keys[object_type]
+        parameters = data["parameters"]
+        if not keys.issuperset(parameters):
+            unknown = parameters.keys() - keys
+            warnings.warn(
+                f"Ignoring the unknown parameters {sorted(unknown)} "
+                f"of {object_type} objects"
             )
+            parameters = {
+                key: value for key, value in parameters.items() if key in keys
+            }
+        obj_data = dict(
+            name=data.get("name", None),
+            shape=object_type,
+            parameters=parameters,
+            metadata=data.get("shapeMetadata", None),
+        )
+        if trusted:
+            obj_data["shape"] = self._shapes[object_type]
+            obj = _construct(Object, obj_data)
+        else:
+            obj = Object.model_validate(obj_data)
+        # Faster than setting the attribute, which pydantic intercepts
+        obj.__pydantic_private__["_parent"] = parent
+        return obj
+
+
+# For each model built by _construct, its fields (their name, their key in the
+# data, the model they hold if any, their default value and whether the default
+# is a factory) and the default values of its private attributes
+_CONSTRUCT_FIELDS: Dict[
+    type[BaseModel], Tuple[List[Tuple[str, str, Any, Any, bool]], Optional[Dict]]
+] = {}
+
+# The default value of the required fields
+_REQUIRED = object()
 
-        return None
+
+def _construct(Model: type[BaseModel], values: Dict) -> BaseModel:
+    """
+    Build a model from trusted data, as ``model_construct`` does, building its
+    nested models as well. The fields of each model are only inspected once.
+    Fields holding models in containers keep the values as they are.
+
+    The models must not define ``model_post_init``, which is not called.
+    """
+    plan = _CONSTRUCT_FIELDS.get(Model)
+    if plan is None:
+        plan = _CONSTRUCT_FIELDS[Model] = _model_fields(Model)
+    fields, private = plan
+    data = {}
+    for name, key, NestedModel, default, factory in fields:
+        if key in values:
+            value = values[key]
+            if NestedModel is not None and isinstance(value, dict):
+                value = _construct(NestedModel, value)
+            data[name] = value
+        elif default is not _REQUIRED:
+            data[name] = default() if factory else default
+    obj = Model.__new__(Model)
+    object.__setattr__(obj, "__dict__", data)
+    object.__setattr__(obj, "__pydantic_fields_set__", set(data))
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    object.__setattr__(
+        obj, "__pydantic_private__", None if private is None else dict(private)
+    )
+    return obj
+
+
+def _model_fields(
+    Model: type[BaseModel],
+) -> Tuple[List[Tuple[str, str, Any, Any, bool]], Optional[Dict]]:
+    fields = []
+    for name, field in Model.model_fields.items():
+        annotation = field.annotation
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1 and type(None) in get_args(annotation):
+            # An optional field
+            annotation = args[0]
+        if not (isinstance(annotation, type) and issubclass(annotation, BaseModel)):
+            annotation = None
+        default, factory = field.default, False
+        if field.default_factory is not None:
+            default, factory = field.default_factory, True
+        elif field.is_required():
+            default = _REQUIRED
+        elif isinstance(default, (list, dict, set)):
+            default, factory = partial(copy.deepcopy, default), True
+        fields.append((name, field.alias or name, annotation, default, factory))
+    private = {
+        name: attribute.get_default()
+        for name, attribute in Model.__private_attributes__.items()
+    }
+    return fields, private or None
 
 
 OBJECT_FACTORY = ObjectFactoryManager()
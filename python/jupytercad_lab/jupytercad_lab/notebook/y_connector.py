@@ -24,6 +24,9 @@ class YDocConnector(Widget):
             elif ext == "jcad":
                 self._format = "text"
                 self._contentType = "jcad"
+            elif ext == "jcadz":
+                self._format = "base64"
+                self._contentType = "jcadz"
             else:
                 raise Exception("File extension is not supported!")
         comm_data = {
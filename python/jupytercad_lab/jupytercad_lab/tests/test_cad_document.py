@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import stat
+import timeit
+
+import pytest
+from pydantic import ValidationError
+
+from jupytercad_core.files import replacement_mode
+from jupytercad_lab import CadDocument
+from jupytercad_lab.notebook.cad_document import OBJECT_FACTORY
+
+
+def _object_names(path):
+    with open(path, "r", encoding="utf-8") as fobj:
+        return [obj["name"] for obj in json.load(fobj)["objects"]]
+
+
+def test_save_skips_unchanged_document(tmp_path):
+    path = tmp_path / "doc.jcad"
+    doc = CadDocument().add_box()
+    doc.save(path)
+    mtime = path.stat().st_mtime_ns
+    doc.save(path)
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_save_permissions(tmp_path):
+    path = tmp_path / "doc.jcad"
+    doc = CadDocument().add_box()
+    doc.save(path)
+    assert stat.S_IMODE(path.stat().st_mode) == replacement_mode(tmp_path / "new")
+    os.chmod(path, 0o640)
+    doc.add_sphere().save(path)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+
+def test_save_after_remove(tmp_path):
+    path = tmp_path / "doc.jcad"
+    CadDocument().add_box().add_sphere().save(path)
+
+    doc = CadDocument.import_from_file(path)
+    doc.save(path)
+    doc.remove("Box 1")
+    doc.save(path)
+    assert _object_names(path) == ["Sphere 1"]
+
+
+def test_save_async_after_remove(tmp_path):
+    path = tmp_path / "doc.jcad"
+    doc = CadDocument().add_box().add_sphere()
+    asyncio.run(doc.save_async(path))
+    doc.remove("Sphere 1")
+    asyncio.run(doc.save_async(path))
+    assert _object_names(path) == ["Box 1"]
+
+
+@pytest.mark.parametrize("suffix", [".jcad", ".jcadz"])
+def test_import_from_file(tmp_path, suffix):
+    path = tmp_path / f"doc{suffix}"
+    doc = CadDocument()
+    for index in range(300):
+        doc.add_box(f"Box {index}")
+    doc.cut(base="Box 0", tool="Box 299", name="Cut 1")
+    doc.save(path)
+
+    imported = CadDocument.import_from_file(path)
+    assert imported.objects == doc.objects
+    assert imported.get_object("Box 299").name == "Box 299"
+    assert set(imported.dependency_graph.dependencies("Cut 1")) == {"Box 0", "Box 299"}
+
+
+def test_import_objects_from_file(tmp_path):
+    path = tmp_path / "doc.jcad"
+    CadDocument().add_box().add_sphere().add_cone().save(path)
+
+    imported = CadDocument.import_from_file(path, objects=["Cone 1", "Box 1"])
+    assert imported.objects == ["Cone 1", "Box 1"]
+
+
+def test_parallel_evaluation():
+    pytest.importorskip("OCC")
+    doc = CadDocument().add_box().add_sphere().add_cone()
+    doc.cut(base="Box 1", tool="Sphere 1").fuse(base="Cone 1", tool="Cut 1")
+    try:
+        shapes = doc.evaluate(max_workers=2)
+        assert all(shape is not None for shape in shapes.values())
+        pool = doc._executor
+        doc.add_torus()
+        assert doc.evaluate(["Torus 1"], max_workers=2)["Torus 1"] is not None
+        assert doc._executor is pool
+    finally:
+        doc.close()
+    assert doc._executor is None
+
+
+def test_create_object():
+    data = CadDocument().add_box(width=2).get_object("Box 1").to_py()
+    obj = OBJECT_FACTORY.create_object(data)
+    assert obj.name == "Box 1"
+    assert obj.parameters.Width == 2
+    assert obj.parameters.Placement.Position == [0, 0, 0]
+
+    data["parameters"]["Width"] = -1
+    with pytest.raises(ValidationError):
+        OBJECT_FACTORY.create_object(data)
+    doc = CadDocument()
+    trusted = OBJECT_FACTORY.create_object(data, doc, trusted=True)
+    assert trusted.parameters.Width == -1
+    assert trusted.parameters.Placement.Position == [0, 0, 0]
+    assert trusted._parent is doc
+
+    del data["parameters"]["Color"]
+    data["parameters"]["Width"] = 2
+    trusted = OBJECT_FACTORY.create_object(data, trusted=True)
+    assert trusted.model_dump() == OBJECT_FACTORY.create_object(data).model_dump()
+
+
+def test_create_trusted_object_speed():
+    data = CadDocument().add_box().get_object("Box 1").to_py()
+
+    def duration(trusted):
+        return min(
+            timeit.repeat(
+                lambda: OBJECT_FACTORY.create_object(data, trusted=trusted),
+                number=1000,
+                repeat=5,
+            )
+        )
+
+    assert duration(True) < duration(False)
+
+
+def test_create_object_unknown_parameters():
+    data = CadDocument().add_box().get_object("Box 1").to_py()
+    data["parameters"]["Fillet"] = 1
+    with pytest.warns(UserWarning, match="Fillet"):
+        obj = OBJECT_FACTORY.create_object(data, trusted=True)
+    assert obj.parameters.Length == 1
+
+
+def test_blob_store_requires_path(tmp_path):
+    with pytest.raises(ValueError):
+        CadDocument(blob_store=True)
+    doc = CadDocument(str(tmp_path / "doc.jcad"), blob_store=True)
+    assert doc._blob_store.root == tmp_path.resolve() / ".jcad_blobs"
+
+
+def test_add_boxes_sizes():
+    positions = [[0, 0, 0], [1, 1, 1]]
+    doc = CadDocument().add_boxes(positions, sizes=[[1, 2, 3], [4, 5, 6]])
+    assert doc.get_object("Box 2").parameters.Width == 5
+    doc = CadDocument().add_boxes(positions, sizes=[1, 2, 3])
+    assert doc.get_object("Box 2").parameters.Height == 3
+
+    for sizes in ([1, 2, 3, 4, 5], [[1, 2, 3, 4]] * 2, [[1, 2, 3]] * 3):
+        with pytest.raises(ValueError, match="sizes"):
+            CadDocument().add_boxes(positions, sizes=sizes)
+    with pytest.raises(ValueError, match="Radius"):
+        CadDocument().add_spheres(positions, radii=[[1, 2]] * 2)
+    with pytest.raises(ValueError, match="rotation_axes"):
+        CadDocument().add_cylinders(positions, rotation_axes=[[0, 0, 1, 0]] * 2)